@@ -0,0 +1,282 @@
+"""
+Spending anomaly detection for Smart Budget and Inventory Manager
+Every expense entered by hand and every purchase updates running statistics
+for its (user, category) in spending_stats, inside the insert's transaction
+and in constant time whatever the size of the history:
+    count, mean, m2   Welford's algorithm (variance = m2 / (count - 1))
+    recent            the category's last ANOMALY_WINDOW amounts
+An expense is flagged, and kept in spending_anomalies, when it is at least
+ANOMALY_Z_SCORE standard deviations above the category's mean and above the
+ANOMALY_QUANTILE of the recent amounts. The recent quantile keeps a category
+whose spending has drifted upward from flagging every new expense.
+
+Recurring expenses are scheduled rather than spent on impulse and are left
+out. Deleting an expense from the hot table takes it back out of the
+statistics. rebuild() replays the whole history (after a sync, or once when
+setting up MySQL): `python anomalies.py [--backend mysql]`.
+
+Functions take an open cursor and the dialect ('mysql' or 'sqlite').
+"""
+
+import argparse
+import math
+import sys
+from datetime import date as Date
+
+from config import ANOMALY_Z_SCORE, ANOMALY_QUANTILE, ANOMALY_WINDOW, ANOMALY_MIN_HISTORY, SQLITE_DB_FILE
+from models import Money
+from sql_dialect import prepare, connect
+
+_SAVE_STATS = {
+    'sqlite': "ON CONFLICT (user_id, category_id) DO UPDATE SET count = excluded.count, mean = excluded.mean, "
+              "m2 = excluded.m2, recent = excluded.recent",
+    'mysql': "ON DUPLICATE KEY UPDATE count = VALUES(count), mean = VALUES(mean), m2 = VALUES(m2), "
+             "recent = VALUES(recent)",
+}
+
+_ANOMALY_COLUMNS = "expense_id, user_id, category_id, date, amount_cents, mean_cents, quantile_cents, z_score"
+
+
+class SpendingStats:
+    """Running statistics of one user's spending in one category"""
+    __slots__ = ('count', 'mean', 'm2', 'recent')
+
+    def __init__(self, count=0, mean=0.0, m2=0.0, recent=()):
+        self.count = int(count)
+        self.mean = float(mean)
+        self.m2 = float(m2)
+        self.recent = list(recent)
+
+    @classmethod
+    def from_row(cls, row):
+        """From a (count, mean, m2, recent) row; recent is comma-separated cents"""
+        if isinstance(row, dict):
+            row = (row['count'], row['mean'], row['m2'], row['recent'])
+        count, mean, m2, recent = row
+        return cls(count, mean, m2, [int(cents) for cents in recent.split(',') if cents])
+
+    @property
+    def stddev(self):
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0.0
+
+    def quantile(self, q=ANOMALY_QUANTILE):
+        """Nearest-rank quantile of the recent amounts (None before the first)"""
+        if not self.recent:
+            return None
+        ordered = sorted(self.recent)
+        return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+
+    def z_score(self, cents):
+        """Standard deviations above the mean; inf above a category that never varied"""
+        stddev = self.stddev
+        if stddev == 0:
+            return math.inf if cents > self.mean else 0.0
+        return (cents - self.mean) / stddev
+
+    def is_anomaly(self, cents):
+        if self.count < ANOMALY_MIN_HISTORY or not self.recent:
+            return False
+        return self.z_score(cents) >= ANOMALY_Z_SCORE and cents > self.quantile()
+
+    def add(self, cents):
+        self.count += 1
+        delta = cents - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (cents - self.mean)
+        self.recent.append(cents)
+        del self.recent[:-ANOMALY_WINDOW]
+
+    def remove(self, cents):
+        """Undo add(cents) for a deleted expense"""
+        if self.count <= 1:
+            self.count, self.mean, self.m2 = 0, 0.0, 0.0
+        else:
+            delta = cents - self.mean
+            self.mean -= delta / (self.count - 1)
+            self.m2 = max(0.0, self.m2 - delta * (cents - self.mean))
+            self.count -= 1
+        # The newest matching amount is the likeliest to be the deleted one
+        for i in range(len(self.recent) - 1, -1, -1):
+            if self.recent[i] == cents:
+                del self.recent[i]
+                break
+
+    def flag(self, expense_id, day, category, cents):
+        """The Anomaly for an expense judged against these statistics"""
+        z_score = self.z_score(cents)
+        return Anomaly(expense_id, day, category, cents, round(self.mean), self.quantile(),
+                       z_score if math.isfinite(z_score) else None)
+
+
+class Anomaly:
+    """A flagged expense with the category statistics it was judged against
+
+    z_score is None when every earlier amount in the category was the same.
+    """
+    __slots__ = ('expense_id', 'date', 'category', 'amount_cents', 'mean_cents', 'quantile_cents', 'z_score')
+
+    def __init__(self, expense_id, date, category, amount_cents, mean_cents, quantile_cents, z_score):
+        self.expense_id = expense_id
+        self.date = date.isoformat() if isinstance(date, Date) else date
+        self.category = category
+        self.amount_cents = int(amount_cents)
+        self.mean_cents = int(mean_cents)
+        self.quantile_cents = int(quantile_cents)
+        self.z_score = z_score
+
+    @classmethod
+    def from_row(cls, row):
+        if isinstance(row, dict):
+            row = (row['expense_id'], row['date'], row['category'], row['amount_cents'],
+                   row['mean_cents'], row['quantile_cents'], row['z_score'])
+        return cls(*row)
+
+    @property
+    def amount(self):
+        return Money(self.amount_cents)
+
+    @property
+    def usual(self):
+        return Money(self.mean_cents)
+
+    def describe(self):
+        return f"${self.amount:.2f} is unusually high for {self.category} (usually about ${self.usual:.2f})"
+
+    def __repr__(self):
+        return f"Anomaly(expense_id={self.expense_id}, category={self.category!r}, amount={self.amount})"
+
+
+def _load(cursor, dialect, user_id, category_id):
+    query = "SELECT count, mean, m2, recent FROM spending_stats WHERE user_id = ? AND category_id = ?"
+    # Lock the row on MySQL so concurrent inserts in one category apply one after the other
+    cursor.execute(prepare(query + (" FOR UPDATE" if dialect == 'mysql' else ""), dialect), (user_id, category_id))
+    row = cursor.fetchone()
+    return SpendingStats.from_row(row) if row else SpendingStats()
+
+
+def _stats_row(user_id, category_id, stats):
+    return (user_id, category_id, stats.count, stats.mean, stats.m2, ','.join(map(str, stats.recent)))
+
+
+def _save_sql(dialect):
+    return prepare(f"""
+        INSERT INTO spending_stats (user_id, category_id, count, mean, m2, recent) VALUES (?, ?, ?, ?, ?, ?)
+        {_SAVE_STATS[dialect]}
+    """, dialect)
+
+
+def _anomaly_row(user_id, category_id, anomaly):
+    return (anomaly.expense_id, user_id, category_id, anomaly.date, anomaly.amount_cents,
+            anomaly.mean_cents, anomaly.quantile_cents, anomaly.z_score)
+
+
+def _insert_anomaly_sql(dialect):
+    return prepare(f"INSERT INTO spending_anomalies ({_ANOMALY_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", dialect)
+
+
+def record(cursor, dialect, user_id, category_id, category, expense_id, day, cents):
+    """Judge a new expense against its category and add it to the statistics
+
+    Call in the transaction that inserted the expense. Returns the Anomaly
+    if the expense was flagged, otherwise None.
+    """
+    stats = _load(cursor, dialect, user_id, category_id)
+    anomaly = stats.flag(expense_id, day, category, cents) if stats.is_anomaly(cents) else None
+    if anomaly:
+        cursor.execute(_insert_anomaly_sql(dialect), _anomaly_row(user_id, category_id, anomaly))
+    stats.add(cents)
+    cursor.execute(_save_sql(dialect), _stats_row(user_id, category_id, stats))
+    return anomaly
+
+
+def expense_deleted(cursor, dialect, user_id, expense_id, category_id=None, cents=None):
+    """Drop a deleted expense's flag and, given its category and amount, its statistics"""
+    cursor.execute(prepare("DELETE FROM spending_anomalies WHERE expense_id = ?", dialect), (expense_id,))
+    if category_id is None:
+        return
+    stats = _load(cursor, dialect, user_id, category_id)
+    stats.remove(cents)
+    cursor.execute(_save_sql(dialect), _stats_row(user_id, category_id, stats))
+
+
+def anomalies(cursor, dialect, user_id, limit=50):
+    """A user's most recent flagged expenses, newest first"""
+    cursor.execute(prepare("""
+        SELECT a.expense_id, a.date, c.name AS category, a.amount_cents, a.mean_cents, a.quantile_cents, a.z_score
+        FROM spending_anomalies a JOIN categories c ON c.id = a.category_id
+        WHERE a.user_id = ? ORDER BY a.date DESC, a.expense_id DESC LIMIT ?
+    """, dialect), (user_id, limit))
+    return [Anomaly.from_row(row) for row in cursor.fetchall()]
+
+
+def rebuild(cursor, dialect, user_id=None):
+    """Recompute statistics and flags by replaying expense history in date order
+
+    Covers the hot table and every archive. Returns the number of expenses flagged.
+    """
+    from archive import archive_tables
+    where, params = "WHERE recurring_id IS NULL", []
+    if user_id is not None:
+        where += " AND user_id = ?"
+        params.append(user_id)
+    branches = [f"SELECT id, user_id, date, category_id, amount_cents FROM {table} {where}"
+                for table in ['expenses'] + archive_tables(cursor, dialect)]
+    cursor.execute(prepare(" UNION ALL ".join(branches) + " ORDER BY user_id, category_id, date, id", dialect),
+                   params * len(branches))
+
+    stats_rows, anomaly_rows = [], []
+    key, stats = None, None
+    while True:
+        rows = cursor.fetchmany(1000)
+        if not rows:
+            break
+        for row in rows:
+            if isinstance(row, dict):
+                row = (row['id'], row['user_id'], row['date'], row['category_id'], row['amount_cents'])
+            expense_id, owner, day, category_id, cents = row
+            if (owner, category_id) != key:
+                if key:
+                    stats_rows.append(_stats_row(*key, stats))
+                key, stats = (owner, category_id), SpendingStats()
+            if stats.is_anomaly(cents):
+                anomaly_rows.append(_anomaly_row(owner, category_id, stats.flag(expense_id, day, None, cents)))
+            stats.add(cents)
+    if key:
+        stats_rows.append(_stats_row(*key, stats))
+
+    scope, scope_params = ("WHERE user_id = ?", (user_id,)) if user_id is not None else ("", ())
+    for table in ('spending_stats', 'spending_anomalies'):
+        cursor.execute(prepare(f"DELETE FROM {table} {scope}", dialect), scope_params)
+    if stats_rows:
+        cursor.executemany(_save_sql(dialect), stats_rows)
+    if anomaly_rows:
+        cursor.executemany(_insert_anomaly_sql(dialect), anomaly_rows)
+    return len(anomaly_rows)
+
+
+def main(argv=None):
+    from repository import ConnectionBackend
+    parser = argparse.ArgumentParser(description="Recompute spending statistics and anomalies from expense history")
+    parser.add_argument('--backend', choices=('mysql', 'sqlite'), default='sqlite')
+    parser.add_argument('--db', default=SQLITE_DB_FILE, help="SQLite database file")
+    parser.add_argument('--user', type=int, help="only this user id")
+    args = parser.parse_args(argv)
+
+    try:
+        backend = ConnectionBackend(connect(args.backend, args.db), args.backend)
+    except Exception as e:
+        print(f"✗ {e}")
+        return 2
+    try:
+        flagged = backend.write(lambda cursor: rebuild(cursor, args.backend, args.user))
+    except Exception as e:
+        print(f"✗ Rebuild failed: {e}")
+        return 1
+    finally:
+        backend.close()
+    print(f"✓ Spending statistics rebuilt; {flagged} expense(s) flagged as unusual")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
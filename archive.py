@@ -0,0 +1,211 @@
+"""
+Expense archival for Smart Budget and Inventory Manager
+Expenses dated before the archive horizon (the first day of the month
+ARCHIVE_HORIZON_MONTHS back) move out of the hot expenses table into one
+table per year, expenses_archive_YYYY. Each year moves in one transaction
+together with its bookkeeping:
+    expense_archives        the archive tables and the dates each holds
+    expense_archive_totals  count and total per (user, month, category)
+All-time reports add the totals instead of scanning archives, and expense
+listings union an archive table only when the requested date range reaches
+the dates it holds (see archive_tables()), so day-to-day queries only touch
+the hot table however many years accumulate.
+
+Functions take an open cursor (or connection) and the dialect ('mysql' or 'sqlite').
+Run `python archive.py [--months N] [--dry-run]`, e.g. monthly from cron.
+"""
+
+import argparse
+import sys
+from datetime import date as Date
+
+from config import ARCHIVE_HORIZON_MONTHS, SQLITE_DB_FILE
+from sql_dialect import prepare, connect
+
+# Columns copied to the archive; archived rows keep their ids
+COLUMNS = "id, user_id, date, category_id, amount_cents, description, recurring_id"
+
+# Shortest horizon allowed: dashboard periods (today .. year to date) stay in the hot table
+MIN_HORIZON_MONTHS = 12
+
+_ADD_TOTALS = {
+    'sqlite': "ON CONFLICT (user_id, month, category_id) DO UPDATE SET "
+              "count = count + excluded.count, total_cents = total_cents + excluded.total_cents",
+    'mysql': "ON DUPLICATE KEY UPDATE count = count + VALUES(count), total_cents = total_cents + VALUES(total_cents)",
+}
+
+
+def archive_table(year):
+    return f"expenses_archive_{int(year):04d}"
+
+
+def horizon(today=None, months=ARCHIVE_HORIZON_MONTHS):
+    """First date kept in the hot table: the first of the month `months` back"""
+    if months < MIN_HORIZON_MONTHS:
+        raise ValueError(f"The archive horizon must be at least {MIN_HORIZON_MONTHS} months")
+    today = today or Date.today()
+    index = today.year * 12 + today.month - 1 - months
+    return Date(index // 12, index % 12 + 1, 1)
+
+
+def archive_tables(cursor, dialect, date_from=None, date_to=None):
+    """Archive tables holding dates within [date_from, date_to] (None is unbounded), oldest first"""
+    query = "SELECT table_name FROM expense_archives WHERE row_count > 0"
+    params = []
+    if date_from:
+        query += " AND last_date >= ?"
+        params.append(str(date_from))
+    if date_to:
+        query += " AND first_date <= ?"
+        params.append(str(date_to))
+    cursor.execute(prepare(query + " ORDER BY first_date", dialect), params)
+    return [row['table_name'] if isinstance(row, dict) else row[0] for row in cursor.fetchall()]
+
+
+def _create_table(cursor, dialect, table):
+    if dialect == 'mysql':
+        cursor.execute(f"CREATE TABLE IF NOT EXISTS {table} LIKE expenses")
+        return
+    from db import EXPENSES_TABLE
+    cursor.execute(EXPENSES_TABLE.replace(" expenses (", f" {table} (", 1))
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_user_date ON {table} (user_id, date)")
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_user_category_date ON {table} (user_id, category_id, date)")
+
+
+def _cursor(connection, dialect):
+    # Tuple rows on both backends; buffered so MySQL allows fetchone() between statements
+    return connection.cursor(buffered=True) if dialect == 'mysql' else connection.cursor()
+
+
+def _begin(connection, dialect):
+    if dialect == 'mysql':
+        connection.start_transaction()
+    else:
+        connection.execute("BEGIN IMMEDIATE")
+
+
+def _move(cursor, dialect, table, first, end):
+    """Move expenses dated in [first, end) into table; returns the number moved"""
+    where = "WHERE date >= ? AND date < ?"
+    cursor.execute(prepare(f"INSERT INTO {table} ({COLUMNS}) SELECT {COLUMNS} FROM expenses {where}", dialect),
+                   (first, end))
+    moved = cursor.rowcount
+    if not moved:
+        return 0
+    cursor.execute(prepare(f"""
+        INSERT INTO expense_archive_totals (user_id, month, category_id, count, total_cents)
+        SELECT user_id, SUBSTR(date, 1, 7), category_id, COUNT(*), SUM(amount_cents)
+        FROM expenses {where}
+        GROUP BY user_id, SUBSTR(date, 1, 7), category_id
+        {_ADD_TOTALS[dialect]}
+    """, dialect), (first, end))
+    cursor.execute("SELECT COALESCE(MAX(seq), 0) FROM change_log")
+    seq = cursor.fetchone()[0]
+    cursor.execute(prepare(f"DELETE FROM expenses {where}", dialect), (first, end))
+    if cursor.rowcount != moved:
+        raise RuntimeError(f"Copied {moved} expenses to {table} but deleted {cursor.rowcount}")
+    # Archived expenses still exist: the deletes the move just logged become 'archive' changes
+    cursor.execute(prepare(f"""
+        UPDATE change_log SET op = 'archive' WHERE seq > ? AND table_name = 'expenses' AND op = 'delete'
+          AND row_id IN (SELECT id FROM {table} {where})
+    """, dialect), (seq, first, end))
+    cursor.execute(prepare(f"""
+        REPLACE INTO expense_archives (table_name, first_date, last_date, row_count)
+        SELECT ?, MIN(date), MAX(date), COUNT(*) FROM {table}
+    """, dialect), (table,))
+    return moved
+
+
+def archive_before(connection, dialect, cutoff, dry_run=False):
+    """Archive every expense dated before cutoff, one transaction per year
+
+    Returns {archive table: expenses moved}. With dry_run nothing changes
+    and the counts are what would move.
+    """
+    cutoff = str(cutoff)
+    cursor = _cursor(connection, dialect)
+    cursor.execute(prepare("SELECT MIN(date) FROM expenses WHERE date < ?", dialect), (cutoff,))
+    oldest = cursor.fetchone()[0]
+    moved = {}
+    if oldest is None:
+        return moved
+    for year in range(int(str(oldest)[:4]), int(cutoff[:4]) + 1):
+        table = archive_table(year)
+        first, end = f"{year:04d}-01-01", min(f"{year + 1:04d}-01-01", cutoff)
+        if first >= end:
+            continue
+        if dry_run:
+            cursor.execute(prepare("SELECT COUNT(*) FROM expenses WHERE date >= ? AND date < ?", dialect), (first, end))
+            count = cursor.fetchone()[0]
+        else:
+            # MySQL commits implicitly around DDL, so the table is created before the transaction
+            _create_table(cursor, dialect, table)
+            _begin(connection, dialect)
+            try:
+                count = _move(cursor, dialect, table, first, end)
+                connection.commit()
+            except Exception:
+                connection.rollback()
+                raise
+        if count:
+            moved[table] = count
+    return moved
+
+
+def delete_archived(cursor, dialect, user_id, expense_id):
+    """Delete an archived expense and take it out of the totals; True if it was found"""
+    from report_cache import bump_version
+    for table in archive_tables(cursor, dialect):
+        cursor.execute(prepare(f"SELECT date, category_id, amount_cents FROM {table} WHERE id = ? AND user_id = ?",
+                               dialect), (expense_id, user_id))
+        row = cursor.fetchone()
+        if row is None:
+            continue
+        day, category_id, cents = (row['date'], row['category_id'], row['amount_cents']) \
+            if isinstance(row, dict) else row
+        cursor.execute(prepare(f"DELETE FROM {table} WHERE id = ?", dialect), (expense_id,))
+        cursor.execute(prepare("""
+            UPDATE expense_archive_totals SET count = count - 1, total_cents = total_cents - ?
+            WHERE user_id = ? AND month = ? AND category_id = ?
+        """, dialect), (cents, user_id, str(day)[:7], category_id))
+        cursor.execute(prepare("UPDATE expense_archives SET row_count = row_count - 1 WHERE table_name = ?",
+                               dialect), (table,))
+        # No triggers on archive tables, so cached reports and the change log are updated here
+        bump_version(cursor, dialect, user_id)
+        cursor.execute(prepare("INSERT INTO change_log (table_name, row_id, user_id, op) VALUES ('expenses', ?, ?, 'delete')",
+                               dialect), (expense_id, user_id))
+        return True
+    return False
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Move old expenses into per-year archive tables")
+    parser.add_argument('--backend', choices=('mysql', 'sqlite'), default='sqlite')
+    parser.add_argument('--db', default=SQLITE_DB_FILE, help="SQLite database file")
+    parser.add_argument('--months', type=int, default=ARCHIVE_HORIZON_MONTHS,
+                        help="keep this many months of expenses in the hot table")
+    parser.add_argument('--dry-run', action='store_true', help="only count what would move")
+    args = parser.parse_args(argv)
+
+    try:
+        cutoff = horizon(months=args.months)
+        connection = connect(args.backend, args.db)
+    except Exception as e:
+        print(f"✗ {e}")
+        return 2
+    try:
+        moved = archive_before(connection, args.backend, cutoff, args.dry_run)
+    except Exception as e:
+        print(f"✗ Archiving failed: {e}")
+        return 1
+    finally:
+        connection.close()
+    verb = "Would move" if args.dry_run else "Moved"
+    for table, count in moved.items():
+        print(f"✓ {verb} {count} expense(s) to {table}")
+    print(f"{verb} {sum(moved.values())} expense(s) dated before {cutoff}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,227 @@
+"""
+Backups for the SQLite database of Smart Budget and Inventory Manager
+Snapshots are taken with SQLite's online backup API, a few pages per step
+with a pause in between, so the GUI can keep reading and writing while a
+large database is copied. Each snapshot is a consistent point-in-time copy,
+gzip-compressed, with a SHA-256 checksum in a sidecar file; only the newest
+BACKUP_KEEP snapshots are kept. Restores verify the checksum and integrity
+first and copy back through the backup API as well.
+
+    python backup.py backup
+    python backup.py list
+    python backup.py verify backups/wizard_test-20240101-120000.db.gz
+    python backup.py restore backups/wizard_test-20240101-120000.db.gz
+"""
+
+import gzip
+import hashlib
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from config import (SQLITE_DB_FILE, SQLITE_BUSY_TIMEOUT_MS, BACKUP_DIR, BACKUP_KEEP,
+                    BACKUP_PAGES_PER_STEP, BACKUP_STEP_PAUSE)
+
+SUFFIX = '.db.gz'
+CHECKSUM_SUFFIX = '.sha256'
+_CHUNK = 1024 * 1024
+
+
+class BackupError(Exception):
+    """A snapshot is missing, corrupt or failed verification"""
+
+
+def _connect(path):
+    return sqlite3.connect(path, timeout=SQLITE_BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+
+
+def _online_copy(source, target, pages, pause):
+    """Copy source into target `pages` at a time, pausing between steps"""
+    def progress(status, remaining, total):
+        if remaining and pause:
+            time.sleep(pause)
+    source.backup(target, pages=pages, progress=progress)
+
+
+def _snapshot_copy(source, target, pages, pause):
+    """Online copy of one point in time
+
+    The source holds a read transaction for the whole copy. In WAL mode that
+    pins its snapshot without blocking writers; without it every commit from
+    another connection would restart the backup from the first page.
+    """
+    source.execute("BEGIN")
+    try:
+        source.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+        _online_copy(source, target, pages, pause)
+    finally:
+        source.execute("COMMIT")
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_CHUNK), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _check_integrity(path):
+    connection = sqlite3.connect(path)
+    try:
+        result = connection.execute("PRAGMA quick_check").fetchone()[0]
+    finally:
+        connection.close()
+    if result != 'ok':
+        raise BackupError(f"Integrity check failed: {result}")
+
+
+def list_backups(backup_dir=BACKUP_DIR, db_file=SQLITE_DB_FILE):
+    """Snapshot paths for db_file, newest first"""
+    if not os.path.isdir(backup_dir):
+        return []
+    prefix = os.path.splitext(os.path.basename(db_file))[0] + '-'
+    names = [name for name in os.listdir(backup_dir) if name.startswith(prefix) and name.endswith(SUFFIX)]
+    return [os.path.join(backup_dir, name) for name in sorted(names, reverse=True)]
+
+
+def rotate(backup_dir=BACKUP_DIR, db_file=SQLITE_DB_FILE, keep=BACKUP_KEEP):
+    """Delete all but the newest `keep` snapshots; returns the removed paths"""
+    removed = list_backups(backup_dir, db_file)[keep:]
+    for path in removed:
+        for file in (path, path + CHECKSUM_SUFFIX):
+            if os.path.exists(file):
+                os.remove(file)
+    return removed
+
+
+def create_backup(db_file=SQLITE_DB_FILE, backup_dir=BACKUP_DIR, pages=BACKUP_PAGES_PER_STEP,
+                  pause=BACKUP_STEP_PAUSE, keep=BACKUP_KEEP):
+    """Take a compressed, checksummed snapshot of db_file; returns its path"""
+    if not os.path.exists(db_file):
+        raise BackupError(f"Database not found: {db_file}")
+    os.makedirs(backup_dir, exist_ok=True)
+    # Microseconds keep two snapshots taken in the same second apart
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+    path = os.path.join(backup_dir, f"{os.path.splitext(os.path.basename(db_file))[0]}-{stamp}{SUFFIX}")
+
+    fd, raw_path = tempfile.mkstemp(suffix='.db', dir=backup_dir)
+    os.close(fd)
+    try:
+        source = _connect(db_file)
+        target = sqlite3.connect(raw_path)
+        try:
+            _snapshot_copy(source, target, pages, pause)
+        finally:
+            target.close()
+            source.close()
+        _check_integrity(raw_path)
+
+        with open(raw_path, 'rb') as raw, gzip.open(path + '.tmp', 'wb') as compressed:
+            shutil.copyfileobj(raw, compressed, _CHUNK)
+        os.replace(path + '.tmp', path)
+        with open(path + CHECKSUM_SUFFIX, 'w') as f:
+            f.write(f"{_sha256(path)}  {os.path.basename(path)}\n")
+    finally:
+        for leftover in (raw_path, path + '.tmp'):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+
+    rotate(backup_dir, db_file, keep)
+    return path
+
+
+def _extract(path, directory=None):
+    """Decompress a snapshot to a temporary file and return its path"""
+    fd, raw_path = tempfile.mkstemp(suffix='.db', dir=directory)
+    os.close(fd)
+    try:
+        with gzip.open(path, 'rb') as compressed, open(raw_path, 'wb') as raw:
+            shutil.copyfileobj(compressed, raw, _CHUNK)
+    except Exception:
+        os.remove(raw_path)
+        raise
+    return raw_path
+
+
+def verify_backup(path, deep=False):
+    """Raise BackupError unless the snapshot matches its recorded checksum
+
+    With deep=True the snapshot is also decompressed and integrity-checked.
+    """
+    checksum_file = path + CHECKSUM_SUFFIX
+    if not os.path.exists(path) or not os.path.exists(checksum_file):
+        raise BackupError(f"Snapshot or checksum missing: {path}")
+    with open(checksum_file) as f:
+        expected = f.read().split()[0]
+    if _sha256(path) != expected:
+        raise BackupError(f"Checksum mismatch: {path}")
+    if deep:
+        raw_path = _extract(path)
+        try:
+            _check_integrity(raw_path)
+        finally:
+            os.remove(raw_path)
+
+
+def restore_backup(path, db_file=SQLITE_DB_FILE, pages=BACKUP_PAGES_PER_STEP):
+    """Replace the contents of db_file with a verified snapshot
+
+    The copy goes through the backup API into the live database, so open
+    connections see either the old or the restored data, never a torn file.
+    """
+    verify_backup(path)
+    raw_path = _extract(path, os.path.dirname(os.path.abspath(db_file)))
+    try:
+        _check_integrity(raw_path)
+        source = sqlite3.connect(raw_path)
+        target = _connect(db_file)
+        try:
+            _online_copy(source, target, pages, 0)
+        finally:
+            target.close()
+            source.close()
+    finally:
+        os.remove(raw_path)
+
+
+def main(argv):
+    usage = "Usage: python backup.py backup | list | verify <snapshot> | restore <snapshot>"
+    if not argv or argv[0] not in ('backup', 'list', 'verify', 'restore') or \
+            (argv[0] in ('verify', 'restore') and len(argv) != 2):
+        print(usage)
+        return 2
+    command = argv[0]
+    try:
+        if command == 'backup':
+            started = time.perf_counter()
+            path = create_backup()
+            print(f"✓ Backed up {SQLITE_DB_FILE} to {path} in {time.perf_counter() - started:.1f}s")
+        elif command == 'list':
+            backups = list_backups()
+            if not backups:
+                print("No backups found.")
+            for path in backups:
+                print(f"{path}  ({os.path.getsize(path) / 1024:.0f} KB)")
+        elif command == 'verify':
+            verify_backup(argv[1], deep=True)
+            print(f"✓ {argv[1]} is intact")
+        else:
+            confirm = input(f"Replace the contents of {SQLITE_DB_FILE} with {argv[1]}? (y/n): ").lower()
+            if confirm != 'y':
+                print("Restore cancelled.")
+                return 1
+            restore_backup(argv[1])
+            print(f"✓ Restored {SQLITE_DB_FILE} from {argv[1]}")
+        return 0
+    except (BackupError, OSError, sqlite3.Error) as e:
+        print(f"✗ {e}")
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,182 @@
+"""
+Headless batch report rendering for Smart Budget and Inventory Manager
+Renders every user's category breakdown, monthly spending and inventory
+report to PNG/SVG/HTML files without a display. Charts are drawn on plain
+matplotlib Figures with the Agg canvas (no pyplot state, no Tk), and users
+are spread across a process pool whose workers each open one database
+connection when they start.
+
+    python batch_reports.py --out reports_out --formats png,svg,html --workers 8
+"""
+
+import argparse
+import html
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date as Date
+
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from config import SQLITE_DB_FILE
+from models import Money
+from report_data import category_totals, monthly_totals, inventory
+from sql_dialect import connect, read_snapshot
+
+FORMATS = ('png', 'svg', 'html')
+
+# Per-process state set up by _init_worker
+_connection = None
+_dialect = None
+
+
+def _init_worker(backend, db_file):
+    global _connection, _dialect
+    _connection = connect(backend, db_file, read_only=True)
+    _dialect = backend
+
+
+def _save(figure, path_base, formats):
+    FigureCanvasAgg(figure)
+    paths = []
+    for fmt in formats:
+        if fmt in ('png', 'svg'):
+            path = f"{path_base}.{fmt}"
+            figure.savefig(path, format=fmt)
+            paths.append(path)
+    return paths
+
+
+def category_chart(totals):
+    figure = Figure(figsize=(8, 6))
+    ax = figure.add_subplot()
+    ax.pie([float(total) for _, total in totals], labels=[category for category, _ in totals], autopct='%1.1f%%')
+    ax.set_title('Expense Breakdown by Category')
+    return figure
+
+
+def monthly_chart(months):
+    figure = Figure(figsize=(10, 6))
+    ax = figure.add_subplot()
+    ax.bar([start.strftime("%b %Y") for start, _ in months], [float(total) for _, total in months])
+    ax.set_title('Monthly Spending')
+    ax.set_ylabel('Amount ($)')
+    ax.tick_params(axis='x', labelrotation=45)
+    figure.tight_layout()
+    return figure
+
+
+def _html_page(username, today, charts, products):
+    """HTML report embedding the chart files and the inventory table"""
+    rows = "\n".join(
+        f"<tr><td>{html.escape(p.name)}</td><td>{html.escape(p.category)}</td>"
+        f"<td>${p.price:.2f}</td><td>{p.stock}</td><td>${p.value:.2f}</td></tr>"
+        for p in products
+    )
+    total = sum((p.value for p in products), Money(0))
+    images = "\n".join(f'<h2>{html.escape(title)}</h2><img src="{html.escape(src)}" alt="{html.escape(title)}">'
+                       for title, src in charts)
+    return f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Reports for {html.escape(username)}</title></head>
+<body>
+<h1>Reports for {html.escape(username)} ({today})</h1>
+{images}
+<h2>Product Inventory</h2>
+<table border="1" cellpadding="4">
+<tr><th>Name</th><th>Category</th><th>Price</th><th>Stock</th><th>Total Value</th></tr>
+{rows}
+</table>
+<p><strong>Total Inventory Value: ${total:.2f}</strong></p>
+</body></html>
+"""
+
+
+def render_user(connection, dialect, user_id, username, out_dir, formats=FORMATS, today=None):
+    """Write one user's report files into out_dir; returns the paths written"""
+    today = today or Date.today()
+    os.makedirs(out_dir, exist_ok=True)
+    with read_snapshot(connection, dialect) as cursor:
+        totals = category_totals(cursor, dialect, user_id)
+        months = monthly_totals(cursor, dialect, user_id, today)
+        products = inventory(cursor, dialect, user_id)
+
+    paths = []
+    charts = []
+    image_format = 'png' if 'png' in formats else 'svg' if 'svg' in formats else None
+    for name, title, data, draw in (('category_breakdown', 'Expense Breakdown by Category', totals, category_chart),
+                                    ('monthly_spending', 'Monthly Spending', months, monthly_chart)):
+        if not any(total for _, total in data):
+            continue
+        chart_paths = _save(draw(data), os.path.join(out_dir, name), formats)
+        paths.extend(chart_paths)
+        if image_format:
+            charts.append((title, f"{name}.{image_format}"))
+
+    if 'html' in formats:
+        path = os.path.join(out_dir, 'index.html')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(_html_page(username, today, charts, products))
+        paths.append(path)
+    return paths
+
+
+def _render_job(job):
+    """Worker entry point: (user_id, username, out_dir, formats) -> (user_id, file count, error)"""
+    user_id, username, out_dir, formats = job
+    try:
+        return user_id, len(render_user(_connection, _dialect, user_id, username, out_dir, formats)), None
+    except Exception as e:
+        return user_id, 0, str(e)
+
+
+def _user_dir(out_root, user_id, username):
+    return os.path.join(out_root, f"{user_id}_{re.sub(r'[^A-Za-z0-9_.-]', '_', username)}")
+
+
+def render_all(out_root, formats=FORMATS, workers=None, backend='sqlite', db_file=SQLITE_DB_FILE):
+    """Render reports for every user across a process pool; returns (rendered, failed) counts"""
+    connection = connect(backend, db_file, read_only=True)
+    with read_snapshot(connection, backend) as cursor:
+        cursor.execute("SELECT id, username FROM users ORDER BY id")
+        users = [(row['id'], row['username']) if isinstance(row, dict) else tuple(row) for row in cursor.fetchall()]
+    connection.close()
+
+    jobs = [(user_id, username, _user_dir(out_root, user_id, username), tuple(formats))
+            for user_id, username in users]
+    workers = workers or os.cpu_count() or 1
+    rendered = failed = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(backend, db_file)) as pool:
+        for user_id, count, error in pool.map(_render_job, jobs, chunksize=max(1, len(jobs) // (workers * 4))):
+            if error:
+                failed += 1
+                print(f"✗ User {user_id}: {error}")
+            else:
+                rendered += 1
+    return rendered, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render every user's reports to files")
+    parser.add_argument('--out', default='reports_out', help="output directory (default: reports_out)")
+    parser.add_argument('--formats', default=','.join(FORMATS), help="comma-separated: png, svg, html")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument('--backend', choices=('sqlite', 'mysql'), default='sqlite')
+    parser.add_argument('--db', default=SQLITE_DB_FILE, help="SQLite database file")
+    args = parser.parse_args()
+
+    formats = [fmt.strip().lower() for fmt in args.formats.split(',') if fmt.strip()]
+    unknown = set(formats) - set(FORMATS)
+    if unknown:
+        parser.error(f"unknown format(s): {', '.join(sorted(unknown))}")
+
+    started = time.perf_counter()
+    rendered, failed = render_all(args.out, formats, args.workers, args.backend, args.db)
+    print(f"✓ Rendered reports for {rendered} user(s) in {time.perf_counter() - started:.1f}s"
+          + (f"; {failed} failed" if failed else ""))
+
+
+if __name__ == "__main__":
+    main()
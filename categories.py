@@ -0,0 +1,90 @@
+"""
+Categories for Smart Budget and Inventory Manager
+Each user has their own categories table; expenses, products and recurring
+templates reference it by integer id. Names are unique per user ignoring
+case (NOCASE on SQLite, the column collation on MySQL), so 'food' and
+'Food' are one category.
+
+Writes look ids up through a CategoryCache. Categories are never renamed
+or deleted, so an id stays valid for the life of the process once seen.
+
+Functions take an open cursor and the dialect ('mysql' or 'sqlite').
+"""
+
+import threading
+
+from sql_dialect import prepare, insert_ignore
+
+MAX_NAME_LENGTH = 50
+
+# Offered by both frontends; any other name can be typed and is created on first use
+EXPENSE_CATEGORIES = ['Food', 'Travel', 'Shopping', 'Bills', 'Entertainment', 'Other']
+PRODUCT_CATEGORIES = ['Electronics', 'Groceries', 'Clothing', 'Books', 'Other']
+
+
+def normalize(name):
+    """Category name as stored: surrounding whitespace removed, length checked"""
+    name = (name or '').strip()
+    if not name:
+        raise ValueError("Category cannot be empty")
+    if len(name) > MAX_NAME_LENGTH:
+        raise ValueError(f"Category cannot be longer than {MAX_NAME_LENGTH} characters")
+    return name
+
+
+def _find(cursor, dialect, user_id, name):
+    cursor.execute(prepare("SELECT id, name FROM categories WHERE user_id = ? AND name = ?", dialect),
+                   (user_id, name))
+    row = cursor.fetchone()
+    if row is None:
+        return None
+    return (row['id'], row['name']) if isinstance(row, dict) else tuple(row)
+
+
+def get_or_create(cursor, dialect, user_id, name):
+    """(id, stored name) of a user's category, creating it if needed"""
+    name = normalize(name)
+    found = _find(cursor, dialect, user_id, name)
+    if found is None:
+        # INSERT IGNORE: another connection may create the same category first
+        cursor.execute(prepare(f"{insert_ignore(dialect)} INTO categories (user_id, name) VALUES (?, ?)",
+                               dialect), (user_id, name))
+        found = _find(cursor, dialect, user_id, name)
+    return found
+
+
+def choices(defaults, used):
+    """defaults followed by the names in used that are not among them (ignoring case)"""
+    seen = {name.casefold() for name in defaults}
+    extra = sorted((name for name in used if name.casefold() not in seen), key=str.casefold)
+    return list(defaults) + extra
+
+
+class CategoryCache:
+    """(user_id, name) -> (id, stored name) for one database
+
+    A write that creates a category and then fails leaves an id behind that
+    was never committed; call forget(user_id) when a write fails.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def resolve(self, cursor, dialect, user_id, name):
+        """(id, stored name) of a category, from the cache or the database"""
+        key = (user_id, normalize(name).casefold())
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = get_or_create(cursor, dialect, user_id, name)
+            with self._lock:
+                self._entries[key] = entry
+        return entry
+
+    def category_id(self, cursor, dialect, user_id, name):
+        return self.resolve(cursor, dialect, user_id, name)[0]
+
+    def forget(self, user_id):
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == user_id]:
+                del self._entries[key]
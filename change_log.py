@@ -0,0 +1,198 @@
+"""
+Change capture for Smart Budget and Inventory Manager
+Triggers on expenses and products append a change_log row for every insert,
+update and delete: (seq, table_name, row_id, user_id, op, changed_at). seq
+only grows, so a consumer keeps the last seq it has handled and reads on
+from there instead of rescanning the tables. A change names the row, not
+its values; consumers read the row's current state (an update to a row
+that is gone is followed by its delete). op is 'insert', 'update',
+'delete' or 'archive': the expense moved to an archive table (see
+archive.py) and still exists.
+
+Consumers are registered by name in change_consumers with their position.
+A new consumer starts at the end of the log, so take a full copy first.
+compact() deletes the entries every consumer has read.
+
+On MySQL a seq is handed out before its transaction commits, so a lower seq
+can become visible after a higher one. read_changes() stops at such a gap
+until the change after it is CHANGE_GAP_TIMEOUT seconds old (by then the
+gap is a rolled-back insert), so no committed change is ever skipped.
+
+    python change_log.py read NAME [--batch N]   print new changes as JSON lines
+    python change_log.py status
+    python change_log.py compact
+
+Functions take an open cursor and the dialect ('mysql' or 'sqlite').
+"""
+
+import argparse
+import json
+import sys
+from datetime import datetime, timedelta
+
+from config import CHANGE_BATCH_SIZE, CHANGE_GAP_TIMEOUT, SQLITE_DB_FILE
+from sql_dialect import prepare, insert_ignore, connect
+
+class Change:
+    """One change_log entry"""
+    __slots__ = ('seq', 'table', 'row_id', 'user_id', 'op', 'changed_at')
+
+    def __init__(self, seq, table, row_id, user_id, op, changed_at):
+        self.seq = seq
+        self.table = table
+        self.row_id = row_id
+        self.user_id = user_id
+        self.op = op
+        self.changed_at = str(changed_at)
+
+    @classmethod
+    def from_row(cls, row):
+        if isinstance(row, dict):
+            row = (row['seq'], row['table_name'], row['row_id'], row['user_id'], row['op'], row['changed_at'])
+        return cls(*row)
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self):
+        return f"Change(seq={self.seq}, {self.op} {self.table} {self.row_id})"
+
+
+def _cursor(connection, dialect):
+    # Buffered on MySQL so single-row reads never leave unread results behind
+    return connection.cursor(buffered=True) if dialect == 'mysql' else connection.cursor()
+
+
+def _value(cursor, query, params, dialect):
+    cursor.execute(prepare(query, dialect), params)
+    row = cursor.fetchone()
+    if row is None:
+        return None
+    return next(iter(row.values())) if isinstance(row, dict) else row[0]
+
+
+def _timestamp(value):
+    return datetime.strptime(str(value)[:19], "%Y-%m-%d %H:%M:%S")
+
+
+def last_seq(cursor, dialect):
+    """Newest seq in the log (0 if it is empty)"""
+    return _value(cursor, "SELECT COALESCE(MAX(seq), 0) FROM change_log", (), dialect)
+
+
+def register(cursor, dialect, name):
+    """Position of a consumer, registering it at the end of the log if it is new"""
+    cursor.execute(prepare(f"{insert_ignore(dialect)} INTO change_consumers (name, last_seq) VALUES (?, ?)",
+                           dialect), (name, last_seq(cursor, dialect)))
+    return _value(cursor, "SELECT last_seq FROM change_consumers WHERE name = ?", (name,), dialect)
+
+
+def acknowledge(cursor, dialect, name, seq):
+    """Move a consumer's position forward to seq (handled everything up to it)"""
+    cursor.execute(prepare("UPDATE change_consumers SET last_seq = ? WHERE name = ? AND last_seq < ?", dialect),
+                   (seq, name, seq))
+
+
+def read_changes(cursor, dialect, after, limit=CHANGE_BATCH_SIZE):
+    """Up to limit changes with seq > after, oldest first, stopping at a recent gap"""
+    cursor.execute(prepare("""
+        SELECT seq, table_name, row_id, user_id, op, changed_at FROM change_log
+        WHERE seq > ? ORDER BY seq LIMIT ?
+    """, dialect), (after, limit))
+    changes = [Change.from_row(row) for row in cursor.fetchall()]
+    expected = after + 1
+    for i, change in enumerate(changes):
+        if change.seq != expected:
+            now = _timestamp(_value(cursor, "SELECT CURRENT_TIMESTAMP", (), dialect))
+            if _timestamp(change.changed_at) > now - timedelta(seconds=CHANGE_GAP_TIMEOUT):
+                return changes[:i]
+        expected = change.seq + 1
+    return changes
+
+
+def consume(connection, dialect, name, batch_size=CHANGE_BATCH_SIZE):
+    """Yield a consumer's new changes in batches
+
+    A batch is acknowledged (and committed) when the next one is requested
+    or the loop ends normally, so a consumer that fails mid-batch sees that
+    batch again next time: delivery is at least once.
+    """
+    cursor = _cursor(connection, dialect)
+    try:
+        position = register(cursor, dialect, name)
+        connection.commit()
+        while True:
+            changes = read_changes(cursor, dialect, position, batch_size)
+            if not changes:
+                return
+            yield changes
+            position = changes[-1].seq
+            acknowledge(cursor, dialect, name, position)
+            connection.commit()
+    finally:
+        cursor.close()
+
+
+def compact(cursor, dialect):
+    """Delete the entries every consumer has read; returns how many
+
+    The newest entry is always kept so seq carries on from it after a restart.
+    """
+    newest = last_seq(cursor, dialect)
+    read_by_all = _value(cursor, "SELECT MIN(last_seq) FROM change_consumers", (), dialect)
+    upto = newest - 1 if read_by_all is None else min(read_by_all, newest - 1)
+    cursor.execute(prepare("DELETE FROM change_log WHERE seq <= ?", dialect), (upto,))
+    return cursor.rowcount
+
+
+def status(cursor, dialect):
+    """{'entries', 'last_seq', 'consumers': {name: changes not yet read}}"""
+    newest = last_seq(cursor, dialect)
+    cursor.execute(prepare("SELECT name, last_seq FROM change_consumers ORDER BY name", dialect))
+    consumers = [(row['name'], row['last_seq']) if isinstance(row, dict) else row for row in cursor.fetchall()]
+    return {
+        'entries': _value(cursor, "SELECT COUNT(*) FROM change_log", (), dialect),
+        'last_seq': newest,
+        'consumers': {name: newest - seq for name, seq in consumers},
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Read or maintain the expense and product change log")
+    parser.add_argument('command', choices=('read', 'status', 'compact'))
+    parser.add_argument('name', nargs='?', help="consumer name (for read)")
+    parser.add_argument('--batch', type=int, default=CHANGE_BATCH_SIZE, help="changes per batch")
+    parser.add_argument('--backend', choices=('mysql', 'sqlite'), default='sqlite')
+    parser.add_argument('--db', default=SQLITE_DB_FILE, help="SQLite database file")
+    args = parser.parse_args(argv)
+    if args.command == 'read' and not args.name:
+        parser.error("read needs a consumer name")
+
+    try:
+        connection = connect(args.backend, args.db)
+    except Exception as e:
+        print(f"✗ {e}")
+        return 2
+    try:
+        if args.command == 'read':
+            for changes in consume(connection, args.backend, args.name, args.batch):
+                for change in changes:
+                    print(json.dumps(change.as_dict()))
+        else:
+            cursor = _cursor(connection, args.backend)
+            if args.command == 'status':
+                print(json.dumps(status(cursor, args.backend), indent=2))
+            else:
+                deleted = compact(cursor, args.backend)
+                connection.commit()
+                print(f"✓ Removed {deleted} change(s) read by every consumer")
+        return 0
+    except Exception as e:
+        print(f"✗ {e}")
+        return 1
+    finally:
+        connection.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,367 @@
+"""
+Scriptable command-line interface for Smart Budget and Inventory Manager
+A non-interactive companion to the menu-driven main.py: every action is a
+subcommand with arguments and prints JSON (or CSV) for piping.
+
+    python cli.py --user alice expenses add --category Food --amount 12.50
+    python cli.py --user alice --format csv expenses list --from 2024-01-01
+    python cli.py --user alice batch < commands.txt
+
+The password is read from the SMART_BUDGET_PASSWORD environment variable
+(or --password). `batch` reads one command per line from stdin and runs them
+all over a single connection and login, printing one JSON object per line.
+Only the selected backend's driver is imported, so a command starts fast.
+"""
+
+import argparse
+import csv
+import json
+import os
+import shlex
+import sys
+from datetime import date as Date
+
+from models import Money
+from repository import Repository, ConnectionBackend, NotFound
+from sql_dialect import connect
+
+PASSWORD_ENV = 'SMART_BUDGET_PASSWORD'
+
+
+class CommandError(Exception):
+    """A command could not be carried out (bad input, unknown id, ...)"""
+
+
+class Session:
+    """One connection and logged-in user shared by every command in a run"""
+
+    def __init__(self, dialect, db_file=None):
+        self.dialect = dialect
+        self.repo = Repository(ConnectionBackend(connect(dialect, db_file), dialect))
+        self.user_id = None
+
+    def login(self, username, password):
+        self.user_id = self.repo.login(username, password)
+        if self.user_id is None:
+            raise CommandError("Invalid username or password")
+
+    def close(self):
+        self.repo.backend.close()
+
+
+# --- Record conversion ---
+def _expense(expense):
+    return {'id': expense.id, 'date': expense.date, 'category': expense.category,
+            'amount': str(expense.amount), 'description': expense.description}
+
+
+def _anomaly(anomaly):
+    return {'expense_id': anomaly.expense_id, 'date': anomaly.date, 'category': anomaly.category,
+            'amount': str(anomaly.amount), 'usual': str(anomaly.usual),
+            'recent_quantile': str(Money(anomaly.quantile_cents)), 'z_score': anomaly.z_score}
+
+
+def _product(product):
+    return {'id': product.id, 'name': product.name, 'category': product.category,
+            'price': str(product.price), 'stock': product.stock, 'value': str(product.value)}
+
+
+def _parse_money(text):
+    try:
+        amount = Money.parse(text)
+    except ValueError:
+        raise CommandError(f"Invalid amount: {text!r}")
+    if amount.cents <= 0:
+        raise CommandError("Amounts must be positive")
+    return amount
+
+
+def _parse_date(text):
+    try:
+        return Date.fromisoformat(text).isoformat()
+    except ValueError:
+        raise CommandError(f"Invalid date {text!r}; use YYYY-MM-DD")
+
+
+# --- Commands (each returns a dict or a list of dicts) ---
+def expenses_add(session, args):
+    amount = _parse_money(args.amount)
+    date = _parse_date(args.date) if args.date else Date.today().isoformat()
+    description = args.description or f"{args.category} expense"
+    expense, anomaly = session.repo.add_expense(session.user_id, date, args.category, amount, description)
+    return dict(_expense(expense), unusual=anomaly is not None)
+
+
+def expenses_list(session, args):
+    from expense_query import ExpenseFilter
+    expense_filter = ExpenseFilter(
+        session.user_id,
+        categories=args.category,
+        date_from=_parse_date(args.date_from) if args.date_from else None,
+        date_to=_parse_date(args.date_to) if args.date_to else None,
+        min_amount=_parse_money(args.min) if args.min else None,
+        max_amount=_parse_money(args.max) if args.max else None,
+        text=args.text,
+        sort=args.sort,
+        descending=not args.asc,
+        limit=args.limit,
+    )
+    return [_expense(expense) for expense, _, _ in session.repo.iter_expenses(expense_filter)]
+
+
+def expenses_delete(session, args):
+    if not session.repo.delete_expense(session.user_id, args.id):
+        raise CommandError(f"No expense with id {args.id}")
+    return {'id': args.id, 'deleted': True}
+
+
+def products_add(session, args):
+    price = _parse_money(args.price)
+    if args.stock < 0:
+        raise CommandError("Stock cannot be negative")
+    return _product(session.repo.add_product(session.user_id, args.name, args.category, price, args.stock))
+
+
+def products_list(session, args):
+    return [_product(product) for product in session.repo.products(session.user_id)]
+
+
+def products_purchase(session, args):
+    from stock_ledger import InsufficientStock
+    if args.quantity < 1:
+        raise CommandError("Quantity must be at least 1")
+    try:
+        product, total_cost, stock, anomaly = session.repo.purchase(session.user_id, args.id, args.quantity)
+    except NotFound as e:
+        raise CommandError(str(e))
+    except InsufficientStock:
+        product = session.repo.get_product(session.user_id, args.id)
+        raise CommandError(f"Not enough stock of {product.name} (have {product.stock})")
+    return {'id': product.id, 'name': product.name, 'quantity': args.quantity,
+            'total': str(total_cost), 'stock': stock, 'unusual': anomaly is not None}
+
+
+def products_receive(session, args):
+    if args.quantity < 1:
+        raise CommandError("Quantity must be at least 1")
+    try:
+        product = session.repo.get_product(session.user_id, args.id)
+        stock = session.repo.receive_stock(session.user_id, args.id, args.quantity, args.note or "Stock received")
+    except NotFound as e:
+        raise CommandError(str(e))
+    return {'id': product.id, 'name': product.name, 'quantity': args.quantity, 'stock': stock}
+
+
+def reports_monthly(session, args):
+    year_month = args.month or Date.today().strftime("%Y-%m")
+    try:
+        count, total = session.repo.monthly_total(session.user_id, year_month)
+    except ValueError:
+        raise CommandError(f"Invalid month {year_month!r}; use YYYY-MM")
+    return {'month': year_month, 'count': count, 'total': str(total)}
+
+
+def reports_summary(session, args):
+    from dashboard import PERIODS
+    summary = session.repo.dashboard(session.user_id)
+    result = {'total': str(summary['total']), 'count': summary['count']}
+    for period in PERIODS:
+        result[period] = str(summary[period])
+        result[f"{period}_count"] = summary[f"{period}_count"]
+    top = summary['top_category']
+    result.update({'average': str(summary['average']), 'daily_average': str(summary['daily_average']),
+                   'top_category': top[0] if top else None, 'top_category_total': str(top[1]) if top else None,
+                   'query_ms': round(summary['query_ms'], 3)})
+    return result
+
+
+def reports_low_stock(session, args):
+    return [_product(product) for product in session.repo.low_stock(session.user_id, args.threshold)]
+
+
+def reports_inventory_value(session, args):
+    return {'total_value': str(session.repo.inventory_value(session.user_id))}
+
+
+def reports_anomalies(session, args):
+    return [_anomaly(anomaly) for anomaly in session.repo.anomalies(session.user_id, args.limit)]
+
+
+def reports_stock_forecast(session, args):
+    return [{'id': f.product.id, 'name': f.product.name, 'stock': f.product.stock,
+             'units_per_day': round(f.units_per_day, 3),
+             'days_left': None if f.days_left is None else round(f.days_left, 1),
+             'stockout_date': f.stockout_date} for f in session.repo.stock_forecast(session.user_id)]
+
+
+def reports_spend_forecast(session, args):
+    return [{'category': category, 'spent': str(spent), 'projected': str(projected)}
+            for category, spent, projected in session.repo.spend_forecast(session.user_id)['categories']]
+
+
+def recurring_run(session, args):
+    return {'created': session.repo.materialize_recurring(session.user_id)}
+
+
+# --- Argument parsing ---
+def build_command_parser(parser):
+    """Add the resource/action subcommands to parser"""
+    resources = parser.add_subparsers(dest='resource', metavar='RESOURCE')
+    resources.required = True
+
+    expenses = resources.add_parser('expenses', help="add, list or delete expenses").add_subparsers(dest='action')
+    expenses.required = True
+    add = expenses.add_parser('add')
+    add.add_argument('--category', required=True)
+    add.add_argument('--amount', required=True)
+    add.add_argument('--date', help="YYYY-MM-DD (default: today)")
+    add.add_argument('--description')
+    add.set_defaults(handler=expenses_add)
+    listing = expenses.add_parser('list')
+    listing.add_argument('--category', action='append', help="repeat for several categories")
+    listing.add_argument('--from', dest='date_from')
+    listing.add_argument('--to', dest='date_to')
+    listing.add_argument('--min')
+    listing.add_argument('--max')
+    listing.add_argument('--text', help="description contains")
+    listing.add_argument('--sort', default='date', choices=('date', 'amount', 'category', 'description'))
+    listing.add_argument('--asc', action='store_true')
+    listing.add_argument('--limit', type=int)
+    listing.set_defaults(handler=expenses_list)
+    delete = expenses.add_parser('delete')
+    delete.add_argument('id', type=int)
+    delete.set_defaults(handler=expenses_delete)
+
+    products = resources.add_parser('products', help="add, list, purchase or receive products").add_subparsers(dest='action')
+    products.required = True
+    add = products.add_parser('add')
+    add.add_argument('--name', required=True)
+    add.add_argument('--category', required=True)
+    add.add_argument('--price', required=True)
+    add.add_argument('--stock', type=int, default=0)
+    add.set_defaults(handler=products_add)
+    products.add_parser('list').set_defaults(handler=products_list)
+    for name, handler in (('purchase', products_purchase), ('receive', products_receive)):
+        action = products.add_parser(name)
+        action.add_argument('id', type=int)
+        action.add_argument('--quantity', type=int, required=True)
+        if name == 'receive':
+            action.add_argument('--note')
+        action.set_defaults(handler=handler)
+
+    reports = resources.add_parser('reports', help="monthly, summary, low-stock, inventory-value, anomalies, stock-forecast, spend-forecast").add_subparsers(dest='action')
+    reports.required = True
+    monthly = reports.add_parser('monthly')
+    monthly.add_argument('--month', help="YYYY-MM (default: this month)")
+    monthly.set_defaults(handler=reports_monthly)
+    reports.add_parser('summary').set_defaults(handler=reports_summary)
+    low_stock = reports.add_parser('low-stock')
+    low_stock.add_argument('--threshold', type=int, default=5)
+    low_stock.set_defaults(handler=reports_low_stock)
+    reports.add_parser('inventory-value').set_defaults(handler=reports_inventory_value)
+    anomalies = reports.add_parser('anomalies', help="unusually high expenses, newest first")
+    anomalies.add_argument('--limit', type=int, default=50)
+    anomalies.set_defaults(handler=reports_anomalies)
+    reports.add_parser('stock-forecast', help="days until each product runs out").set_defaults(
+        handler=reports_stock_forecast)
+    reports.add_parser('spend-forecast', help="this month's spend projected to month end").set_defaults(
+        handler=reports_spend_forecast)
+
+    recurring = resources.add_parser('recurring', help="add recurring expenses that are due").add_subparsers(dest='action')
+    recurring.required = True
+    recurring.add_parser('run').set_defaults(handler=recurring_run)
+
+    resources.add_parser('batch', help="run one command per line from stdin")
+
+
+class _ArgumentError(Exception):
+    pass
+
+
+class _CommandParser(argparse.ArgumentParser):
+    """Parser for batch lines: raises instead of exiting"""
+
+    def error(self, message):
+        raise _ArgumentError(message)
+
+    def exit(self, status=0, message=None):
+        raise _ArgumentError((message or "help is not available in batch mode").strip())
+
+
+# --- Output ---
+def write_output(result, fmt, out=sys.stdout):
+    if fmt == 'json':
+        json.dump(result, out, indent=2)
+        out.write("\n")
+        return
+    rows = result if isinstance(result, list) else [result]
+    if not rows:
+        return
+    writer = csv.DictWriter(out, fieldnames=list(rows[0]))
+    writer.writeheader()
+    writer.writerows(rows)
+
+
+def run_batch(session, lines, out=sys.stdout):
+    """Run each non-empty, non-comment line as a command; returns the number that failed"""
+    parser = _CommandParser(prog='batch', add_help=False)
+    build_command_parser(parser)
+    failed = 0
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        record = {'line': number, 'command': line}
+        try:
+            args = parser.parse_args(shlex.split(line))
+            if args.resource == 'batch':
+                raise _ArgumentError("batch cannot be nested")
+            record.update(ok=True, result=args.handler(session, args))
+        except (_ArgumentError, CommandError, ValueError) as e:
+            record.update(ok=False, error=str(e))
+        except Exception as e:
+            record.update(ok=False, error=f"{type(e).__name__}: {e}")
+        failed += not record['ok']
+        out.write(json.dumps(record) + "\n")
+        out.flush()
+    return failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Smart Budget and Inventory Manager command line")
+    parser.add_argument('--user', required=True, help="username to act as")
+    parser.add_argument('--password', help=f"password (default: ${PASSWORD_ENV})")
+    parser.add_argument('--backend', choices=('mysql', 'sqlite'), default='mysql',
+                        help="mysql (same database as main.py) or sqlite (same as gui.py)")
+    parser.add_argument('--db', help="SQLite database file")
+    parser.add_argument('--format', choices=('json', 'csv'), default='json')
+    build_command_parser(parser)
+    args = parser.parse_args(argv)
+
+    password = args.password if args.password is not None else os.environ.get(PASSWORD_ENV)
+    if password is None:
+        parser.error(f"set {PASSWORD_ENV} or pass --password")
+
+    try:
+        session = Session(args.backend, args.db)
+    except Exception as e:
+        print(f"✗ Could not connect to the database: {e}", file=sys.stderr)
+        return 2
+    try:
+        session.login(args.user, password)
+        if args.resource == 'batch':
+            return 1 if run_batch(session, sys.stdin) else 0
+        write_output(args.handler(session, args), args.format)
+        return 0
+    except (CommandError, ValueError) as e:
+        print(f"✗ {e}", file=sys.stderr)
+        return 1
+    except Exception as e:
+        print(f"✗ {type(e).__name__}: {e}", file=sys.stderr)
+        return 1
+    finally:
+        session.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -10,6 +10,79 @@ DB_CONFIG = {
     'autocommit': True
 }
 
+# MySQL statement cache: prepared statements kept open per connection,
+# and reconnect attempts (doubling the pause from the initial backoff) after a lost connection
+MYSQL_STATEMENT_CACHE_SIZE = 64
+MYSQL_RECONNECT_ATTEMPTS = 5
+MYSQL_RECONNECT_BACKOFF = 0.1
+
+# SQLite settings (used by the Tkinter GUI)
+SQLITE_DB_FILE = 'wizard_test.db'
+SQLITE_BUSY_TIMEOUT_MS = 5000
+
+# Read-only report connections: memory-map this much of the file and
+# keep this many KiB of page cache per connection
+SQLITE_READ_MMAP_BYTES = 256 * 1024 * 1024
+SQLITE_READ_CACHE_KB = 64 * 1024
+
+# Write queue: commit a group once it holds this many mutations
+# or once the oldest mutation has waited this many seconds
+WRITE_QUEUE_MAX_BATCH = 256
+WRITE_QUEUE_MAX_LATENCY = 0.005
+
+# Report cache: keep at most this many results and roughly this many bytes
+REPORT_CACHE_MAX_ENTRIES = 128
+REPORT_CACHE_MAX_BYTES = 8 * 1024 * 1024
+
+# SQLite backups (see backup.py): pages copied per step, pause between steps,
+# and how many snapshots to keep
+BACKUP_DIR = 'backups'
+BACKUP_PAGES_PER_STEP = 256
+BACKUP_STEP_PAUSE = 0.005
+BACKUP_KEEP = 7
+
+# Expense archival (see archive.py): expenses dated before the first day of
+# the month this many months back move to per-year archive tables. At least
+# 12, so the dashboard's current-year periods never reach the archive.
+ARCHIVE_HORIZON_MONTHS = 24
+
+# Spending anomalies (see anomalies.py): an expense is flagged when it is this
+# many standard deviations above its category's mean and above this quantile
+# of the category's last ANOMALY_WINDOW amounts, once the category has at
+# least ANOMALY_MIN_HISTORY earlier expenses
+ANOMALY_Z_SCORE = 3.0
+ANOMALY_QUANTILE = 0.95
+ANOMALY_WINDOW = 30
+ANOMALY_MIN_HISTORY = 5
+
+# Stock forecasts (see forecast.py): sales velocity is measured over this many days
+FORECAST_WINDOW_DAYS = 28
+
+# Change capture (see change_log.py): changes returned per read, and how many
+# seconds a gap in the MySQL sequence may be waited on before it is skipped
+CHANGE_BATCH_SIZE = 500
+CHANGE_GAP_TIMEOUT = 30
+
+# GUI lists (see table_view.py): search this many milliseconds after the last keystroke
+GUI_SEARCH_DEBOUNCE_MS = 150
+
+# Profiling (see profiling.py): off unless BUDGET_PROFILE names a report
+# directory or main.py / gui.py get --profile; the report lists this many
+# functions and allocation sites
+PROFILE_ENV_VAR = 'BUDGET_PROFILE'
+PROFILE_DIR = 'profiles'
+PROFILE_TOP_FUNCTIONS = 25
+PROFILE_TOP_ALLOCATIONS = 10
+
+# Load testing (see loadtest.py): default operation mix (relative weights),
+# expenses listed per list operation, data seeded per simulated user, and
+# where results are saved
+LOADTEST_MIX = {'add_expense': 40, 'list': 30, 'purchase': 20, 'report': 10}
+LOADTEST_LIST_LIMIT = 50
+LOADTEST_SEED_PRODUCTS = 20
+LOADTEST_SEED_EXPENSES = 100
+LOADTEST_DIR = 'loadtest_results'
+
 # Application Settings
 APP_NAME = "Smart Budget and Inventory Manager"
 APP_VERSION = "1.0" 
\ No newline at end of file
@@ -0,0 +1,94 @@
+"""
+Dashboard summary for Smart Budget and Inventory Manager
+Computes all-time, today, week-to-date, month-to-date and year-to-date
+totals and counts, averages and the top category with one statement: the
+periods are conditional aggregates (SUM(CASE ...)) over a single scan of
+the user's expenses grouped by integer category_id, and the few category
+rows (with their names joined on) are rolled up here.
+
+Functions take an open cursor and the dialect ('mysql' or 'sqlite').
+"""
+
+from datetime import date as Date, timedelta
+
+from models import Money
+from sql_dialect import prepare
+
+# Dashboard periods, each running from its start date through today
+PERIODS = ('today', 'week', 'month', 'year')
+
+
+def period_starts(today):
+    """Start date of each period for the given day (weeks start on Monday)"""
+    return {
+        'today': today,
+        'week': today - timedelta(days=today.weekday()),
+        'month': today.replace(day=1),
+        'year': today.replace(month=1, day=1),
+    }
+
+
+def _average(cents, count):
+    """Average in whole cents, rounded half up"""
+    return Money((cents * 2 + count) // (count * 2)) if count else Money(0)
+
+
+def dashboard_summary(cursor, dialect, user_id, today=None):
+    """Summary dict for a user's dashboard
+
+    Keys: total/count, <period>/<period>_count for each of PERIODS,
+    average (per expense), daily_average (this month so far),
+    top_category ((name, total) or None).
+    """
+    today = today or Date.today()
+    starts = period_starts(today)
+    columns = []
+    params = []
+    for period in PERIODS:
+        columns.append(f"SUM(CASE WHEN date BETWEEN ? AND ? THEN amount_cents ELSE 0 END) AS {period}_cents")
+        columns.append(f"SUM(CASE WHEN date BETWEEN ? AND ? THEN 1 ELSE 0 END) AS {period}_count")
+        params.extend([starts[period].isoformat(), today.isoformat()] * 2)
+    params.extend([user_id, user_id])
+    measures = ['count', 'total_cents'] + [f"{period}_{kind}" for period in PERIODS for kind in ('cents', 'count')]
+    # Archived expenses count toward the all-time figures through their totals;
+    # the archive horizon keeps every dashboard period in the hot table
+    query = f"""
+        SELECT c.name AS category, t.category_id, {', '.join(f'SUM(t.{m}) AS {m}' for m in measures)}
+        FROM (SELECT category_id, COUNT(*) AS count, SUM(amount_cents) AS total_cents,
+                     {', '.join(columns)}
+              FROM expenses
+              WHERE user_id = ?
+              GROUP BY category_id
+              UNION ALL
+              SELECT category_id, SUM(count), SUM(total_cents), {', '.join(['0'] * (len(measures) - 2))}
+              FROM expense_archive_totals
+              WHERE user_id = ?
+              GROUP BY category_id) t
+        JOIN categories c ON c.id = t.category_id
+        GROUP BY t.category_id, c.name
+    """
+
+    cursor.execute(prepare(query, dialect), params)
+    rows = cursor.fetchall()
+
+    names = ['category', 'category_id'] + measures
+    totals = dict.fromkeys(measures, 0)
+    top_category = None
+    for row in rows:
+        row = row if isinstance(row, dict) else dict(zip(names, row))
+        for name in measures:
+            totals[name] += int(row[name] or 0)
+        if top_category is None or row['total_cents'] > top_category[1]:
+            top_category = (row['category'], int(row['total_cents']))
+
+    summary = {
+        'total': Money(totals['total_cents']),
+        'count': totals['count'],
+        'average': _average(totals['total_cents'], totals['count']),
+        'daily_average': _average(totals['month_cents'], today.day),
+        'top_category': (top_category[0], Money(top_category[1])) if top_category else None,
+    }
+    for period in PERIODS:
+        summary[period] = Money(totals[f"{period}_cents"])
+        summary[f"{period}_count"] = totals[f"{period}_count"]
+    return summary
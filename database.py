@@ -4,15 +4,36 @@ This module handles all database operations including connection, queries, and d
 """
 
 import mysql.connector
-from mysql.connector import Error
-from config import DB_CONFIG
-import hashlib
+from mysql.connector import Error, InterfaceError, OperationalError
+from config import DB_CONFIG, MYSQL_STATEMENT_CACHE_SIZE, MYSQL_RECONNECT_ATTEMPTS, MYSQL_RECONNECT_BACKOFF
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
 from datetime import datetime
 
+# Statement kinds for execute_query(): SELECT returns the rows, WRITE returns True
+SELECT = 'select'
+WRITE = 'write'
+
+# Client errors raised before the statement reached the server (server gone,
+# broken pipe, no connection): safe to reconnect and retry any statement
+_NOT_SENT = {None, 2006, 2055}
+# Connection lost while waiting for the reply: the write may have been applied,
+# so only reads are retried
+_LOST_IN_QUERY = {2013}
+
+def _kind_of(query):
+    """Statement kind for callers that do not pass one"""
+    return SELECT if query.lstrip()[:6].upper() in ('SELECT', 'WITH', 'SHOW') else WRITE
+
 class DatabaseManager:
     def __init__(self):
         """Initialize database connection"""
         self.connection = None
+        # query text -> (prepared cursor, query text as first seen, kind), least recently used first
+        self._statements = OrderedDict()
+        self._tx_cursor = None
+        self._autocommit = DB_CONFIG.get('autocommit', False)
         self.connect()
     
     def connect(self):
@@ -28,59 +49,155 @@ class DatabaseManager:
     
     def disconnect(self):
         """Close database connection"""
+        self._drop_statements()
         if self.connection and self.connection.is_connected():
             self.connection.close()
             print("✓ Database connection closed")
     
-    def execute_query(self, query, params=None):
-        """Execute a query and return results"""
-        try:
-            if not self.connection or not self.connection.is_connected():
-                self.connect()
-            
-            cursor = self.connection.cursor(dictionary=True)
-            cursor.execute(query, params or ())
-            
-            # For SELECT queries, fetch results
-            if query.strip().upper().startswith('SELECT'):
-                results = cursor.fetchall()
-                cursor.close()
-                return results
-            else:
-                # For INSERT, UPDATE, DELETE queries
-                self.connection.commit()
+    def _drop_statements(self):
+        """Forget the prepared statements and cursors of the current connection"""
+        for cursor, _, _ in self._statements.values():
+            try:
                 cursor.close()
+            except Error:
+                pass
+        self._statements.clear()
+        self._tx_cursor = None
+    
+    def _reconnect(self):
+        """Open a new connection, backing off between failed attempts"""
+        self._drop_statements()
+        delay = MYSQL_RECONNECT_BACKOFF
+        for attempt in range(MYSQL_RECONNECT_ATTEMPTS):
+            if attempt:
+                time.sleep(delay)
+                delay = min(delay * 2, 2.0)
+            if self.connect():
+                return True
+        return False
+    
+    def _ensure_connection(self):
+        """Connect lazily; a dropped connection is noticed when a statement fails"""
+        if self.connection is None and not self._reconnect():
+            raise OperationalError("MySQL Connection not available")
+    
+    def _statement(self, query, kind):
+        """Cached (prepared cursor, query text, kind) for a statement template
+        
+        The server prepares each distinct query once per connection; later
+        calls only send the parameters. The query text object is kept because
+        the driver re-prepares unless it is handed the very same string.
+        """
+        entry = self._statements.get(query)
+        if entry is None:
+            cursor = self.connection.cursor(prepared=True, dictionary=True)
+            entry = (cursor, query, kind or _kind_of(query))
+            self._statements[query] = entry
+            if len(self._statements) > MYSQL_STATEMENT_CACHE_SIZE:
+                _, (evicted, _, _) = self._statements.popitem(last=False)
+                evicted.close()
+        else:
+            self._statements.move_to_end(query)
+        return entry
+    
+    def execute(self, query, params=None, kind=None):
+        """Like execute_query() but raises mysql.connector.Error instead of printing it"""
+        self._ensure_connection()
+        for attempt in range(2):
+            cursor, text, cached_kind = self._statement(query, kind)
+            kind = kind or cached_kind
+            try:
+                cursor.execute(text, tuple(params or ()))
+                if kind == SELECT:
+                    return cursor.fetchall()
+                # DB_CONFIG normally enables autocommit; only commit when it is off
+                if not self._autocommit:
+                    self.connection.commit()
                 return True
-                
+            except (OperationalError, InterfaceError) as e:
+                retry = e.errno in _NOT_SENT or (e.errno in _LOST_IN_QUERY and kind == SELECT)
+                if attempt or not retry or not self._reconnect():
+                    raise
+    
+    def execute_query(self, query, params=None, kind=None):
+        """Execute a query and return results
+        
+        kind is SELECT (returns the rows as dicts) or WRITE (returns True);
+        when omitted it is inferred from the query text. Returns False on error.
+        """
+        try:
+            return self.execute(query, params, kind)
         except Error as e:
             print(f"✗ Database error: {e}")
             return False
     
-    def hash_password(self, password):
-        """Hash password using SHA-256 for security"""
-        return hashlib.sha256(password.encode()).hexdigest()
+    @contextmanager
+    def transaction(self, readonly=False):
+        """Run several statements atomically; yields a buffered dictionary cursor
+        
+        Commits when the block finishes and rolls back if it raises. With
+        readonly=True the block reads one consistent snapshot in a read-only
+        transaction, which is always rolled back.
+        """
+        options = {'consistent_snapshot': True, 'readonly': True} if readonly else {}
+        self._ensure_connection()
+        try:
+            self.connection.start_transaction(**options)
+        except (OperationalError, InterfaceError):
+            # Nothing has run yet, so a lost connection can simply be replaced
+            if not self._reconnect():
+                raise
+            self.connection.start_transaction(**options)
+        
+        if self._tx_cursor is None:
+            self._tx_cursor = self.connection.cursor(dictionary=True, buffered=True)
+        cursor = self._tx_cursor
+        try:
+            yield cursor
+            if readonly:
+                self.connection.rollback()
+            else:
+                self.connection.commit()
+        except Exception:
+            self.connection.rollback()
+            raise
     
-    def validate_user(self, username, password):
-        """Validate user login credentials"""
-        hashed_password = self.hash_password(password)
-        query = "SELECT id, username FROM users WHERE username = %s AND password = %s"
-        result = self.execute_query(query, (username, hashed_password))
+    def iter_query(self, query, params=None, record_type=None, chunk_size=500):
+        """Yield the rows of a SELECT in fetchmany() chunks
         
-        if result and len(result) > 0:
-            return result[0]
-        return None
+        Uses an unbuffered cursor so only one chunk is held in memory at a time.
+        The connection cannot run other statements until the generator is
+        exhausted or closed. Raises mysql.connector.Error if the query fails.
+        """
+        self._ensure_connection()
+        cursor = self.connection.cursor(dictionary=True, buffered=False)
+        try:
+            cursor.execute(query, params or ())
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield record_type.from_row(row) if record_type else row
+        finally:
+            # Drain anything left if the caller stopped early; after a lost
+            # connection there is nothing to drain, so keep the original error
+            try:
+                if self.connection.unread_result:
+                    self.connection.consume_results()
+                cursor.close()
+            except Error:
+                pass
     
-    def create_user(self, username, password):
-        """Create a new user account"""
-        hashed_password = self.hash_password(password)
-        query = "INSERT INTO users (username, password) VALUES (%s, %s)"
-        return self.execute_query(query, (username, hashed_password))
+    def fetch_records(self, query, params, record_type):
+        """Run a SELECT and return one record_type instance (e.g. Expense) per row"""
+        rows = self.execute_query(query, params, SELECT)
+        return [record_type.from_row(row) for row in rows] if rows else []
     
-    def user_exists(self, username):
-        """Check if username already exists"""
-        query = "SELECT id FROM users WHERE username = %s"
-        result = self.execute_query(query, (username,))
-        return len(result) > 0 if result else False
+    def fetch_batch(self, query, params, batch_type):
+        """Run a SELECT and load the rows into a columnar batch (e.g. ExpenseBatch)"""
+        rows = self.execute_query(query, params, SELECT)
+        return batch_type.from_rows(rows or [])
 
 # Global database manager instance
 db = DatabaseManager() 
\ No newline at end of file
@@ -13,16 +13,30 @@ CREATE TABLE IF NOT EXISTS users (
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Per-user categories; expenses, products and recurring templates reference them by id
+CREATE TABLE IF NOT EXISTS categories (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    user_id INT NOT NULL,
+    name VARCHAR(50) NOT NULL,
+    UNIQUE INDEX idx_categories_user_name (user_id, name),
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
 -- Create expenses table
 CREATE TABLE IF NOT EXISTS expenses (
     id INT AUTO_INCREMENT PRIMARY KEY,
     user_id INT NOT NULL,
     date DATE NOT NULL,
-    category VARCHAR(50) NOT NULL,
-    amount DECIMAL(10,2) NOT NULL,
+    category_id INT NOT NULL,
+    amount_cents BIGINT NOT NULL,
     description VARCHAR(255),
+    recurring_id INT NULL,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+    FOREIGN KEY (category_id) REFERENCES categories(id),
+    INDEX idx_expenses_user_date (user_id, date),
+    INDEX idx_expenses_user_category_date (user_id, category_id, date),
+    UNIQUE INDEX idx_expenses_recurring_date (recurring_id, date)
 );
 
 -- Create products table
@@ -30,13 +44,191 @@ CREATE TABLE IF NOT EXISTS products (
     id INT AUTO_INCREMENT PRIMARY KEY,
     user_id INT NOT NULL,
     name VARCHAR(100) NOT NULL,
-    category VARCHAR(50) NOT NULL,
-    price DECIMAL(10,2) NOT NULL,
+    category_id INT NOT NULL,
+    price_cents BIGINT NOT NULL,
     stock INT NOT NULL DEFAULT 0,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+    FOREIGN KEY (category_id) REFERENCES categories(id)
+);
+
+-- Append-only stock ledger; products.stock is the cached current balance
+CREATE TABLE IF NOT EXISTS stock_movements (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    product_id INT NOT NULL,
+    user_id INT NOT NULL,
+    kind ENUM('receipt', 'sale', 'adjustment') NOT NULL,
+    quantity INT NOT NULL,
+    note VARCHAR(255),
+    created_at DATETIME NOT NULL,
+    FOREIGN KEY (product_id) REFERENCES products(id) ON DELETE CASCADE,
+    INDEX idx_stock_movements_product (product_id, id)
+);
+
+-- Stock balance every few movements, so history queries replay only a short tail
+CREATE TABLE IF NOT EXISTS stock_checkpoints (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    product_id INT NOT NULL,
+    movement_id INT NOT NULL,
+    balance INT NOT NULL,
+    created_at DATETIME NOT NULL,
+    FOREIGN KEY (product_id) REFERENCES products(id) ON DELETE CASCADE,
+    INDEX idx_stock_checkpoints_product (product_id, created_at, movement_id)
+);
+
+-- Inventory value per user, category and day; category '' is the user's total
+CREATE TABLE IF NOT EXISTS inventory_snapshots (
+    user_id INT NOT NULL,
+    category VARCHAR(50) NOT NULL,
+    snapshot_date DATE NOT NULL,
+    value_cents BIGINT NOT NULL,
+    PRIMARY KEY (user_id, category, snapshot_date),
     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
 );
 
+-- Recurring expense templates; the scheduler reads due rows through idx_recurring_next_due
+CREATE TABLE IF NOT EXISTS recurring_expenses (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    user_id INT NOT NULL,
+    category_id INT NOT NULL,
+    amount_cents BIGINT NOT NULL,
+    description VARCHAR(255),
+    frequency ENUM('daily', 'weekly', 'monthly', 'custom') NOT NULL,
+    interval_count INT NOT NULL DEFAULT 1,
+    start_date DATE NOT NULL,
+    next_due DATE NOT NULL,
+    end_date DATE NULL,
+    active TINYINT(1) NOT NULL DEFAULT 1,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+    FOREIGN KEY (category_id) REFERENCES categories(id),
+    INDEX idx_recurring_next_due (next_due, user_id)
+);
+
+-- Per-user counter bumped on every expense/product write; report results are cached per version
+CREATE TABLE IF NOT EXISTS data_versions (
+    user_id INT PRIMARY KEY,
+    version BIGINT NOT NULL
+);
+
+DROP TRIGGER IF EXISTS trg_expenses_insert_version;
+CREATE TRIGGER trg_expenses_insert_version AFTER INSERT ON expenses FOR EACH ROW
+    INSERT INTO data_versions (user_id, version) VALUES (NEW.user_id, 1)
+    ON DUPLICATE KEY UPDATE version = version + 1;
+DROP TRIGGER IF EXISTS trg_expenses_update_version;
+CREATE TRIGGER trg_expenses_update_version AFTER UPDATE ON expenses FOR EACH ROW
+    INSERT INTO data_versions (user_id, version) VALUES (NEW.user_id, 1)
+    ON DUPLICATE KEY UPDATE version = version + 1;
+DROP TRIGGER IF EXISTS trg_expenses_delete_version;
+CREATE TRIGGER trg_expenses_delete_version AFTER DELETE ON expenses FOR EACH ROW
+    INSERT INTO data_versions (user_id, version) VALUES (OLD.user_id, 1)
+    ON DUPLICATE KEY UPDATE version = version + 1;
+DROP TRIGGER IF EXISTS trg_products_insert_version;
+CREATE TRIGGER trg_products_insert_version AFTER INSERT ON products FOR EACH ROW
+    INSERT INTO data_versions (user_id, version) VALUES (NEW.user_id, 1)
+    ON DUPLICATE KEY UPDATE version = version + 1;
+DROP TRIGGER IF EXISTS trg_products_update_version;
+CREATE TRIGGER trg_products_update_version AFTER UPDATE ON products FOR EACH ROW
+    INSERT INTO data_versions (user_id, version) VALUES (NEW.user_id, 1)
+    ON DUPLICATE KEY UPDATE version = version + 1;
+DROP TRIGGER IF EXISTS trg_products_delete_version;
+CREATE TRIGGER trg_products_delete_version AFTER DELETE ON products FOR EACH ROW
+    INSERT INTO data_versions (user_id, version) VALUES (OLD.user_id, 1)
+    ON DUPLICATE KEY UPDATE version = version + 1;
+
+-- Bookkeeping for sync.py: high-water mark per source table and source id -> local id
+CREATE TABLE IF NOT EXISTS sync_state (
+    source VARCHAR(10) NOT NULL,
+    table_name VARCHAR(30) NOT NULL,
+    last_id BIGINT NOT NULL,
+    PRIMARY KEY (source, table_name)
+);
+
+CREATE TABLE IF NOT EXISTS sync_map (
+    source VARCHAR(10) NOT NULL,
+    table_name VARCHAR(30) NOT NULL,
+    source_id BIGINT NOT NULL,
+    target_id BIGINT NOT NULL,
+    PRIMARY KEY (source, table_name, source_id),
+    INDEX idx_sync_map_target (source, table_name, target_id)
+);
+
+-- Archive tables (expenses_archive_YYYY, created by archive.py) and the dates each holds
+CREATE TABLE IF NOT EXISTS expense_archives (
+    table_name VARCHAR(64) PRIMARY KEY,
+    first_date DATE NOT NULL,
+    last_date DATE NOT NULL,
+    row_count BIGINT NOT NULL
+);
+
+-- Count and total of archived expenses per user, month and category, for all-time reports
+CREATE TABLE IF NOT EXISTS expense_archive_totals (
+    user_id INT NOT NULL,
+    month CHAR(7) NOT NULL,
+    category_id INT NOT NULL,
+    count INT NOT NULL,
+    total_cents BIGINT NOT NULL,
+    PRIMARY KEY (user_id, month, category_id)
+);
+
+-- Running statistics per user and category for anomaly detection (see anomalies.py)
+CREATE TABLE IF NOT EXISTS spending_stats (
+    user_id INT NOT NULL,
+    category_id INT NOT NULL,
+    count INT NOT NULL,
+    mean DOUBLE NOT NULL,
+    m2 DOUBLE NOT NULL,
+    recent TEXT NOT NULL,
+    PRIMARY KEY (user_id, category_id)
+);
+
+-- Expenses flagged as unusually high when they were added
+CREATE TABLE IF NOT EXISTS spending_anomalies (
+    expense_id INT PRIMARY KEY,
+    user_id INT NOT NULL,
+    category_id INT NOT NULL,
+    date DATE NOT NULL,
+    amount_cents BIGINT NOT NULL,
+    mean_cents BIGINT NOT NULL,
+    quantile_cents BIGINT NOT NULL,
+    z_score DOUBLE NULL,
+    INDEX idx_spending_anomalies_user_date (user_id, date)
+);
+
+-- Change capture (see change_log.py): every insert, update and delete on expenses and products
+CREATE TABLE IF NOT EXISTS change_log (
+    seq BIGINT AUTO_INCREMENT PRIMARY KEY,
+    table_name VARCHAR(30) NOT NULL,
+    row_id INT NOT NULL,
+    user_id INT NOT NULL,
+    op ENUM('insert', 'update', 'delete', 'archive') NOT NULL,
+    changed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Position each named consumer has read the change log up to
+CREATE TABLE IF NOT EXISTS change_consumers (
+    name VARCHAR(64) PRIMARY KEY,
+    last_seq BIGINT NOT NULL
+);
+
+DROP TRIGGER IF EXISTS trg_expenses_insert_changes;
+CREATE TRIGGER trg_expenses_insert_changes AFTER INSERT ON expenses FOR EACH ROW
+    INSERT INTO change_log (table_name, row_id, user_id, op) VALUES ('expenses', NEW.id, NEW.user_id, 'insert');
+DROP TRIGGER IF EXISTS trg_expenses_update_changes;
+CREATE TRIGGER trg_expenses_update_changes AFTER UPDATE ON expenses FOR EACH ROW
+    INSERT INTO change_log (table_name, row_id, user_id, op) VALUES ('expenses', NEW.id, NEW.user_id, 'update');
+DROP TRIGGER IF EXISTS trg_expenses_delete_changes;
+CREATE TRIGGER trg_expenses_delete_changes AFTER DELETE ON expenses FOR EACH ROW
+    INSERT INTO change_log (table_name, row_id, user_id, op) VALUES ('expenses', OLD.id, OLD.user_id, 'delete');
+DROP TRIGGER IF EXISTS trg_products_insert_changes;
+CREATE TRIGGER trg_products_insert_changes AFTER INSERT ON products FOR EACH ROW
+    INSERT INTO change_log (table_name, row_id, user_id, op) VALUES ('products', NEW.id, NEW.user_id, 'insert');
+DROP TRIGGER IF EXISTS trg_products_update_changes;
+CREATE TRIGGER trg_products_update_changes AFTER UPDATE ON products FOR EACH ROW
+    INSERT INTO change_log (table_name, row_id, user_id, op) VALUES ('products', NEW.id, NEW.user_id, 'update');
+DROP TRIGGER IF EXISTS trg_products_delete_changes;
+CREATE TRIGGER trg_products_delete_changes AFTER DELETE ON products FOR EACH ROW
+    INSERT INTO change_log (table_name, row_id, user_id, op) VALUES ('products', OLD.id, OLD.user_id, 'delete');
+
 -- Insert a default user for testing (username: admin, password: admin123)
 INSERT INTO users (username, password) VALUES ('admin', 'admin123')
 ON DUPLICATE KEY UPDATE username = username;
@@ -1,55 +1,300 @@
 import sqlite3
 import os
+from urllib.request import pathname2url
+from config import SQLITE_DB_FILE, SQLITE_BUSY_TIMEOUT_MS, SQLITE_READ_MMAP_BYTES, SQLITE_READ_CACHE_KB
 
-def create_connection():
+def configure_connection(connection):
+    """Switch to WAL journaling and wait on locks instead of failing"""
+    connection.execute(f"PRAGMA busy_timeout = {int(SQLITE_BUSY_TIMEOUT_MS)}")
+    connection.execute("PRAGMA journal_mode = WAL")
+    return connection
+
+def create_connection(db_file=SQLITE_DB_FILE):
     try:
         # Create database file if it doesn't exist
-        db_file = 'wizard_test.db'
-        connection = sqlite3.connect(db_file)
+        connection = sqlite3.connect(db_file, timeout=SQLITE_BUSY_TIMEOUT_MS / 1000)
+        configure_connection(connection)
         print(f'Connected to SQLite database: {db_file}')
         return connection
     except Exception as e:
         print(f'Error: {e}')
         return None
 
+def open_read_only(db_file=SQLITE_DB_FILE):
+    """Read-only connection for reports
+
+    Opened with mode=ro and query_only so it can never take the write lock;
+    in WAL mode its read transactions run alongside writers without blocking
+    them. Autocommit (isolation_level=None) so reads only hold a snapshot
+    inside an explicit BEGIN (see sql_dialect.read_snapshot).
+    """
+    uri = f"file:{pathname2url(os.path.abspath(db_file))}?mode=ro"
+    connection = sqlite3.connect(uri, uri=True, timeout=SQLITE_BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+    connection.execute(f"PRAGMA busy_timeout = {int(SQLITE_BUSY_TIMEOUT_MS)}")
+    connection.execute("PRAGMA query_only = ON")
+    connection.execute(f"PRAGMA mmap_size = {int(SQLITE_READ_MMAP_BYTES)}")
+    connection.execute(f"PRAGMA cache_size = -{int(SQLITE_READ_CACHE_KB)}")
+    return connection
+
+# Bump whenever a migration is added to MIGRATIONS below
+SCHEMA_VERSION = 10
+
+USERS_TABLE = '''
+    CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT NOT NULL UNIQUE,
+        password TEXT NOT NULL
+    )
+'''
+
+# Per-user categories; NOCASE makes 'food' and 'Food' the same name (see categories.py)
+CATEGORIES_TABLE = '''
+    CREATE TABLE IF NOT EXISTS categories (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        name TEXT NOT NULL COLLATE NOCASE,
+        UNIQUE (user_id, name),
+        FOREIGN KEY (user_id) REFERENCES users (id)
+    )
+'''
+
+# Money columns hold integer cents (see models/money.py)
+EXPENSES_TABLE = '''
+    CREATE TABLE IF NOT EXISTS expenses (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        date TEXT NOT NULL,
+        category_id INTEGER NOT NULL,
+        amount_cents INTEGER NOT NULL,
+        description TEXT,
+        recurring_id INTEGER,
+        FOREIGN KEY (user_id) REFERENCES users (id),
+        FOREIGN KEY (category_id) REFERENCES categories (id)
+    )
+'''
+
+PRODUCTS_TABLE = '''
+    CREATE TABLE IF NOT EXISTS products (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        name TEXT NOT NULL,
+        category_id INTEGER NOT NULL,
+        price_cents INTEGER NOT NULL,
+        stock INTEGER NOT NULL,
+        FOREIGN KEY (user_id) REFERENCES users (id),
+        FOREIGN KEY (category_id) REFERENCES categories (id)
+    )
+'''
+
+# Append-only stock ledger (see stock_ledger.py); products.stock is the cached balance
+STOCK_MOVEMENTS_TABLE = '''
+    CREATE TABLE IF NOT EXISTS stock_movements (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        product_id INTEGER NOT NULL,
+        user_id INTEGER NOT NULL,
+        kind TEXT NOT NULL,
+        quantity INTEGER NOT NULL,
+        note TEXT,
+        created_at TEXT NOT NULL,
+        FOREIGN KEY (product_id) REFERENCES products (id)
+    )
+'''
+
+STOCK_CHECKPOINTS_TABLE = '''
+    CREATE TABLE IF NOT EXISTS stock_checkpoints (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        product_id INTEGER NOT NULL,
+        movement_id INTEGER NOT NULL,
+        balance INTEGER NOT NULL,
+        created_at TEXT NOT NULL,
+        FOREIGN KEY (product_id) REFERENCES products (id)
+    )
+'''
+
+# Inventory value per (user, category, day); category '' is the total (see inventory_snapshots.py)
+INVENTORY_SNAPSHOTS_TABLE = '''
+    CREATE TABLE IF NOT EXISTS inventory_snapshots (
+        user_id INTEGER NOT NULL,
+        category TEXT NOT NULL,
+        snapshot_date TEXT NOT NULL,
+        value_cents INTEGER NOT NULL,
+        PRIMARY KEY (user_id, category, snapshot_date)
+    ) WITHOUT ROWID
+'''
+
+# Recurring expense templates (see recurring.py); next_due is the scheduler's work queue
+RECURRING_EXPENSES_TABLE = '''
+    CREATE TABLE IF NOT EXISTS recurring_expenses (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        category_id INTEGER NOT NULL,
+        amount_cents INTEGER NOT NULL,
+        description TEXT,
+        frequency TEXT NOT NULL,
+        interval_count INTEGER NOT NULL DEFAULT 1,
+        start_date TEXT NOT NULL,
+        next_due TEXT NOT NULL,
+        end_date TEXT,
+        active INTEGER NOT NULL DEFAULT 1,
+        FOREIGN KEY (user_id) REFERENCES users (id),
+        FOREIGN KEY (category_id) REFERENCES categories (id)
+    )
+'''
+
+# Per-user counter bumped by the first triggers below on every write (see report_cache.py)
+DATA_VERSIONS_TABLE = '''
+    CREATE TABLE IF NOT EXISTS data_versions (
+        user_id INTEGER PRIMARY KEY,
+        version INTEGER NOT NULL
+    )
+'''
+
+TRIGGERS = [
+    f'''
+    CREATE TRIGGER IF NOT EXISTS trg_{table}_{event.lower()}_version AFTER {event} ON {table}
+    BEGIN
+        INSERT INTO data_versions (user_id, version) VALUES ({row}.user_id, 1)
+        ON CONFLICT (user_id) DO UPDATE SET version = version + 1;
+    END
+    '''
+    for table in ('expenses', 'products')
+    for event, row in (('INSERT', 'NEW'), ('UPDATE', 'NEW'), ('DELETE', 'OLD'))
+] + [
+    f'''
+    CREATE TRIGGER IF NOT EXISTS trg_{table}_{event.lower()}_changes AFTER {event} ON {table}
+    BEGIN
+        INSERT INTO change_log (table_name, row_id, user_id, op) VALUES ('{table}', {row}.id, {row}.user_id, '{event.lower()}');
+    END
+    '''
+    for table in ('expenses', 'products')
+    for event, row in (('INSERT', 'NEW'), ('UPDATE', 'NEW'), ('DELETE', 'OLD'))
+]
+
+# Change capture (see change_log.py): every change to expenses and products, in seq order,
+# and the position each named consumer has read up to
+CHANGE_LOG_TABLE = '''
+    CREATE TABLE IF NOT EXISTS change_log (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        table_name TEXT NOT NULL,
+        row_id INTEGER NOT NULL,
+        user_id INTEGER NOT NULL,
+        op TEXT NOT NULL,
+        changed_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )
+'''
+
+CHANGE_CONSUMERS_TABLE = '''
+    CREATE TABLE IF NOT EXISTS change_consumers (
+        name TEXT PRIMARY KEY,
+        last_seq INTEGER NOT NULL
+    )
+'''
+
+# Bookkeeping for sync.py: high-water mark per source table and source id -> local id
+SYNC_STATE_TABLE = '''
+    CREATE TABLE IF NOT EXISTS sync_state (
+        source TEXT NOT NULL,
+        table_name TEXT NOT NULL,
+        last_id INTEGER NOT NULL,
+        PRIMARY KEY (source, table_name)
+    )
+'''
+
+SYNC_MAP_TABLE = '''
+    CREATE TABLE IF NOT EXISTS sync_map (
+        source TEXT NOT NULL,
+        table_name TEXT NOT NULL,
+        source_id INTEGER NOT NULL,
+        target_id INTEGER NOT NULL,
+        PRIMARY KEY (source, table_name, source_id)
+    ) WITHOUT ROWID
+'''
+
+# Catalog of the per-year archive tables of old expenses and the dates each holds (see archive.py)
+EXPENSE_ARCHIVES_TABLE = '''
+    CREATE TABLE IF NOT EXISTS expense_archives (
+        table_name TEXT PRIMARY KEY,
+        first_date TEXT NOT NULL,
+        last_date TEXT NOT NULL,
+        row_count INTEGER NOT NULL
+    )
+'''
+
+# Count and total of archived expenses per (user, month, category), for all-time reports
+EXPENSE_ARCHIVE_TOTALS_TABLE = '''
+    CREATE TABLE IF NOT EXISTS expense_archive_totals (
+        user_id INTEGER NOT NULL,
+        month TEXT NOT NULL,
+        category_id INTEGER NOT NULL,
+        count INTEGER NOT NULL,
+        total_cents INTEGER NOT NULL,
+        PRIMARY KEY (user_id, month, category_id)
+    ) WITHOUT ROWID
+'''
+
+# Running statistics per (user, category) for anomaly detection (see anomalies.py)
+SPENDING_STATS_TABLE = '''
+    CREATE TABLE IF NOT EXISTS spending_stats (
+        user_id INTEGER NOT NULL,
+        category_id INTEGER NOT NULL,
+        count INTEGER NOT NULL,
+        mean REAL NOT NULL,
+        m2 REAL NOT NULL,
+        recent TEXT NOT NULL,
+        PRIMARY KEY (user_id, category_id)
+    ) WITHOUT ROWID
+'''
+
+# Expenses flagged as unusually high when they were added
+SPENDING_ANOMALIES_TABLE = '''
+    CREATE TABLE IF NOT EXISTS spending_anomalies (
+        expense_id INTEGER PRIMARY KEY,
+        user_id INTEGER NOT NULL,
+        category_id INTEGER NOT NULL,
+        date TEXT NOT NULL,
+        amount_cents INTEGER NOT NULL,
+        mean_cents INTEGER NOT NULL,
+        quantile_cents INTEGER NOT NULL,
+        z_score REAL
+    )
+'''
+
+# Indexes backing the expense query engine (expense_query.py) and the stock ledger
+INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_expenses_user_date ON expenses (user_id, date)",
+    "CREATE INDEX IF NOT EXISTS idx_expenses_user_category_date ON expenses (user_id, category_id, date)",
+    "CREATE INDEX IF NOT EXISTS idx_stock_movements_product ON stock_movements (product_id, id)",
+    "CREATE INDEX IF NOT EXISTS idx_stock_checkpoints_product ON stock_checkpoints (product_id, created_at, movement_id)",
+    "CREATE INDEX IF NOT EXISTS idx_recurring_next_due ON recurring_expenses (next_due, user_id)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_expenses_recurring_date ON expenses (recurring_id, date)",
+    "CREATE INDEX IF NOT EXISTS idx_sync_map_target ON sync_map (source, table_name, target_id)",
+    "CREATE INDEX IF NOT EXISTS idx_spending_anomalies_user_date ON spending_anomalies (user_id, date)",
+]
+
+def _table_exists(cursor, table):
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,))
+    return cursor.fetchone() is not None
+
 def create_tables(connection):
     try:
         cursor = connection.cursor()
+        fresh = not _table_exists(cursor, 'users')
         
-        # Create users table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT NOT NULL UNIQUE,
-                password TEXT NOT NULL
-            )
-        ''')
+        if fresh:
+            for table in (USERS_TABLE, CATEGORIES_TABLE, EXPENSES_TABLE, PRODUCTS_TABLE,
+                          STOCK_MOVEMENTS_TABLE, STOCK_CHECKPOINTS_TABLE, INVENTORY_SNAPSHOTS_TABLE,
+                          RECURRING_EXPENSES_TABLE, DATA_VERSIONS_TABLE, SYNC_STATE_TABLE, SYNC_MAP_TABLE,
+                          EXPENSE_ARCHIVES_TABLE, EXPENSE_ARCHIVE_TOTALS_TABLE, SPENDING_STATS_TABLE,
+                          SPENDING_ANOMALIES_TABLE, CHANGE_LOG_TABLE, CHANGE_CONSUMERS_TABLE):
+                cursor.execute(table)
+            cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            connection.commit()
+        else:
+            # Existing databases get each table in the layout of the migration that adds it
+            migrate(connection)
         
-        # Create expenses table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS expenses (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                date TEXT NOT NULL,
-                category TEXT NOT NULL,
-                amount REAL NOT NULL,
-                description TEXT,
-                FOREIGN KEY (user_id) REFERENCES users (id)
-            )
-        ''')
-        
-        # Create products table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS products (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                name TEXT NOT NULL,
-                category TEXT NOT NULL,
-                price REAL NOT NULL,
-                stock INTEGER NOT NULL,
-                FOREIGN KEY (user_id) REFERENCES users (id)
-            )
-        ''')
+        for statement in INDEXES + TRIGGERS:
+            cursor.execute(statement)
         
         connection.commit()
         print("Tables created successfully!")
@@ -57,6 +302,266 @@ def create_tables(connection):
     except Exception as e:
         print(f'Error creating tables: {e}')
 
+# Layouts before v7 (text category column), used by the migrations before it
+_V1_EXPENSES_TABLE = '''
+    CREATE TABLE IF NOT EXISTS expenses (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        date TEXT NOT NULL,
+        category TEXT NOT NULL,
+        amount_cents INTEGER NOT NULL,
+        description TEXT,
+        recurring_id INTEGER,
+        FOREIGN KEY (user_id) REFERENCES users (id)
+    )
+'''
+
+_V1_PRODUCTS_TABLE = '''
+    CREATE TABLE IF NOT EXISTS products (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        name TEXT NOT NULL,
+        category TEXT NOT NULL,
+        price_cents INTEGER NOT NULL,
+        stock INTEGER NOT NULL,
+        FOREIGN KEY (user_id) REFERENCES users (id)
+    )
+'''
+
+_V4_RECURRING_EXPENSES_TABLE = '''
+    CREATE TABLE IF NOT EXISTS recurring_expenses (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        category TEXT NOT NULL,
+        amount_cents INTEGER NOT NULL,
+        description TEXT,
+        frequency TEXT NOT NULL,
+        interval_count INTEGER NOT NULL DEFAULT 1,
+        start_date TEXT NOT NULL,
+        next_due TEXT NOT NULL,
+        end_date TEXT,
+        active INTEGER NOT NULL DEFAULT 1,
+        FOREIGN KEY (user_id) REFERENCES users (id)
+    )
+'''
+
+def _to_cents(amount):
+    """Convert a legacy REAL amount to cents, or None if it is not a usable number"""
+    from models.money import Money
+    try:
+        return Money.from_float(amount).cents
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+def _migrate_integer_cents(cursor):
+    """v1: REAL amount/price columns become INTEGER amount_cents/price_cents
+    
+    Values that cannot be read as money (older builds could store text such as
+    repeated prices) are stored as 0 and the raw value is kept in legacy_amounts.
+    """
+    cursor.connection.create_function('to_cents', 1, _to_cents, deterministic=True)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS legacy_amounts (
+            table_name TEXT NOT NULL,
+            row_id INTEGER NOT NULL,
+            raw_value TEXT
+        )
+    ''')
+    
+    for table, column, ddl, columns in (
+        ('expenses', 'amount', _V1_EXPENSES_TABLE, 'user_id, date, category, {}, description'),
+        ('products', 'price', _V1_PRODUCTS_TABLE, 'user_id, name, category, {}, stock'),
+    ):
+        cursor.execute(f"ALTER TABLE {table} RENAME TO {table}_v0")
+        cursor.execute(ddl)
+        cursor.execute(f'''
+            INSERT INTO legacy_amounts (table_name, row_id, raw_value)
+            SELECT '{table}', id, CAST({column} AS TEXT) FROM {table}_v0
+            WHERE to_cents({column}) IS NULL
+        ''')
+        if cursor.rowcount:
+            print(f"{cursor.rowcount} {table} row(s) had unreadable {column} values; kept in legacy_amounts")
+        cursor.execute(f'''
+            INSERT INTO {table} (id, {columns.format(column + '_cents')})
+            SELECT id, {columns.format(f'COALESCE(to_cents({column}), 0)')} FROM {table}_v0
+        ''')
+        cursor.execute(f"DROP TABLE {table}_v0")
+
+def _migrate_stock_ledger(cursor):
+    """v2: give every existing product an opening-balance movement and checkpoint"""
+    cursor.execute(STOCK_MOVEMENTS_TABLE)
+    cursor.execute(STOCK_CHECKPOINTS_TABLE)
+    cursor.execute('''
+        INSERT INTO stock_movements (product_id, user_id, kind, quantity, note, created_at)
+        SELECT id, user_id, 'adjustment', stock, 'Opening balance', datetime('now', 'localtime')
+        FROM products
+    ''')
+    cursor.execute('''
+        INSERT INTO stock_checkpoints (product_id, movement_id, balance, created_at)
+        SELECT product_id, id, quantity, created_at FROM stock_movements
+    ''')
+
+def _migrate_inventory_snapshots(cursor):
+    """v3: start every user's inventory value history from today's values"""
+    cursor.execute(INVENTORY_SNAPSHOTS_TABLE)
+    cursor.execute('''
+        INSERT INTO inventory_snapshots (user_id, category, snapshot_date, value_cents)
+        SELECT user_id, category, date('now', 'localtime'), SUM(price_cents * stock)
+        FROM products GROUP BY user_id, category
+        UNION ALL
+        SELECT user_id, '', date('now', 'localtime'), SUM(price_cents * stock)
+        FROM products GROUP BY user_id
+    ''')
+
+def _migrate_recurring_expenses(cursor):
+    """v4: expenses remember the recurring template that generated them"""
+    cursor.execute("PRAGMA table_info(expenses)")
+    if 'recurring_id' not in [column[1] for column in cursor.fetchall()]:
+        cursor.execute("ALTER TABLE expenses ADD COLUMN recurring_id INTEGER")
+    cursor.execute(_V4_RECURRING_EXPENSES_TABLE)
+
+def _migrate_data_versions(cursor):
+    """v5: per-user data versions for the report cache (triggers are created by create_tables)"""
+    cursor.execute(DATA_VERSIONS_TABLE)
+
+def _migrate_sync_tables(cursor):
+    """v6: bookkeeping tables for the MySQL/SQLite sync"""
+    cursor.execute(SYNC_STATE_TABLE)
+    cursor.execute(SYNC_MAP_TABLE)
+
+# Expense purchases were once recorded under this name by the GUI
+_LEGACY_PURCHASE_CATEGORY = 'Product Purchase'
+
+def _category_name(column):
+    """SQL for the stored form of a legacy category value: trimmed, blank becomes 'Other'"""
+    return f"COALESCE(NULLIF(TRIM({column}), ''), 'Other')"
+
+def _migrate_categories(cursor):
+    """v7: category text columns become category_id references to a per-user categories table
+
+    Names are trimmed and deduplicated ignoring case; the most used spelling is kept.
+    Tables are rebuilt new-table-first so foreign keys in stock_movements and
+    stock_checkpoints keep pointing at products.
+    """
+    cursor.execute(CATEGORIES_TABLE)
+    cursor.execute("UPDATE expenses SET category = 'Shopping' WHERE category = ?", (_LEGACY_PURCHASE_CATEGORY,))
+    cursor.execute(f'''
+        INSERT OR IGNORE INTO categories (user_id, name)
+        SELECT user_id, name FROM (
+            SELECT user_id, {_category_name('category')} AS name, COUNT(*) AS uses FROM (
+                SELECT user_id, category FROM expenses
+                UNION ALL SELECT user_id, category FROM products
+                UNION ALL SELECT user_id, category FROM recurring_expenses
+            ) GROUP BY user_id, name
+        ) ORDER BY uses DESC
+    ''')
+    
+    for table, ddl, columns in (
+        ('expenses', EXPENSES_TABLE,
+         ('id', 'user_id', 'date', 'category_id', 'amount_cents', 'description', 'recurring_id')),
+        ('products', PRODUCTS_TABLE, ('id', 'user_id', 'name', 'category_id', 'price_cents', 'stock')),
+        ('recurring_expenses', RECURRING_EXPENSES_TABLE,
+         ('id', 'user_id', 'category_id', 'amount_cents', 'description', 'frequency', 'interval_count',
+          'start_date', 'next_due', 'end_date', 'active')),
+    ):
+        values = ', '.join('c.id' if column == 'category_id' else f't.{column}' for column in columns)
+        cursor.execute(ddl.replace(f" {table} (", f" {table}_v7 (", 1))
+        cursor.execute(f'''
+            INSERT INTO {table}_v7 ({', '.join(columns)})
+            SELECT {values}
+            FROM {table} t JOIN categories c ON c.user_id = t.user_id AND c.name = {_category_name('t.category')}
+        ''')
+        cursor.execute(f"DROP TABLE {table}")
+        cursor.execute(f"ALTER TABLE {table}_v7 RENAME TO {table}")
+    
+    # Inventory history keeps names; merge series whose names now mean the same category
+    cursor.execute(INVENTORY_SNAPSHOTS_TABLE.replace(" inventory_snapshots (", " inventory_snapshots_v7 (", 1))
+    cursor.execute('''
+        INSERT INTO inventory_snapshots_v7 (user_id, category, snapshot_date, value_cents)
+        SELECT s.user_id, COALESCE(c.name, s.category), s.snapshot_date, SUM(s.value_cents)
+        FROM inventory_snapshots s
+        LEFT JOIN categories c ON s.category != '' AND c.user_id = s.user_id AND c.name = TRIM(s.category)
+        GROUP BY s.user_id, COALESCE(c.name, s.category), s.snapshot_date
+    ''')
+    cursor.execute("DROP TABLE inventory_snapshots")
+    cursor.execute("ALTER TABLE inventory_snapshots_v7 RENAME TO inventory_snapshots")
+
+def _migrate_expense_archives(cursor):
+    """v8: catalog and rollup tables for expense archival"""
+    cursor.execute(EXPENSE_ARCHIVES_TABLE)
+    cursor.execute(EXPENSE_ARCHIVE_TOTALS_TABLE)
+
+def _migrate_spending_stats(cursor):
+    """v9: spending statistics for anomaly detection, computed from the existing history"""
+    from anomalies import rebuild
+    cursor.execute(SPENDING_STATS_TABLE)
+    cursor.execute(SPENDING_ANOMALIES_TABLE)
+    rebuild(cursor, 'sqlite')
+
+def _migrate_change_log(cursor):
+    """v10: change capture tables (their triggers are created by create_tables)"""
+    cursor.execute(CHANGE_LOG_TABLE)
+    cursor.execute(CHANGE_CONSUMERS_TABLE)
+
+# (version, function) pairs applied in order to databases older than SCHEMA_VERSION
+MIGRATIONS = [
+    (1, _migrate_integer_cents),
+    (2, _migrate_stock_ledger),
+    (3, _migrate_inventory_snapshots),
+    (4, _migrate_recurring_expenses),
+    (5, _migrate_data_versions),
+    (6, _migrate_sync_tables),
+    (7, _migrate_categories),
+    (8, _migrate_expense_archives),
+    (9, _migrate_spending_stats),
+    (10, _migrate_change_log),
+]
+
+def migrate(connection):
+    """Bring an existing database up to SCHEMA_VERSION, one transaction per step"""
+    cursor = connection.cursor()
+    cursor.execute("PRAGMA user_version")
+    current = cursor.fetchone()[0]
+    for version, step in MIGRATIONS:
+        if version <= current:
+            continue
+        connection.commit()
+        cursor.execute("BEGIN")
+        try:
+            step(cursor)
+            cursor.execute(f"PRAGMA user_version = {version}")
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+        print(f"Migrated database to schema version {version}")
+
+def iter_query(connection, query, params=(), record_type=None, chunk_size=500):
+    """Yield the rows of a SELECT in fetchmany() chunks instead of loading them all"""
+    cursor = connection.cursor()
+    try:
+        cursor.execute(query, params)
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            for row in rows:
+                yield record_type.from_row(row) if record_type else row
+    finally:
+        cursor.close()
+
+def fetch_records(connection, query, params, record_type):
+    """Run a SELECT and return one record_type instance (e.g. Expense) per row"""
+    cursor = connection.cursor()
+    cursor.execute(query, params)
+    return [record_type.from_row(row) for row in cursor.fetchall()]
+
+def fetch_batch(connection, query, params, batch_type):
+    """Run a SELECT and load the rows into a columnar batch (e.g. ExpenseBatch)"""
+    cursor = connection.cursor()
+    cursor.execute(query, params)
+    return batch_type.from_rows(cursor)
+
 def init_database():
     connection = create_connection()
     if connection:
@@ -1,14 +1,22 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 from datetime import datetime
-from db import create_connection
+from models import Money
+from expense_query import ExpenseFilter
+from recurring import FREQUENCIES
+from repository import get_repository
+from table_view import SortableTree
+import profiling
 
 class ExpenseManager:
     def __init__(self, user_id):
         self.user_id = user_id
+        self.repo = get_repository('sqlite')
         self.window = tk.Toplevel()
         self.window.title("Expense Manager")
-        self.window.geometry("600x400")
+        self.window.geometry("700x620")
+        profiling.instrument(self, ('add_expense', 'load_expenses', 'clear_filter', 'delete_expense'),
+                             settle=self.window.update_idletasks)
         self.setup_ui()
         self.load_expenses()
 
@@ -23,7 +31,8 @@ class ExpenseManager:
         self.date_entry.grid(row=0, column=1, padx=5)
 
         tk.Label(add_frame, text="Category:").grid(row=0, column=2, sticky="w")
-        self.category_entry = tk.Entry(add_frame)
+        # Pick one of the user's categories or type a new one
+        self.category_entry = ttk.Combobox(add_frame, width=18)
         self.category_entry.grid(row=0, column=3, padx=5)
 
         tk.Label(add_frame, text="Amount:").grid(row=1, column=0, sticky="w")
@@ -34,12 +43,45 @@ class ExpenseManager:
         self.description_entry = tk.Entry(add_frame)
         self.description_entry.grid(row=1, column=3, padx=5)
 
-        tk.Button(add_frame, text="Add Expense", command=self.add_expense).grid(row=2, column=0, columnspan=4, pady=10)
+        # "once" adds a single expense; anything else sets up a recurring expense from Date on
+        tk.Label(add_frame, text="Repeats:").grid(row=2, column=0, sticky="w")
+        self.repeat_combo = ttk.Combobox(add_frame, values=("once",) + FREQUENCIES, state="readonly", width=17)
+        self.repeat_combo.set("once")
+        self.repeat_combo.grid(row=2, column=1, padx=5)
+
+        tk.Label(add_frame, text="Every (days/weeks/months):").grid(row=2, column=2, sticky="w")
+        self.interval_spin = tk.Spinbox(add_frame, from_=1, to=365, width=5)
+        self.interval_spin.grid(row=2, column=3, padx=5, sticky="w")
+
+        tk.Button(add_frame, text="Add Expense", command=self.add_expense).grid(row=3, column=0, columnspan=4, pady=10)
+
+        # Filter Frame (every field is optional; they combine with AND)
+        filter_frame = tk.LabelFrame(self.window, text="Filter", padx=10, pady=5)
+        filter_frame.pack(fill="x", padx=10, pady=5)
+
+        self.filter_entries = {}
+        filter_fields = (("Categories:", "categories"), ("From:", "date_from"), ("To:", "date_to"),
+                         ("Min:", "min_amount"), ("Max:", "max_amount"), ("Contains:", "text"))
+        for i, (label, key) in enumerate(filter_fields):
+            tk.Label(filter_frame, text=label).grid(row=i // 3, column=(i % 3) * 2, sticky="w")
+            entry = tk.Entry(filter_frame, width=14)
+            entry.grid(row=i // 3, column=(i % 3) * 2 + 1, padx=5)
+            self.filter_entries[key] = entry
+
+        tk.Button(filter_frame, text="Apply", command=self.load_expenses).grid(row=0, column=6, padx=5)
+        tk.Button(filter_frame, text="Clear", command=self.clear_filter).grid(row=1, column=6, padx=5)
 
         # Expenses List
         list_frame = tk.LabelFrame(self.window, text="Expenses", padx=10, pady=10)
         list_frame.pack(fill="both", expand=True, padx=10, pady=5)
 
+        # Searches the loaded expenses as you type, without querying again
+        search_frame = tk.Frame(list_frame)
+        search_frame.pack(fill="x", pady=(0, 5))
+        tk.Label(search_frame, text="Search:").pack(side="left")
+        self.search_entry = tk.Entry(search_frame)
+        self.search_entry.pack(side="left", fill="x", expand=True, padx=5)
+
         # Treeview for expenses
         columns = ("Date", "Category", "Amount", "Description")
         self.tree = ttk.Treeview(list_frame, columns=columns, show="headings")
@@ -49,6 +91,12 @@ class ExpenseManager:
             self.tree.column(col, width=100)
 
         self.tree.pack(fill="both", expand=True)
+        # Click a heading to sort by it (again to reverse)
+        self.view = SortableTree(self.tree, self.search_entry, on_view=self.show_total)
+
+        self.total_label = tk.Label(list_frame, text="", anchor="e")
+        self.total_label.pack(fill="x")
+        self.loaded_count, self.loaded_total = 0, Money(0)
         
         # Buttons
         button_frame = tk.Frame(self.window)
@@ -61,52 +109,85 @@ class ExpenseManager:
         try:
             date = self.date_entry.get()
             category = self.category_entry.get()
-            amount = float(self.amount_entry.get())
+            amount = Money.parse(self.amount_entry.get())
             description = self.description_entry.get()
 
             if not all([date, category, amount]):
                 messagebox.showerror("Error", "Please fill all required fields")
                 return
 
-            connection = create_connection()
-            cursor = connection.cursor()
-            cursor.execute(
-                "INSERT INTO expenses (user_id, date, category, amount, description) VALUES (?, ?, ?, ?, ?)",
-                (self.user_id, date, category, amount, description)
-            )
-            connection.commit()
-            connection.close()
-
-            messagebox.showinfo("Success", "Expense added successfully!")
+            frequency = self.repeat_combo.get()
+            if frequency == "once":
+                _, anomaly = self.repo.add_expense(self.user_id, date, category, amount, description)
+                if anomaly:
+                    messagebox.showwarning("Unusual Expense", f"Expense added. {anomaly.describe()}.")
+                else:
+                    messagebox.showinfo("Success", "Expense added successfully!")
+            else:
+                datetime.strptime(date, "%Y-%m-%d")
+                interval_count = int(self.interval_spin.get())
+                created = self.repo.add_recurring(self.user_id, category, amount, description,
+                                                  frequency, date, interval_count)
+                messagebox.showinfo("Success", f"Recurring expense added! {created} occurrence(s) due so far were added.")
             self.clear_entries()
             self.load_expenses()
 
         except ValueError:
-            messagebox.showerror("Error", "Please enter a valid amount")
+            messagebox.showerror("Error", "Please enter a valid amount, date and interval")
         except Exception as e:
             messagebox.showerror("Error", f"Failed to add expense: {str(e)}")
 
     def load_expenses(self):
-        # Clear existing items
-        for item in self.tree.get_children():
-            self.tree.delete(item)
+        try:
+            expense_filter = self.build_filter()
+        except ValueError as e:
+            messagebox.showerror("Error", f"Invalid filter: {str(e)}")
+            return
 
         try:
-            connection = create_connection()
-            cursor = connection.cursor()
-            cursor.execute(
-                "SELECT date, category, amount, description FROM expenses WHERE user_id = ? ORDER BY date DESC",
-                (self.user_id,)
-            )
-            
-            for row in cursor.fetchall():
-                self.tree.insert("", "end", values=row)
-            
-            connection.close()
+            self.category_entry['values'] = self.repo.expense_categories(self.user_id)
+            # Rows are keyed by expense id so delete can target them exactly
+            # Sort keys: date, category, amount in cents, description
+            rows, count, total = [], 0, Money(0)
+            for expense, count, total in self.repo.iter_expenses(expense_filter):
+                description = expense.description or ""
+                rows.append((expense.id, (expense.date, expense.category, expense.amount, description),
+                             (expense.date, expense.category.casefold(), expense.amount_cents, description.casefold())))
+            self.loaded_count, self.loaded_total = count, total
+            self.view.load(rows)
 
         except Exception as e:
             messagebox.showerror("Error", f"Failed to load expenses: {str(e)}")
 
+    def show_total(self, positions):
+        if len(positions) == len(self.view.index):
+            self.total_label.config(text=f"{self.loaded_count} expense(s), total ${self.loaded_total:.2f}")
+            return
+        rows = self.view.index.rows
+        shown = Money(sum(rows[i][2][2] for i in positions))
+        self.total_label.config(text=f"{len(positions)} of {self.loaded_count} expense(s) shown, total ${shown:.2f}")
+
+    def build_filter(self):
+        """Turn the filter fields into an ExpenseFilter (raises ValueError on bad input)"""
+        values = {key: entry.get().strip() for key, entry in self.filter_entries.items()}
+        for key in ("date_from", "date_to"):
+            if values[key]:
+                datetime.strptime(values[key], "%Y-%m-%d")
+        return ExpenseFilter(
+            self.user_id,
+            categories=[c.strip() for c in values["categories"].split(",") if c.strip()],
+            date_from=values["date_from"] or None,
+            date_to=values["date_to"] or None,
+            min_amount=Money.parse(values["min_amount"]) if values["min_amount"] else None,
+            max_amount=Money.parse(values["max_amount"]) if values["max_amount"] else None,
+            text=values["text"] or None,
+        )
+
+    def clear_filter(self):
+        for entry in self.filter_entries.values():
+            entry.delete(0, tk.END)
+        self.load_expenses()
+
     def delete_expense(self):
         selected = self.tree.selection()
         if not selected:
@@ -115,17 +196,7 @@ class ExpenseManager:
 
         if messagebox.askyesno("Confirm", "Are you sure you want to delete this expense?"):
             try:
-                item = self.tree.item(selected[0])
-                date, category, amount, description = item['values']
-
-                connection = create_connection()
-                cursor = connection.cursor()
-                cursor.execute(
-                    "DELETE FROM expenses WHERE user_id = ? AND date = ? AND category = ? AND amount = ? AND description = ?",
-                    (self.user_id, date, category, amount, description)
-                )
-                connection.commit()
-                connection.close()
+                self.repo.delete_expense(self.user_id, int(selected[0]))
 
                 messagebox.showinfo("Success", "Expense deleted successfully!")
                 self.load_expenses()
@@ -138,4 +209,7 @@ class ExpenseManager:
         self.date_entry.insert(0, datetime.now().strftime("%Y-%m-%d"))
         self.category_entry.delete(0, tk.END)
         self.amount_entry.delete(0, tk.END)
-        self.description_entry.delete(0, tk.END) 
\ No newline at end of file
+        self.description_entry.delete(0, tk.END)
+        self.repeat_combo.set("once")
+        self.interval_spin.delete(0, tk.END)
+        self.interval_spin.insert(0, "1") 
\ No newline at end of file
@@ -0,0 +1,174 @@
+"""
+Expense query engine for Smart Budget and Inventory Manager
+Builds one parameterized, index-friendly SELECT from a composable filter spec,
+for either the MySQL (CLI) or SQLite (GUI) backend. When the date range
+reaches archived expenses, the caller passes the archive tables to union
+(archive.archive_tables()); otherwise only the hot expenses table is read.
+"""
+
+import calendar
+from datetime import date as Date
+
+from models import Expense, Money, EXPENSE_COLUMNS
+from sql_dialect import PLACEHOLDERS
+
+# User-facing sort keys mapped to columns (never interpolate raw input)
+SORT_COLUMNS = {
+    'date': 'e.date',
+    'amount': 'e.amount_cents',
+    'category': 'c.name',
+    'description': 'e.description',
+}
+
+
+# Stored columns of expenses and its archive tables, read through the alias e
+_STORED_COLUMNS = "e.id, e.user_id, e.date, e.category_id, e.amount_cents, e.description"
+
+
+def _escape_like(text):
+    return text.replace('!', '!!').replace('%', '!%').replace('_', '!_')
+
+
+class ExpenseFilter:
+    """Filter, sort and limit options for listing a user's expenses
+
+    Every criterion is optional and they combine with AND:
+    categories (any of), date_from/date_to (inclusive, YYYY-MM-DD),
+    min_amount/max_amount (Money, inclusive) and text (description contains).
+    """
+
+    def __init__(self, user_id, categories=None, date_from=None, date_to=None,
+                 min_amount=None, max_amount=None, text=None,
+                 sort='date', descending=True, limit=None, offset=0):
+        if sort not in SORT_COLUMNS:
+            raise ValueError(f"Cannot sort by {sort!r}; choose from {', '.join(SORT_COLUMNS)}")
+        self.user_id = user_id
+        self.categories = list(categories) if categories else []
+        self.date_from = date_from
+        self.date_to = date_to
+        self.min_amount = min_amount
+        self.max_amount = max_amount
+        self.text = text
+        self.sort = sort
+        self.descending = descending
+        self.limit = limit
+        self.offset = offset
+
+    @classmethod
+    def for_month(cls, user_id, year_month, **options):
+        """Filter to one calendar month given as YYYY-MM"""
+        year, month = (int(part) for part in year_month.split('-'))
+        last_day = calendar.monthrange(year, month)[1]
+        return cls(user_id,
+                   date_from=Date(year, month, 1).isoformat(),
+                   date_to=Date(year, month, last_day).isoformat(),
+                   **options)
+
+    def _where(self, p):
+        """WHERE clause and params; the date range stays sargable for (user_id, date) indexes
+
+        Categories are matched by name (ignoring case) and filtered on the
+        integer category_id, so (user_id, category_id, date) serves the lookup.
+        """
+        clauses = [f"e.user_id = {p}"]
+        params = [self.user_id]
+        if self.categories:
+            clauses.append(f"e.category_id IN (SELECT id FROM categories WHERE user_id = {p} "
+                           f"AND name IN ({', '.join([p] * len(self.categories))}))")
+            params.append(self.user_id)
+            params.extend(self.categories)
+        if self.date_from:
+            clauses.append(f"e.date >= {p}")
+            params.append(self.date_from)
+        if self.date_to:
+            clauses.append(f"e.date <= {p}")
+            params.append(self.date_to)
+        if self.min_amount is not None:
+            clauses.append(f"e.amount_cents >= {p}")
+            params.append(self.min_amount.cents)
+        if self.max_amount is not None:
+            clauses.append(f"e.amount_cents <= {p}")
+            params.append(self.max_amount.cents)
+        if self.text:
+            clauses.append(f"e.description LIKE {p} ESCAPE '!'")
+            params.append(f"%{_escape_like(self.text)}%")
+        return " AND ".join(clauses), params
+
+    def _source(self, p, archives, with_names):
+        """FROM/WHERE clause and params over the hot table plus the given archive tables
+
+        Each archive is a UNION ALL branch with the full WHERE clause, so
+        every branch is filtered through its own (user_id, ...) indexes.
+        """
+        where, params = self._where(p)
+        join = " JOIN categories c ON c.id = e.category_id" if with_names else ""
+        if not archives:
+            return f"expenses e{join} WHERE {where}", params
+        tables = ['expenses'] + list(archives)
+        branches = " UNION ALL ".join(f"SELECT {_STORED_COLUMNS} FROM {table} e WHERE {where}" for table in tables)
+        return f"({branches}) e{join}", params * len(tables)
+
+    def compile(self, dialect, archives=()):
+        """Return (sql, params) selecting matching expenses
+
+        Each row carries match_count and total_cents for the whole match
+        (computed by window functions before LIMIT), so the listing and its
+        total come from a single statement.
+        """
+        p = PLACEHOLDERS[dialect]
+        source, params = self._source(p, archives, with_names=True)
+        direction = "DESC" if self.descending else "ASC"
+        sql = f"""
+            SELECT {EXPENSE_COLUMNS},
+                   COUNT(*) OVER () AS match_count,
+                   SUM(e.amount_cents) OVER () AS total_cents
+            FROM {source}
+            ORDER BY {SORT_COLUMNS[self.sort]} {direction}, e.id {direction}
+        """
+        if self.limit is not None:
+            sql += f" LIMIT {p} OFFSET {p}"
+            params.extend([int(self.limit), int(self.offset)])
+        return sql, tuple(params)
+
+    def compile_summary(self, dialect, archives=()):
+        """Return (sql, params) for a single row of match_count and total_cents"""
+        source, params = self._source(PLACEHOLDERS[dialect], archives, with_names=False)
+        sql = f"""
+            SELECT COUNT(*) AS match_count, SUM(e.amount_cents) AS total_cents
+            FROM {source}
+        """
+        return sql, tuple(params)
+
+    def describe(self):
+        """Short human-readable summary of the active criteria"""
+        parts = []
+        if self.categories:
+            parts.append("category in " + ", ".join(self.categories))
+        if self.date_from or self.date_to:
+            parts.append(f"date {self.date_from or '...'} to {self.date_to or '...'}")
+        if self.min_amount is not None:
+            parts.append(f"amount >= ${self.min_amount}")
+        if self.max_amount is not None:
+            parts.append(f"amount <= ${self.max_amount}")
+        if self.text:
+            parts.append(f"description contains '{self.text}'")
+        if self.limit is not None:
+            parts.append(f"first {self.limit}")
+        parts.append(f"sorted by {self.sort} {'desc' if self.descending else 'asc'}")
+        return "; ".join(parts)
+
+
+def split_row(row):
+    """Split a row from ExpenseFilter.compile() into (Expense, match_count, total)"""
+    if isinstance(row, dict):
+        return Expense.from_row(row), row['match_count'], Money(row['total_cents'] or 0)
+    return Expense(*row[:6]), row[6], Money(row[7] or 0)
+
+
+def summary_from_row(row):
+    """Turn a row from ExpenseFilter.compile_summary() into (match_count, total)"""
+    if not row:
+        return 0, Money(0)
+    if isinstance(row, dict):
+        return row['match_count'], Money(row['total_cents'] or 0)
+    return row[0], Money(row[1] or 0)
@@ -3,7 +3,11 @@ Expense Tracker Module for Smart Budget and Inventory Manager
 Handles all expense-related operations including add, view, delete, and filtering
 """
 
-from database import db
+from repository import get_repository
+from categories import normalize
+from models import Money
+from expense_query import ExpenseFilter
+from recurring import FREQUENCIES
 from datetime import datetime, timedelta
 import re
 
@@ -11,7 +15,7 @@ class ExpenseTracker:
     def __init__(self, user_id):
         """Initialize expense tracker with user ID"""
         self.user_id = user_id
-        self.categories = ['Food', 'Travel', 'Shopping', 'Bills', 'Entertainment', 'Other']
+        self.repo = get_repository('mysql')
     
     def add_expense(self):
         """Add a new expense to the database"""
@@ -32,26 +36,13 @@ class ExpenseTracker:
                 print("Invalid date format. Please use YYYY-MM-DD")
             
             # Category selection
-            print("\nAvailable categories:")
-            for i, category in enumerate(self.categories, 1):
-                print(f"{i}. {category}")
-            
-            while True:
-                try:
-                    cat_choice = int(input(f"\nSelect category (1-{len(self.categories)}): "))
-                    if 1 <= cat_choice <= len(self.categories):
-                        category = self.categories[cat_choice - 1]
-                        break
-                    else:
-                        print("Invalid choice. Please try again.")
-                except ValueError:
-                    print("Please enter a valid number.")
+            category = self._choose_category()
             
             # Amount input with validation
             while True:
                 amount_str = input("Enter amount: $").strip()
                 if self._validate_amount(amount_str):
-                    amount = float(amount_str)
+                    amount = Money.parse(amount_str)
                     break
                 print("Invalid amount. Please enter a positive number.")
             
@@ -61,73 +52,56 @@ class ExpenseTracker:
                 description = f"{category} expense"
             
             # Insert into database
-            query = """
-                INSERT INTO expenses (user_id, date, category, amount, description)
-                VALUES (%s, %s, %s, %s, %s)
-            """
-            if db.execute_query(query, (self.user_id, date_str, category, amount, description)):
-                print(f"\n✓ Expense added successfully!")
-                print(f"  Date: {date_str}")
-                print(f"  Category: {category}")
-                print(f"  Amount: ${amount:.2f}")
-                print(f"  Description: {description}")
-            else:
-                print("\n✗ Failed to add expense. Please try again.")
+            try:
+                _, anomaly = self.repo.add_expense(self.user_id, date_str, category, amount, description)
+            except Exception as e:
+                print(f"\n✗ Failed to add expense: {e}")
+                return
+            print(f"\n✓ Expense added successfully!")
+            print(f"  Date: {date_str}")
+            print(f"  Category: {category}")
+            print(f"  Amount: ${amount:.2f}")
+            print(f"  Description: {description}")
+            if anomaly:
+                print(f"  ⚠ {anomaly.describe()}")
                 
         except KeyboardInterrupt:
             print("\n\nOperation cancelled.")
         except Exception as e:
             print(f"\n✗ Error: {e}")
     
-    def view_expenses(self, filter_type=None, filter_value=None):
-        """View expenses with optional filtering"""
+    def view_expenses(self, expense_filter=None):
+        """View expenses, optionally narrowed by an ExpenseFilter"""
         print("\n" + "="*80)
         print("EXPENSE LIST")
         print("="*80)
         
-        # Build query based on filter
-        if filter_type == 'category':
-            query = """
-                SELECT date, category, amount, description 
-                FROM expenses 
-                WHERE user_id = %s AND category = %s 
-                ORDER BY date DESC
-            """
-            params = (self.user_id, filter_value)
-        elif filter_type == 'month':
-            query = """
-                SELECT date, category, amount, description 
-                FROM expenses 
-                WHERE user_id = %s AND DATE_FORMAT(date, '%%Y-%%m') = %s 
-                ORDER BY date DESC
-            """
-            params = (self.user_id, filter_value)
+        if expense_filter:
+            print(f"Filter: {expense_filter.describe()}")
         else:
-            query = """
-                SELECT date, category, amount, description 
-                FROM expenses 
-                WHERE user_id = %s 
-                ORDER BY date DESC
-            """
-            params = (self.user_id,)
+            expense_filter = ExpenseFilter(self.user_id)
         
-        expenses = db.execute_query(query, params)
+        # Stream rows straight to the table; the total comes from the query itself
+        count = 0
+        try:
+            for expense, matches, total in self.repo.iter_expenses(expense_filter):
+                if count == 0:
+                    print(f"{'Date':<12} {'Category':<15} {'Amount':<12} {'Description':<30}")
+                    print("-" * 80)
+                print(f"{expense.date:<12} {expense.category:<15} ${expense.amount:<11.2f} {expense.description:<30}")
+                count += 1
+        except Exception as e:
+            print(f"✗ Failed to load expenses: {e}")
+            return
         
-        if not expenses:
+        if count == 0:
             print("No expenses found.")
             return
         
-        # Display expenses in table format
-        print(f"{'Date':<12} {'Category':<15} {'Amount':<12} {'Description':<30}")
-        print("-" * 80)
-        
-        total = 0
-        for expense in expenses:
-            print(f"{expense['date']:<12} {expense['category']:<15} ${expense['amount']:<11.2f} {expense['description']:<30}")
-            total += expense['amount']
-        
         print("-" * 80)
         print(f"{'TOTAL':<27} ${total:<11.2f}")
+        if matches > count:
+            print(f"Showing {count} of {matches} matching expenses (total covers all of them)")
     
     def delete_expense(self):
         """Delete an expense by selecting from list"""
@@ -136,14 +110,7 @@ class ExpenseTracker:
         print("="*50)
         
         # Get recent expenses for selection
-        query = """
-            SELECT id, date, category, amount, description 
-            FROM expenses 
-            WHERE user_id = %s 
-            ORDER BY date DESC 
-            LIMIT 10
-        """
-        expenses = db.execute_query(query, (self.user_id,))
+        expenses = self.repo.recent_expenses(self.user_id, 10)
         
         if not expenses:
             print("No expenses found to delete.")
@@ -155,7 +122,7 @@ class ExpenseTracker:
         print("-" * 70)
         
         for i, expense in enumerate(expenses, 1):
-            print(f"{i:<3} {expense['date']:<12} {expense['category']:<15} ${expense['amount']:<11.2f} {expense['description'][:20]:<20}")
+            print(f"{i:<3} {expense.date:<12} {expense.category:<15} ${expense.amount:<11.2f} {expense.description[:20]:<20}")
         
         # Get user selection
         try:
@@ -166,11 +133,13 @@ class ExpenseTracker:
                 # Confirm deletion
                 confirm = input(f"\nAre you sure you want to delete this expense? (y/n): ").lower()
                 if confirm == 'y':
-                    delete_query = "DELETE FROM expenses WHERE id = %s AND user_id = %s"
-                    if db.execute_query(delete_query, (selected_expense['id'], self.user_id)):
-                        print("✓ Expense deleted successfully!")
-                    else:
-                        print("✗ Failed to delete expense.")
+                    try:
+                        if self.repo.delete_expense(self.user_id, selected_expense.id):
+                            print("✓ Expense deleted successfully!")
+                        else:
+                            print("✗ Failed to delete expense.")
+                    except Exception as e:
+                        print(f"✗ Failed to delete expense: {e}")
                 else:
                     print("Deletion cancelled.")
             else:
@@ -181,63 +150,176 @@ class ExpenseTracker:
             print("\nOperation cancelled.")
     
     def filter_expenses(self):
-        """Filter expenses by category or month"""
+        """Filter expenses by any combination of category, dates, amount and text"""
         print("\n" + "="*50)
         print("FILTER EXPENSES")
         print("="*50)
-        print("1. Filter by Category")
-        print("2. Filter by Month")
-        print("3. Back to main menu")
+        print("Press Enter to skip any option.")
         
         try:
-            choice = int(input("\nSelect option: "))
+            available = self.repo.expense_categories(self.user_id)
+            print("\nAvailable categories:")
+            for i, category in enumerate(available, 1):
+                print(f"{i}. {category}")
+            categories = []
+            for choice in input("Categories (e.g. 1,3): ").replace(' ', '').split(','):
+                if not choice:
+                    continue
+                if not (choice.isdigit() and 1 <= int(choice) <= len(available)):
+                    print("Invalid category choice.")
+                    return
+                categories.append(available[int(choice) - 1])
             
-            if choice == 1:
-                # Filter by category
-                print("\nAvailable categories:")
-                for i, category in enumerate(self.categories, 1):
-                    print(f"{i}. {category}")
-                
-                cat_choice = int(input(f"\nSelect category (1-{len(self.categories)}): "))
-                if 1 <= cat_choice <= len(self.categories):
-                    category = self.categories[cat_choice - 1]
-                    self.view_expenses('category', category)
-                else:
-                    print("Invalid choice.")
-                    
-            elif choice == 2:
-                # Filter by month
-                month = input("Enter month (YYYY-MM): ")
-                if self._validate_month(month):
-                    self.view_expenses('month', month)
-                else:
-                    print("Invalid month format. Use YYYY-MM")
-                    
-            elif choice == 3:
+            options = {'categories': categories}
+            month = input("Month (YYYY-MM): ").strip()
+            if month and not self._validate_month(month):
+                print("Invalid month format. Use YYYY-MM")
                 return
+            if not month:
+                for key, prompt in (('date_from', "From date (YYYY-MM-DD): "), ('date_to', "To date (YYYY-MM-DD): ")):
+                    value = input(prompt).strip()
+                    if value and not self._validate_date(value):
+                        print("Invalid date format. Please use YYYY-MM-DD")
+                        return
+                    options[key] = value or None
+            
+            for key, prompt in (('min_amount', "Minimum amount: $"), ('max_amount', "Maximum amount: $")):
+                value = input(prompt).strip()
+                options[key] = Money.parse(value) if value else None
+            
+            options['text'] = input("Description contains: ").strip() or None
+            
+            sort = input("Sort by (date/amount/category/description) [date]: ").strip().lower() or 'date'
+            options['sort'] = sort
+            options['descending'] = input("Order (asc/desc) [desc]: ").strip().lower() != 'asc'
+            limit = input("Show at most how many rows: ").strip()
+            options['limit'] = int(limit) if limit else None
+            
+            if month:
+                expense_filter = ExpenseFilter.for_month(self.user_id, month, **options)
             else:
-                print("Invalid choice.")
+                expense_filter = ExpenseFilter(self.user_id, **options)
+            self.view_expenses(expense_filter)
                 
+        except ValueError as e:
+            print(f"Invalid input: {e}")
+        except KeyboardInterrupt:
+            print("\nOperation cancelled.")
+    
+    def recurring_expenses(self):
+        """List recurring expenses and add or stop one"""
+        print("\n" + "="*80)
+        print("RECURRING EXPENSES")
+        print("="*80)
+        
+        templates = self.repo.recurring_templates(self.user_id)
+        
+        if templates:
+            print(f"{'#':<3} {'Next Due':<12} {'Category':<15} {'Amount':<12} {'Repeats':<16} {'Description':<20}")
+            print("-" * 80)
+            for i, template in enumerate(templates, 1):
+                repeats = template['frequency']
+                if template['interval_count'] > 1 or repeats == 'custom':
+                    repeats = f"every {template['interval_count']} " + \
+                        {'daily': 'days', 'weekly': 'weeks', 'monthly': 'months', 'custom': 'days'}[repeats]
+                print(f"{i:<3} {str(template['next_due']):<12} {template['category']:<15} "
+                      f"${Money(template['amount_cents']):<11.2f} {repeats:<16} {(template['description'] or '')[:20]:<20}")
+        else:
+            print("No recurring expenses set up.")
+        
+        print("\n1. Add Recurring Expense")
+        if templates:
+            print("2. Stop Recurring Expense")
+        choice = input("Select an option (Enter to go back): ").strip()
+        try:
+            if choice == '1':
+                self.add_recurring_expense()
+            elif choice == '2' and templates:
+                number = int(input(f"Select expense to stop (1-{len(templates)}): "))
+                if 1 <= number <= len(templates):
+                    self.repo.stop_recurring(self.user_id, templates[number - 1]['id'])
+                    print("✓ Recurring expense stopped. Expenses already added are kept.")
+                else:
+                    print("Invalid selection.")
         except ValueError:
             print("Please enter a valid number.")
         except KeyboardInterrupt:
             print("\nOperation cancelled.")
     
+    def add_recurring_expense(self):
+        """Set up an expense that repeats on a schedule"""
+        try:
+            category = self._choose_category()
+            
+            amount_str = input("Enter amount: $").strip()
+            if not self._validate_amount(amount_str):
+                print("Invalid amount. Please enter a positive number.")
+                return
+            amount = Money.parse(amount_str)
+            description = input("Enter description (optional): ").strip() or f"{category} expense"
+            
+            frequency = input(f"Repeats ({'/'.join(FREQUENCIES)}) [monthly]: ").strip().lower() or 'monthly'
+            if frequency not in FREQUENCIES:
+                print("Invalid frequency.")
+                return
+            unit = 'days' if frequency in ('daily', 'custom') else frequency[:-2] + 's'
+            interval = input(f"Every how many {unit} [1]: ").strip()
+            interval_count = int(interval) if interval else 1
+            
+            start_date = input("First date (YYYY-MM-DD) or press Enter for today: ").strip() or \
+                datetime.now().strftime("%Y-%m-%d")
+            end_date = input("Last date (YYYY-MM-DD, optional): ").strip() or None
+            if not self._validate_date(start_date) or (end_date and not self._validate_date(end_date)):
+                print("Invalid date format. Please use YYYY-MM-DD")
+                return
+            
+            created = self.repo.add_recurring(self.user_id, category, amount, description,
+                                              frequency, start_date, interval_count, end_date)
+            print("✓ Recurring expense added!")
+            if created:
+                print(f"✓ Added {created} recurring expense(s) that came due.")
+            
+        except ValueError as e:
+            print(f"Invalid input: {e}")
+        except KeyboardInterrupt:
+            print("\nOperation cancelled.")
+    
+    def materialize_recurring(self):
+        """Add every recurring expense that has come due, in one transaction"""
+        try:
+            created = self.repo.materialize_recurring(self.user_id)
+            if created:
+                print(f"✓ Added {created} recurring expense(s) that came due.")
+            return created
+        except Exception as e:
+            print(f"✗ Could not add recurring expenses: {e}")
+            return 0
+    
     def get_monthly_total(self, year_month=None):
         """Get monthly total expenses"""
         if not year_month:
             year_month = datetime.now().strftime("%Y-%m")
         
-        query = """
-            SELECT SUM(amount) as total 
-            FROM expenses 
-            WHERE user_id = %s AND DATE_FORMAT(date, '%%Y-%%m') = %s
-        """
-        result = db.execute_query(query, (self.user_id, year_month))
+        return self.repo.expense_summary(ExpenseFilter.for_month(self.user_id, year_month))[1]
+    
+    def _choose_category(self):
+        """Pick one of the user's categories by number, or type a new one"""
+        categories = self.repo.expense_categories(self.user_id)
+        print("\nAvailable categories:")
+        for i, category in enumerate(categories, 1):
+            print(f"{i}. {category}")
         
-        if result and result[0]['total']:
-            return result[0]['total']
-        return 0
+        while True:
+            choice = input(f"\nSelect category (1-{len(categories)}) or type a new one: ").strip()
+            if choice.isdigit():
+                if 1 <= int(choice) <= len(categories):
+                    return categories[int(choice) - 1]
+                print("Invalid choice. Please try again.")
+                continue
+            try:
+                return normalize(choice)
+            except ValueError as e:
+                print(e)
     
     def _validate_date(self, date_str):
         """Validate date format"""
@@ -250,8 +332,7 @@ class ExpenseTracker:
     def _validate_amount(self, amount_str):
         """Validate amount input"""
         try:
-            amount = float(amount_str)
-            return amount > 0
+            return Money.parse(amount_str).cents > 0
         except ValueError:
             return False
     
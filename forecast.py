@@ -0,0 +1,121 @@
+"""
+Stock and spend forecasts for Smart Budget and Inventory Manager
+Stock: a product's sales velocity is the units sold per day over the last
+FORECAST_WINDOW_DAYS (or since its first stock movement, if that is more
+recent), read from the stock ledger with one grouped query for all of the
+user's products; days until stockout is stock / velocity.
+Spend: each category's spend so far this month is extended to month end at
+its daily rate so far.
+
+Both are computed over NumPy arrays covering every product or category at
+once (numpy comes with matplotlib). The repository caches the results per
+data version, so they are only recomputed after a purchase or another
+change to the user's data.
+
+Functions take an open cursor and the dialect ('mysql' or 'sqlite').
+"""
+
+import calendar
+from datetime import date as Date, timedelta
+
+from config import FORECAST_WINDOW_DAYS
+from models import Money, ProductBatch, PRODUCT_COLUMNS, PRODUCT_TABLES
+from sql_dialect import prepare
+
+
+class StockForecast:
+    """Projected stockout of one product; days_left and stockout_date are None if it is not selling"""
+    __slots__ = ('product', 'units_per_day', 'days_left', 'stockout_date')
+
+    def __init__(self, product, units_per_day, days_left, stockout_date):
+        self.product = product
+        self.units_per_day = units_per_day
+        self.days_left = days_left
+        self.stockout_date = stockout_date
+
+    def __repr__(self):
+        return f"StockForecast(product={self.product.name!r}, days_left={self.days_left})"
+
+
+def _day(value):
+    """Date of a MySQL DATETIME or an SQLite 'YYYY-MM-DD HH:MM:SS' text"""
+    return Date.fromisoformat(str(value)[:10])
+
+
+def stock_forecast(cursor, dialect, user_id, today=None, window_days=FORECAST_WINDOW_DAYS):
+    """StockForecast for each of a user's products, soonest stockout first"""
+    import numpy as np
+    today = today or Date.today()
+    since = today - timedelta(days=window_days - 1)
+
+    cursor.execute(prepare(f"SELECT {PRODUCT_COLUMNS} FROM {PRODUCT_TABLES} WHERE p.user_id = ? ORDER BY p.name",
+                           dialect), (user_id,))
+    batch = ProductBatch.from_rows(cursor.fetchall())
+    if not len(batch):
+        return []
+    cursor.execute(prepare("""
+        SELECT product_id, SUM(CASE WHEN kind = 'sale' AND created_at >= ? THEN -quantity ELSE 0 END) AS sold,
+               MIN(created_at) AS first_movement
+        FROM stock_movements WHERE user_id = ? GROUP BY product_id
+    """, dialect), (since.isoformat(), user_id))
+    rows = [(row['product_id'], row['sold'], row['first_movement']) if isinstance(row, dict) else row
+            for row in cursor.fetchall()]
+
+    columns = batch.to_numpy()
+    ids, stock = columns['id'], columns['stock']
+    sold = np.zeros(len(batch))
+    observed = np.full(len(batch), window_days)
+    if rows:
+        # Movement rows matched to batch positions through the sorted product ids
+        order = np.argsort(ids)
+        movement_ids = np.array([row[0] for row in rows], dtype=np.int64)
+        found = np.searchsorted(ids[order], movement_ids).clip(max=len(ids) - 1)
+        known = ids[order][found] == movement_ids
+        positions = order[found[known]]
+        sold[positions] = np.array([int(row[1] or 0) for row in rows], dtype=np.float64)[known]
+        first = np.array([max(_day(row[2]), since).toordinal() for row in rows])[known]
+        observed[positions] = today.toordinal() - first + 1
+
+    velocity = sold / np.maximum(observed, 1)
+    days_left = np.divide(stock, velocity, out=np.full(len(batch), np.inf), where=velocity > 0)
+
+    forecasts = []
+    for i, product in enumerate(batch):
+        if np.isfinite(days_left[i]):
+            left = float(days_left[i])
+            forecasts.append(StockForecast(product, float(velocity[i]), left,
+                                           (today + timedelta(days=int(left))).isoformat()))
+        else:
+            forecasts.append(StockForecast(product, 0.0, None, None))
+    forecasts.sort(key=lambda f: (f.days_left is None, f.days_left or 0, f.product.name))
+    return forecasts
+
+
+def spend_forecast(cursor, dialect, user_id, today=None):
+    """This month's spend so far and projected to month end, per category
+
+    Returns {'days_elapsed', 'days_in_month', 'spent', 'projected',
+    'categories': [(category, spent, projected), ...]} with Money amounts,
+    categories by projected spend, highest first.
+    """
+    import numpy as np
+    today = today or Date.today()
+    days_in_month = calendar.monthrange(today.year, today.month)[1]
+    cursor.execute(prepare("""
+        SELECT c.name AS category, SUM(e.amount_cents) AS spent
+        FROM expenses e JOIN categories c ON c.id = e.category_id
+        WHERE e.user_id = ? AND e.date >= ? AND e.date <= ?
+        GROUP BY e.category_id, c.name
+    """, dialect), (user_id, today.replace(day=1).isoformat(), today.isoformat()))
+    rows = [(row['category'], row['spent']) if isinstance(row, dict) else row for row in cursor.fetchall()]
+
+    spent = np.array([int(row[1]) for row in rows], dtype=np.int64)
+    projected = np.rint(spent * (days_in_month / today.day)).astype(np.int64)
+    order = np.argsort(-projected, kind='stable')
+    return {
+        'days_elapsed': today.day,
+        'days_in_month': days_in_month,
+        'spent': Money(int(spent.sum())),
+        'projected': Money(int(projected.sum())),
+        'categories': [(rows[i][0], Money(int(spent[i])), Money(int(projected[i]))) for i in order],
+    }
@@ -1,3 +1,4 @@
+import argparse
 import tkinter as tk
 from tkinter import messagebox
 from auth import register_user, login_user
@@ -5,12 +6,18 @@ from db import init_database
 from expense_manager import ExpenseManager
 from product_manager import ProductManager
 from reports import ReportsManager
+from write_queue import shutdown_write_queue
+from repository import get_repository
+from config import PROFILE_DIR
+import profiling
 
 class App:
     def __init__(self, root):
         self.root = root
         self.root.title("Expense & Product Manager")
         self.user_id = None
+        profiling.instrument(self, ('open_expense_manager', 'open_product_manager', 'open_reports', 'logout'),
+                             settle=self.root.update_idletasks)
         self.show_login()
 
     def clear_window(self):
@@ -33,13 +40,22 @@ class App:
             success, result = login_user(username, password)
             if success:
                 self.user_id = result
+                self.add_due_recurring_expenses()
                 self.show_main_menu()
             else:
                 messagebox.showerror("Login Failed", result)
         
-        tk.Button(self.root, text="Login", command=do_login).pack(pady=5)
+        tk.Button(self.root, text="Login",
+                  command=profiling.profiled("App.login", do_login, self.root.update_idletasks)).pack(pady=5)
         tk.Button(self.root, text="Register", command=self.show_register).pack()
 
+    def add_due_recurring_expenses(self):
+        """Catch up recurring expenses that came due since the last login"""
+        try:
+            get_repository('sqlite').materialize_recurring(self.user_id)
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to add recurring expenses: {str(e)}")
+
     def show_register(self):
         self.clear_window()
         tk.Label(self.root, text="Register", font=("Arial", 16)).pack(pady=10)
@@ -60,7 +76,8 @@ class App:
             else:
                 messagebox.showerror("Error", msg)
         
-        tk.Button(self.root, text="Register", command=do_register).pack(pady=5)
+        tk.Button(self.root, text="Register",
+                  command=profiling.profiled("App.register", do_register, self.root.update_idletasks)).pack(pady=5)
         tk.Button(self.root, text="Back to Login", command=self.show_login).pack()
 
     def show_main_menu(self):
@@ -85,7 +102,14 @@ class App:
         self.show_login()
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Expense & Product Manager")
+    parser.add_argument('--profile', nargs='?', const=PROFILE_DIR, metavar='DIR',
+                        help=f"profile each button action into DIR (default {PROFILE_DIR})")
+    args = parser.parse_args()
+    if args.profile:
+        profiling.enable(args.profile)
     init_database()
     root = tk.Tk()
     app = App(root)
-    root.mainloop() 
\ No newline at end of file
+    root.mainloop()
+    shutdown_write_queue() 
\ No newline at end of file
@@ -1,15 +1,19 @@
 """
 Product Inventory Manager for Smart Budget and Inventory Manager
-Handles all product-related operations: add, view, edit, delete, simulate purchase
+Handles all product-related operations: add, view, edit, delete, simulate purchase,
+receiving stock and stock history. Stock changes are recorded in the stock ledger.
 """
 
-from database import db
+from repository import get_repository
+from categories import normalize
+from models import Money
+from stock_ledger import InsufficientStock
 from datetime import datetime
 
 class InventoryManager:
     def __init__(self, user_id):
         self.user_id = user_id
-        self.categories = ['Electronics', 'Groceries', 'Clothing', 'Books', 'Other']
+        self.repo = get_repository('mysql')
 
     def add_product(self):
         """Add a new product to the inventory"""
@@ -21,23 +25,11 @@ class InventoryManager:
             if not name:
                 print("Product name cannot be empty.")
                 return
-            print("\nAvailable categories:")
-            for i, category in enumerate(self.categories, 1):
-                print(f"{i}. {category}")
+            category = self._choose_category()
             while True:
                 try:
-                    cat_choice = int(input(f"Select category (1-{len(self.categories)}): "))
-                    if 1 <= cat_choice <= len(self.categories):
-                        category = self.categories[cat_choice - 1]
-                        break
-                    else:
-                        print("Invalid choice. Try again.")
-                except ValueError:
-                    print("Please enter a valid number.")
-            while True:
-                try:
-                    price = float(input("Enter price: $").strip())
-                    if price > 0:
+                    price = Money.parse(input("Enter price: $"))
+                    if price.cents > 0:
                         break
                     else:
                         print("Price must be positive.")
@@ -52,14 +44,11 @@ class InventoryManager:
                         print("Stock cannot be negative.")
                 except ValueError:
                     print("Invalid stock. Enter an integer.")
-            query = """
-                INSERT INTO products (user_id, name, category, price, stock)
-                VALUES (%s, %s, %s, %s, %s)
-            """
-            if db.execute_query(query, (self.user_id, name, category, price, stock)):
+            try:
+                self.repo.add_product(self.user_id, name, category, price, stock)
                 print(f"\n✓ Product '{name}' added successfully!")
-            else:
-                print("\n✗ Failed to add product.")
+            except Exception as e:
+                print(f"\n✗ Failed to add product: {e}")
         except KeyboardInterrupt:
             print("\nOperation cancelled.")
 
@@ -68,61 +57,49 @@ class InventoryManager:
         print("\n" + "="*80)
         print("PRODUCT INVENTORY")
         print("="*80)
-        query = """
-            SELECT id, name, category, price, stock
-            FROM products
-            WHERE user_id = %s
-            ORDER BY name
-        """
-        products = db.execute_query(query, (self.user_id,))
-        if not products:
+        count = 0
+        total_value_cents = 0
+        try:
+            for prod in self.repo.iter_products(self.user_id):
+                if count == 0:
+                    print(f"{'#':<3} {'Name':<20} {'Category':<15} {'Price':<10} {'Stock':<8}")
+                    print("-" * 60)
+                count += 1
+                total_value_cents += prod.price_cents * prod.stock
+                print(f"{count:<3} {prod.name:<20} {prod.category:<15} ${prod.price:<9.2f} {prod.stock:<8}")
+        except Exception as e:
+            print(f"✗ Failed to load products: {e}")
+            return
+        if count == 0:
             print("No products found.")
             return
-        print(f"{'#':<3} {'Name':<20} {'Category':<15} {'Price':<10} {'Stock':<8}")
-        print("-" * 60)
-        for i, prod in enumerate(products, 1):
-            print(f"{i:<3} {prod['name']:<20} {prod['category']:<15} ${prod['price']:<9.2f} {prod['stock']:<8}")
         print("-" * 60)
+        print(f"{count} product(s), total inventory value: ${Money(total_value_cents):.2f}")
 
     def edit_product(self):
         """Edit an existing product's details"""
         self.view_products()
-        query = """
-            SELECT id, name, category, price, stock
-            FROM products
-            WHERE user_id = %s
-            ORDER BY name
-        """
-        products = db.execute_query(query, (self.user_id,))
+        products = self.repo.products(self.user_id)
         if not products:
             return
         try:
             choice = int(input(f"Select product to edit (1-{len(products)}): "))
             if 1 <= choice <= len(products):
                 prod = products[choice - 1]
-                print(f"Editing '{prod['name']}' (leave blank to keep current value)")
-                new_name = input(f"New name [{prod['name']}]: ").strip() or prod['name']
-                print("\nAvailable categories:")
-                for i, category in enumerate(self.categories, 1):
-                    print(f"{i}. {category}")
-                cat_choice = input(f"New category [{prod['category']}]: ").strip()
-                if cat_choice.isdigit() and 1 <= int(cat_choice) <= len(self.categories):
-                    new_category = self.categories[int(cat_choice) - 1]
-                else:
-                    new_category = prod['category']
-                price_input = input(f"New price [{prod['price']}]: $").strip()
-                new_price = float(price_input) if price_input else prod['price']
-                stock_input = input(f"New stock [{prod['stock']}]: ").strip()
-                new_stock = int(stock_input) if stock_input else prod['stock']
-                update_query = """
-                    UPDATE products
-                    SET name = %s, category = %s, price = %s, stock = %s
-                    WHERE id = %s AND user_id = %s
-                """
-                if db.execute_query(update_query, (new_name, new_category, new_price, new_stock, prod['id'], self.user_id)):
+                print(f"Editing '{prod.name}' (leave blank to keep current value)")
+                new_name = input(f"New name [{prod.name}]: ").strip() or prod.name
+                new_category = self._choose_category(prod.category)
+                current_price = prod.price
+                price_input = input(f"New price [{current_price}]: $").strip()
+                new_price = Money.parse(price_input) if price_input else current_price
+                stock_input = input(f"New stock [{prod.stock}]: ").strip()
+                new_stock = int(stock_input) if stock_input else prod.stock
+                try:
+                    # Stock edits become ledger adjustments rather than overwrites
+                    self.repo.update_product(self.user_id, prod.id, new_name, new_category, new_price, new_stock)
                     print("✓ Product updated successfully!")
-                else:
-                    print("✗ Failed to update product.")
+                except Exception as e:
+                    print(f"✗ Failed to update product: {e}")
             else:
                 print("Invalid selection.")
         except ValueError:
@@ -133,26 +110,20 @@ class InventoryManager:
     def delete_product(self):
         """Delete a product from inventory"""
         self.view_products()
-        query = """
-            SELECT id, name, category, price, stock
-            FROM products
-            WHERE user_id = %s
-            ORDER BY name
-        """
-        products = db.execute_query(query, (self.user_id,))
+        products = self.repo.products(self.user_id)
         if not products:
             return
         try:
             choice = int(input(f"Select product to delete (1-{len(products)}): "))
             if 1 <= choice <= len(products):
                 prod = products[choice - 1]
-                confirm = input(f"Are you sure you want to delete '{prod['name']}'? (y/n): ").lower()
+                confirm = input(f"Are you sure you want to delete '{prod.name}'? (y/n): ").lower()
                 if confirm == 'y':
-                    del_query = "DELETE FROM products WHERE id = %s AND user_id = %s"
-                    if db.execute_query(del_query, (prod['id'], self.user_id)):
+                    try:
+                        self.repo.delete_product(self.user_id, prod.id)
                         print("✓ Product deleted successfully!")
-                    else:
-                        print("✗ Failed to delete product.")
+                    except Exception as e:
+                        print(f"✗ Failed to delete product: {e}")
                 else:
                     print("Deletion cancelled.")
             else:
@@ -165,37 +136,27 @@ class InventoryManager:
     def simulate_purchase(self):
         """Simulate purchasing a product (reduce stock, add to expenses)"""
         self.view_products()
-        query = """
-            SELECT id, name, category, price, stock
-            FROM products
-            WHERE user_id = %s
-            ORDER BY name
-        """
-        products = db.execute_query(query, (self.user_id,))
+        products = self.repo.products(self.user_id)
         if not products:
             return
         try:
             choice = int(input(f"Select product to purchase (1-{len(products)}): "))
             if 1 <= choice <= len(products):
                 prod = products[choice - 1]
-                if prod['stock'] <= 0:
+                if prod.stock <= 0:
                     print("Product is out of stock!")
                     return
-                qty = int(input(f"Enter quantity to purchase (max {prod['stock']}): "))
-                if 1 <= qty <= prod['stock']:
-                    new_stock = prod['stock'] - qty
-                    total_cost = prod['price'] * qty
-                    # Update stock
-                    update_query = "UPDATE products SET stock = %s WHERE id = %s AND user_id = %s"
-                    db.execute_query(update_query, (new_stock, prod['id'], self.user_id))
-                    # Add to expenses
-                    expense_query = """
-                        INSERT INTO expenses (user_id, date, category, amount, description)
-                        VALUES (%s, %s, %s, %s, %s)
-                    """
-                    today = datetime.now().strftime("%Y-%m-%d")
-                    db.execute_query(expense_query, (self.user_id, today, 'Shopping', total_cost, f"Purchased {qty} x {prod['name']}"))
-                    print(f"✓ Purchase successful! {qty} x {prod['name']} bought for ${total_cost:.2f}")
+                qty = int(input(f"Enter quantity to purchase (max {prod.stock}): "))
+                if 1 <= qty <= prod.stock:
+                    try:
+                        _, total_cost, _, anomaly = self.repo.purchase(self.user_id, prod.id, qty)
+                        print(f"✓ Purchase successful! {qty} x {prod.name} bought for ${total_cost:.2f}")
+                        if anomaly:
+                            print(f"⚠ {anomaly.describe()}")
+                    except InsufficientStock:
+                        print("Not enough stock left for that quantity.")
+                    except Exception as e:
+                        print(f"✗ Purchase failed: {e}")
                 else:
                     print("Invalid quantity.")
             else:
@@ -203,4 +164,82 @@ class InventoryManager:
         except ValueError:
             print("Please enter a valid number.")
         except KeyboardInterrupt:
-            print("\nOperation cancelled.") 
\ No newline at end of file
+            print("\nOperation cancelled.") 
+
+    def _choose_category(self, current=None):
+        """Pick one of the user's categories by number or type a new one; Enter keeps current"""
+        categories = self.repo.product_categories(self.user_id)
+        print("\nAvailable categories:")
+        for i, category in enumerate(categories, 1):
+            print(f"{i}. {category}")
+        prompt = f"New category [{current}]: " if current else \
+            f"Select category (1-{len(categories)}) or type a new one: "
+        while True:
+            choice = input(prompt).strip()
+            if not choice and current:
+                return current
+            if choice.isdigit():
+                if 1 <= int(choice) <= len(categories):
+                    return categories[int(choice) - 1]
+                print("Invalid choice. Try again.")
+                continue
+            try:
+                return normalize(choice)
+            except ValueError as e:
+                print(e)
+
+    def _choose_product(self, action):
+        """List products and return the one the user picks, or None"""
+        self.view_products()
+        products = self.repo.products(self.user_id)
+        if not products:
+            return None
+        choice = int(input(f"Select product to {action} (1-{len(products)}): "))
+        if 1 <= choice <= len(products):
+            return products[choice - 1]
+        print("Invalid selection.")
+        return None
+
+    def receive_stock(self):
+        """Record incoming stock for a product"""
+        try:
+            prod = self._choose_product("restock")
+            if not prod:
+                return
+            qty = int(input(f"Quantity of '{prod.name}' received: "))
+            if qty <= 0:
+                print("Quantity must be positive.")
+                return
+            note = input("Note (optional): ").strip() or "Stock received"
+            balance = self.repo.receive_stock(self.user_id, prod.id, qty, note)
+            print(f"✓ Received {qty} x {prod.name}. Stock is now {balance}.")
+        except ValueError:
+            print("Please enter a valid number.")
+        except KeyboardInterrupt:
+            print("\nOperation cancelled.")
+        except Exception as e:
+            print(f"✗ Failed to receive stock: {e}")
+
+    def stock_history(self):
+        """Show recent stock movements of a product and its stock on a given date"""
+        try:
+            prod = self._choose_product("inspect")
+            if not prod:
+                return
+            movements = self.repo.stock_history(self.user_id, prod.id)
+            print(f"\nRecent stock movements for '{prod.name}' (current stock: {prod.stock})")
+            print(f"{'When':<20} {'Kind':<12} {'Qty':>6}  Note")
+            print("-" * 60)
+            for created_at, kind, quantity, note in movements:
+                print(f"{str(created_at):<20} {kind:<12} {quantity:>+6}  {note or ''}")
+            if not movements:
+                print("No movements recorded.")
+            
+            day = input("\nShow stock on date (YYYY-MM-DD, Enter to skip): ").strip()
+            if day:
+                datetime.strptime(day, "%Y-%m-%d")
+                print(f"Stock of '{prod.name}' at end of {day}: {self.repo.stock_on(prod.id, day)}")
+        except ValueError:
+            print("Please enter a valid number or date.")
+        except KeyboardInterrupt:
+            print("\nOperation cancelled.")
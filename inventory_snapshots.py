@@ -0,0 +1,172 @@
+"""
+Inventory valuation history for Smart Budget and Inventory Manager
+inventory_snapshots holds one row per (user, category name, day) with the
+inventory value at the end of that day; category '' is the user's total.
+Rows are kept current incrementally by the write paths (value deltas from
+stock movements, price edits and deletes), so a history query is an
+indexed range read. take_snapshots() recomputes every user in full and can
+run on a schedule to fill days without changes or correct drift.
+
+Functions take an open cursor and the dialect ('mysql' or 'sqlite').
+"""
+
+from datetime import date as Date
+
+from sql_dialect import prepare
+
+TOTAL = ''
+
+
+def _today():
+    return Date.today().isoformat()
+
+
+def _current_value(cursor, dialect, user_id, category):
+    """Value straight from products (used to seed a series with no history)"""
+    query = "SELECT COALESCE(SUM(price_cents * stock), 0) FROM products WHERE user_id = ?"
+    params = [user_id]
+    if category != TOTAL:
+        query += " AND category_id = (SELECT id FROM categories WHERE user_id = ? AND name = ?)"
+        params.extend([user_id, category])
+    cursor.execute(prepare(query, dialect), params)
+    row = cursor.fetchone()
+    value = next(iter(row.values())) if isinstance(row, dict) else row[0]
+    return int(value)
+
+
+def _apply_delta(cursor, dialect, user_id, category, delta, day, applied):
+    cursor.execute(prepare("""
+        UPDATE inventory_snapshots SET value_cents = value_cents + ?
+        WHERE user_id = ? AND category = ? AND snapshot_date = ?
+    """, dialect), (delta, user_id, category, day))
+    if cursor.rowcount:
+        return
+
+    # First change today: carry the latest earlier value forward
+    cursor.execute(prepare("""
+        SELECT value_cents FROM inventory_snapshots
+        WHERE user_id = ? AND category = ? AND snapshot_date < ?
+        ORDER BY snapshot_date DESC LIMIT 1
+    """, dialect), (user_id, category, day))
+    row = cursor.fetchone()
+    if row is None:
+        # No history yet; seed from products, allowing for a change not yet applied
+        value = _current_value(cursor, dialect, user_id, category)
+        if not applied:
+            value += delta
+    else:
+        previous = row['value_cents'] if isinstance(row, dict) else row[0]
+        value = previous + delta
+    cursor.execute(prepare("""
+        INSERT INTO inventory_snapshots (user_id, category, snapshot_date, value_cents)
+        VALUES (?, ?, ?, ?)
+    """, dialect), (user_id, category, day, value))
+
+
+def record_value_change(cursor, dialect, user_id, old_category, old_value_cents,
+                        new_category, new_value_cents, day=None, applied=True):
+    """Record that a product's value went from old to new
+
+    Use None for old_category when a product is created and for new_category
+    when it is deleted. Pass applied=False if products does not reflect the
+    change yet.
+    """
+    day = day or _today()
+    deltas = {}
+    if old_category is not None:
+        deltas[old_category] = deltas.get(old_category, 0) - old_value_cents
+    if new_category is not None:
+        deltas[new_category] = deltas.get(new_category, 0) + new_value_cents
+    deltas[TOTAL] = (new_value_cents if new_category is not None else 0) - \
+                    (old_value_cents if old_category is not None else 0)
+    for category, delta in deltas.items():
+        if delta:
+            _apply_delta(cursor, dialect, user_id, category, delta, day, applied)
+
+
+def snapshot_user(cursor, dialect, user_id, day=None):
+    """Recompute and store one user's per-category and total values for a day"""
+    day = day or _today()
+    cursor.execute(prepare("""
+        SELECT c.name AS category, t.value_cents
+        FROM (SELECT category_id, COALESCE(SUM(price_cents * stock), 0) AS value_cents
+              FROM products WHERE user_id = ? GROUP BY category_id) t
+        JOIN categories c ON c.id = t.category_id
+    """, dialect), (user_id,))
+    rows = cursor.fetchall()
+    values = {}
+    for row in rows:
+        category, value = (row['category'], row['value_cents']) if isinstance(row, dict) else row
+        values[category] = int(value)
+    values[TOTAL] = sum(values.values())
+
+    cursor.execute(prepare("DELETE FROM inventory_snapshots WHERE user_id = ? AND snapshot_date = ?", dialect),
+                   (user_id, day))
+    cursor.executemany(prepare("""
+        INSERT INTO inventory_snapshots (user_id, category, snapshot_date, value_cents)
+        VALUES (?, ?, ?, ?)
+    """, dialect), [(user_id, category, day, value) for category, value in values.items()])
+    return values
+
+
+def take_snapshots(connection, dialect, day=None):
+    """Snapshot every user; returns the number of users processed"""
+    cursor = connection.cursor()
+    cursor.execute("SELECT id FROM users")
+    user_ids = [row['id'] if isinstance(row, dict) else row[0] for row in cursor.fetchall()]
+    for user_id in user_ids:
+        snapshot_user(cursor, dialect, user_id, day)
+        connection.commit()
+    return len(user_ids)
+
+
+def product_removed(cursor, dialect, user_id, product_id, day=None):
+    """Record a product's value leaving the inventory (call before deleting it)"""
+    cursor.execute(prepare("""
+        SELECT c.name AS category, p.price_cents, p.stock
+        FROM products p JOIN categories c ON c.id = p.category_id WHERE p.id = ? AND p.user_id = ?
+    """, dialect), (product_id, user_id))
+    row = cursor.fetchone()
+    if row is None:
+        return
+    category, price_cents, stock = (row['category'], row['price_cents'], row['stock']) \
+        if isinstance(row, dict) else row
+    record_value_change(cursor, dialect, user_id, category, price_cents * stock, None, 0, day, applied=False)
+
+
+def value_history(cursor, dialect, user_id, date_from, date_to, category=TOTAL):
+    """(day, value_cents) pairs for days with a recorded value, oldest first
+
+    Includes the last value before date_from (dated date_from) so a chart can
+    start from the right level even if nothing changed on that day.
+    """
+    cursor.execute(prepare("""
+        SELECT snapshot_date, value_cents FROM inventory_snapshots
+        WHERE user_id = ? AND category = ? AND snapshot_date < ?
+        ORDER BY snapshot_date DESC LIMIT 1
+    """, dialect), (user_id, category, date_from))
+    rows = cursor.fetchall()
+    history = [(date_from, _value(row)) for row in rows]
+    cursor.execute(prepare("""
+        SELECT snapshot_date, value_cents FROM inventory_snapshots
+        WHERE user_id = ? AND category = ? AND snapshot_date BETWEEN ? AND ?
+        ORDER BY snapshot_date
+    """, dialect), (user_id, category, date_from, date_to))
+    for row in cursor.fetchall():
+        day = row['snapshot_date'] if isinstance(row, dict) else row[0]
+        history.append((str(day), _value(row)))
+    return history
+
+
+def _value(row):
+    return int(row['value_cents'] if isinstance(row, dict) else row[1])
+
+
+if __name__ == "__main__":
+    # Scheduled snapshot of the SQLite database, e.g. from a nightly cron job
+    from db import create_connection, create_tables
+    connection = create_connection()
+    if connection:
+        create_tables(connection)
+        print(f"Snapshotted {take_snapshots(connection, 'sqlite')} user(s)")
+        connection.close()
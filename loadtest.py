@@ -0,0 +1,351 @@
+"""
+Concurrent multi-user load test for Smart Budget and Inventory Manager
+Simulated users run a weighted mix of operations through the Repository for
+a fixed time, each as a thread (--mode thread: one app process serving
+everyone, SQLite writes sharing its write queue) or a process (--mode
+process: separate app instances, each SQLite process with its own write
+queue contending for the database lock):
+    add_expense   Repository.add_expense
+    list          the user's newest LOADTEST_LIST_LIMIT expenses
+    purchase      one unit of a random product (Repository.purchase)
+    report        dashboard, category totals, monthly totals or inventory
+Every simulated MySQL user has its own DatabaseManager (its own
+connection); every SQLite user has its own read connection.
+
+Per backend and operation it reports throughput, p50/p95/p99 latency, lock
+timeouts (SQLite "database is locked", MySQL lock wait timeout or deadlock)
+and other errors, and saves the run as JSON in LOADTEST_DIR:
+
+    python loadtest.py run --users 20 --duration 30 --backend sqlite mysql
+    python loadtest.py run --mix add_expense=50,list=30,purchase=10,report=10
+    python loadtest.py compare OLD.json NEW.json
+
+Without --db the SQLite run uses a new database in a temporary directory, so
+every run starts from the same state. MySQL runs use DB_CONFIG's database
+and leave their loadtest-* users in it.
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from datetime import date as Date, datetime, timedelta
+
+from config import (APP_VERSION, LOADTEST_MIX, LOADTEST_LIST_LIMIT, LOADTEST_SEED_PRODUCTS,
+                    LOADTEST_SEED_EXPENSES, LOADTEST_DIR)
+from categories import EXPENSE_CATEGORIES, PRODUCT_CATEGORIES
+from expense_query import ExpenseFilter
+from models import Money
+from repository import Repository, MySQLBackend, SQLiteBackend
+
+OPERATIONS = ('add_expense', 'list', 'purchase', 'report')
+REPORTS = ('dashboard', 'category_totals', 'monthly_totals', 'inventory')
+PERCENTILES = (50, 95, 99)
+# MySQL lock wait timeout and deadlock
+_MYSQL_LOCK_ERRORS = {1205, 1213}
+_ERRORS_KEPT = 5
+
+
+def parse_mix(text):
+    """{'add_expense': 40, ...} from 'add_expense=40,list=30,...'"""
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise ValueError(f"Unknown operation {name!r}; choose from {', '.join(OPERATIONS)}")
+        mix[name] = float(weight)
+        if mix[name] < 0:
+            raise ValueError(f"Weight of {name} must not be negative")
+    if not any(mix.values()):
+        raise ValueError("The mix needs at least one operation with a weight")
+    return mix
+
+
+def _outcome(error):
+    """'lock_timeout' for an error from waiting on a database lock, otherwise 'error'"""
+    if getattr(error, 'errno', None) in _MYSQL_LOCK_ERRORS:
+        return 'lock_timeout'
+    text = str(error).lower()
+    return 'lock_timeout' if 'database is locked' in text or 'database is busy' in text else 'error'
+
+
+def _repository(backend, db_file, write_queue):
+    if backend == 'mysql':
+        from database import DatabaseManager
+        return Repository(MySQLBackend(DatabaseManager()))
+    return Repository(SQLiteBackend(db_file, write_queue))
+
+
+def _close(repo):
+    if repo.dialect == 'mysql':
+        repo.backend.manager.disconnect()
+    else:
+        repo.backend.close()
+
+
+def _operations(repo, user_id, product_ids, rng):
+    today = Date.today()
+
+    def add_expense():
+        day = today - timedelta(days=rng.randrange(90))
+        repo.add_expense(user_id, day.isoformat(), rng.choice(EXPENSE_CATEGORIES),
+                         Money(rng.randint(100, 20000)), "Load test")
+
+    def list_expenses():
+        for _ in repo.iter_expenses(ExpenseFilter(user_id, limit=LOADTEST_LIST_LIMIT)):
+            pass
+
+    def purchase():
+        repo.purchase(user_id, rng.choice(product_ids), 1)
+
+    def report():
+        getattr(repo, rng.choice(REPORTS))(user_id)
+
+    return {'add_expense': add_expense, 'list': list_expenses, 'purchase': purchase, 'report': report}
+
+
+def seed(repo, run_id, users, products=LOADTEST_SEED_PRODUCTS, expenses=LOADTEST_SEED_EXPENSES):
+    """Create the simulated users with products and expense history; returns [(user_id, product_ids)]"""
+    rng = random.Random(run_id)
+    seeded = []
+    for n in range(users):
+        user_id = repo.create_user(f"loadtest-{run_id}-{n}", "loadtest")
+        product_ids = [repo.add_product(user_id, f"Item {i}", rng.choice(PRODUCT_CATEGORIES),
+                                        Money(rng.randint(100, 5000)), 1_000_000).id
+                       for i in range(products)]
+        operations = _operations(repo, user_id, product_ids, rng)
+        for _ in range(expenses):
+            operations['add_expense']()
+        seeded.append((user_id, product_ids))
+    return seeded
+
+
+def simulate_user(backend, db_file, user_id, product_ids, mix, start_at, duration, think, seed_value,
+                  write_queue=None):
+    """Run one simulated user until start_at + duration
+
+    Returns (samples, errors): a (operation, seconds, outcome) per operation
+    and the first few error messages.
+    """
+    own_queue = None
+    if backend == 'sqlite' and write_queue is None:
+        from write_queue import WriteQueue
+        write_queue = own_queue = WriteQueue(db_file)
+    repo = _repository(backend, db_file, write_queue)
+    rng = random.Random(seed_value)
+    operations = _operations(repo, user_id, product_ids, rng)
+    names = [name for name in mix if mix[name]]
+    weights = [mix[name] for name in names]
+    samples, errors = [], []
+    try:
+        time.sleep(max(0.0, start_at - time.time()))
+        deadline = start_at + duration
+        while time.time() < deadline:
+            name = rng.choices(names, weights)[0]
+            began = time.perf_counter()
+            try:
+                operations[name]()
+                outcome = 'ok'
+            except Exception as e:
+                outcome = _outcome(e)
+                if len(errors) < _ERRORS_KEPT:
+                    errors.append(f"{name}: {type(e).__name__}: {e}")
+            samples.append((name, time.perf_counter() - began, outcome))
+            if think:
+                time.sleep(rng.expovariate(1 / think))
+    finally:
+        _close(repo)
+        if own_queue:
+            own_queue.close()
+    return samples, errors
+
+
+def _simulate_job(job):
+    return simulate_user(*job)
+
+
+def percentile(ordered, p):
+    """Nearest-rank percentile of an ascending list (None if it is empty)"""
+    if not ordered:
+        return None
+    return ordered[max(0, -(-p * len(ordered) // 100) - 1)]
+
+
+def summarize(samples, duration):
+    """{'operations': {name: stats}, 'total': stats} with latencies in milliseconds"""
+    def stats(group):
+        latencies = sorted(seconds * 1000 for _, seconds, outcome in group if outcome == 'ok')
+        result = {
+            'ok': len(latencies),
+            'lock_timeouts': sum(1 for _, _, outcome in group if outcome == 'lock_timeout'),
+            'errors': sum(1 for _, _, outcome in group if outcome == 'error'),
+            'throughput': round(len(latencies) / duration, 2),
+        }
+        for p in PERCENTILES:
+            value = percentile(latencies, p)
+            result[f'p{p}_ms'] = round(value, 3) if value is not None else None
+        return result
+
+    by_operation = {}
+    for sample in samples:
+        by_operation.setdefault(sample[0], []).append(sample)
+    return {'operations': {name: stats(by_operation[name]) for name in OPERATIONS if name in by_operation},
+            'total': stats(samples)}
+
+
+def run_backend(backend, users, duration, mix, mode='thread', think=0.0, db_file=None):
+    """Seed and run one backend; returns its summary plus the first errors seen"""
+    from write_queue import WriteQueue
+    run_id = datetime.now().strftime('%Y%m%d%H%M%S')
+    if backend == 'sqlite' and db_file is None:
+        from db import create_connection, create_tables
+        db_file = os.path.join(tempfile.mkdtemp(prefix='loadtest-'), 'loadtest.db')
+        connection = create_connection(db_file)
+        create_tables(connection)
+        connection.close()
+
+    shared_queue = WriteQueue(db_file) if backend == 'sqlite' else None
+    try:
+        repo = _repository(backend, db_file, shared_queue)
+        try:
+            seeded = seed(repo, run_id, users)
+        finally:
+            _close(repo)
+        print(f"✓ Seeded {users} user(s) on {backend}; running for {duration:g}s")
+
+        start_at = time.time() + 1.0
+        # Threads share this process's write queue; processes each open their own
+        queue = shared_queue if mode == 'thread' else None
+        jobs = [(backend, db_file, user_id, product_ids, mix, start_at, duration, think, f"{run_id}-{n}", queue)
+                for n, (user_id, product_ids) in enumerate(seeded)]
+        executor = ThreadPoolExecutor if mode == 'thread' else ProcessPoolExecutor
+        with executor(max_workers=users) as pool:
+            results = list(pool.map(_simulate_job, jobs))
+    finally:
+        if shared_queue:
+            shared_queue.close()
+
+    samples = [sample for user_samples, _ in results for sample in user_samples]
+    summary = summarize(samples, duration)
+    summary['first_errors'] = [error for _, errors in results for error in errors][:_ERRORS_KEPT]
+    return summary
+
+
+def _commit():
+    """Short git commit of this checkout, if there is one"""
+    try:
+        result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10)
+        return result.stdout.strip() or None
+    except Exception:
+        return None
+
+
+def _ms(value):
+    return f"{value:.1f}" if value is not None else "-"
+
+
+def print_summary(backend, summary):
+    print(f"\n{backend.upper()}")
+    print(f"{'Operation':<12} {'OK':>7} {'Ops/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'Locks':>6} {'Errors':>6}")
+    print("-" * 72)
+    rows = list(summary['operations'].items()) + [('total', summary['total'])]
+    for name, stats in rows:
+        print(f"{name:<12} {stats['ok']:>7} {stats['throughput']:>8.1f} {_ms(stats['p50_ms']):>8} "
+              f"{_ms(stats['p95_ms']):>8} {_ms(stats['p99_ms']):>8} {stats['lock_timeouts']:>6} {stats['errors']:>6}")
+    for error in summary['first_errors']:
+        print(f"  ✗ {error}")
+
+
+def save(results, directory=LOADTEST_DIR):
+    os.makedirs(directory, exist_ok=True)
+    started = datetime.fromisoformat(results['started'])
+    path = os.path.join(directory, f"{started:%Y%m%d-%H%M%S}-{results['mode']}-{results['users']}u.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    return path
+
+
+def _change(old, new):
+    if old is None or new is None:
+        return "-"
+    if not old:
+        return f"{new:.1f}"
+    return f"{old:.1f} → {new:.1f} ({(new - old) / old * 100:+.0f}%)"
+
+
+def compare(old, new):
+    """Print throughput and p95 changes per backend and operation between two saved runs"""
+    print(f"{old.get('commit') or old['started']} → {new.get('commit') or new['started']}")
+    for backend in new['backends']:
+        if backend not in old['backends']:
+            continue
+        print(f"\n{backend.upper()}")
+        before, after = old['backends'][backend], new['backends'][backend]
+        names = [name for name in OPERATIONS if name in before['operations'] and name in after['operations']]
+        for name, a, b in [(name, before['operations'][name], after['operations'][name]) for name in names] + \
+                          [('total', before['total'], after['total'])]:
+            print(f"{name:<12} ops/s {_change(a['throughput'], b['throughput']):<28} "
+                  f"p95 ms {_change(a['p95_ms'], b['p95_ms'])}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the data layer with concurrent simulated users")
+    parser.add_argument('command', choices=('run', 'compare'))
+    parser.add_argument('files', nargs='*', help="two saved result files (for compare)")
+    parser.add_argument('--users', type=int, default=10, help="simulated users (default 10)")
+    parser.add_argument('--duration', type=float, default=30, help="seconds per backend (default 30)")
+    parser.add_argument('--mix', default=','.join(f"{name}={weight}" for name, weight in LOADTEST_MIX.items()),
+                        help="operation weights, e.g. add_expense=40,list=30,purchase=20,report=10")
+    parser.add_argument('--mode', choices=('thread', 'process'), default='thread',
+                        help="simulate each user as a thread or a process")
+    parser.add_argument('--think', type=float, default=0.0, help="mean pause between operations in seconds")
+    parser.add_argument('--backend', nargs='+', choices=('sqlite', 'mysql'), default=['sqlite'])
+    parser.add_argument('--db', help="SQLite database file (default: a new temporary database)")
+    parser.add_argument('--out', default=LOADTEST_DIR, help=f"results directory (default {LOADTEST_DIR})")
+    args = parser.parse_args(argv)
+
+    if args.command == 'compare':
+        if len(args.files) != 2:
+            parser.error("compare needs two result files")
+        try:
+            old, new = (json.load(open(path, encoding='utf-8')) for path in args.files)
+        except Exception as e:
+            print(f"✗ {e}")
+            return 2
+        compare(old, new)
+        return 0
+
+    try:
+        mix = parse_mix(args.mix)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.users < 1 or args.duration <= 0:
+        parser.error("--users and --duration must be positive")
+
+    results = {'started': datetime.now().isoformat(timespec='seconds'), 'version': APP_VERSION,
+               'commit': _commit(), 'mode': args.mode, 'users': args.users, 'duration': args.duration,
+               'think': args.think, 'mix': mix, 'backends': {}}
+    failed = False
+    for backend in args.backend:
+        try:
+            summary = run_backend(backend, args.users, args.duration, mix, args.mode, args.think, args.db)
+        except Exception as e:
+            print(f"✗ {backend} load test failed: {e}")
+            failed = True
+            continue
+        results['backends'][backend] = summary
+        print_summary(backend, summary)
+    if results['backends']:
+        print(f"\n✓ Results saved to {save(results, args.out)}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
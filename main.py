@@ -3,10 +3,13 @@ Main CLI for Smart Budget and Inventory Manager
 Handles user login/registration and main menu navigation
 """
 
-from database import db
+from repository import get_repository
 from expense_tracker import ExpenseTracker
 from inventory_manager import InventoryManager
 from reports import Reports
+from config import PROFILE_DIR
+import profiling
+import argparse
 import getpass
 
 APP_NAME = "Smart Budget and Inventory Manager"
@@ -14,24 +17,30 @@ APP_NAME = "Smart Budget and Inventory Manager"
 # --- User Authentication ---
 def register():
     print("\nREGISTER NEW USER")
+    repo = get_repository('mysql')
     while True:
         username = input("Enter username: ").strip()
         if not username:
             print("Username cannot be empty.")
             continue
-        if db.user_exists(username):
-            print("Username already exists. Try another.")
-            continue
+        try:
+            if repo.user_exists(username):
+                print("Username already exists. Try another.")
+                continue
+        except Exception as e:
+            print(f"✗ Database error: {e}")
+            return
         password = getpass.getpass("Enter password: ")
         confirm = getpass.getpass("Confirm password: ")
         if password != confirm:
             print("Passwords do not match.")
             continue
-        if db.create_user(username, password):
+        try:
+            repo.create_user(username, password)
             print("✓ Registration successful! You can now log in.")
             break
-        else:
-            print("✗ Registration failed. Try again.")
+        except Exception as e:
+            print(f"✗ Registration failed: {e}. Try again.")
 
 
 def login():
@@ -39,10 +48,14 @@ def login():
     for _ in range(3):
         username = input("Username: ").strip()
         password = getpass.getpass("Password: ")
-        user = db.validate_user(username, password)
-        if user:
-            print(f"\nWelcome, {user['username']}!")
-            return user['id']
+        try:
+            user_id = get_repository('mysql').login(username, password)
+        except Exception as e:
+            print(f"✗ Database error: {e}")
+            return None
+        if user_id:
+            print(f"\nWelcome, {username}!")
+            return user_id
         else:
             print("Invalid credentials. Try again.")
     print("Too many failed attempts. Exiting.")
@@ -53,6 +66,14 @@ def main_menu(user_id):
     expense_tracker = ExpenseTracker(user_id)
     inventory_manager = InventoryManager(user_id)
     reports = Reports(user_id)
+    # Menu actions; profiled when profiling is enabled
+    profiling.instrument(expense_tracker, ('add_expense', 'view_expenses', 'delete_expense', 'filter_expenses',
+                                           'recurring_expenses', 'materialize_recurring'))
+    profiling.instrument(inventory_manager, ('add_product', 'view_products', 'edit_product', 'delete_product',
+                                             'simulate_purchase', 'receive_stock', 'stock_history'))
+    profiling.instrument(reports, ('monthly_expenses', 'low_stock_products', 'total_inventory_value',
+                                   'expense_summary', 'anomalies', 'stock_forecast', 'spend_forecast'))
+    expense_tracker.materialize_recurring()
     while True:
         print("\n" + "="*50)
         print(f"{APP_NAME} - Main Menu")
@@ -82,7 +103,8 @@ def expense_menu(expense_tracker):
         print("2. View All Expenses")
         print("3. Delete Expense")
         print("4. Filter Expenses")
-        print("5. Back to Main Menu")
+        print("5. Recurring Expenses")
+        print("6. Back to Main Menu")
         choice = input("Select an option: ").strip()
         if choice == '1':
             expense_tracker.add_expense()
@@ -93,6 +115,8 @@ def expense_menu(expense_tracker):
         elif choice == '4':
             expense_tracker.filter_expenses()
         elif choice == '5':
+            expense_tracker.recurring_expenses()
+        elif choice == '6':
             break
         else:
             print("Invalid choice. Try again.")
@@ -106,7 +130,9 @@ def inventory_menu(inventory_manager):
         print("3. Edit Product")
         print("4. Delete Product")
         print("5. Simulate Purchase")
-        print("6. Back to Main Menu")
+        print("6. Receive Stock")
+        print("7. Stock History")
+        print("8. Back to Main Menu")
         choice = input("Select an option: ").strip()
         if choice == '1':
             inventory_manager.add_product()
@@ -119,6 +145,10 @@ def inventory_menu(inventory_manager):
         elif choice == '5':
             inventory_manager.simulate_purchase()
         elif choice == '6':
+            inventory_manager.receive_stock()
+        elif choice == '7':
+            inventory_manager.stock_history()
+        elif choice == '8':
             break
         else:
             print("Invalid choice. Try again.")
@@ -130,7 +160,11 @@ def reports_menu(reports):
         print("1. Monthly Total Expenses")
         print("2. Products Low in Stock")
         print("3. Total Inventory Value")
-        print("4. Back to Main Menu")
+        print("4. Expense Summary")
+        print("5. Unusual Expenses")
+        print("6. Stock Forecast")
+        print("7. Month-End Spend Forecast")
+        print("8. Back to Main Menu")
         choice = input("Select an option: ").strip()
         if choice == '1':
             reports.monthly_expenses()
@@ -139,6 +173,14 @@ def reports_menu(reports):
         elif choice == '3':
             reports.total_inventory_value()
         elif choice == '4':
+            reports.expense_summary()
+        elif choice == '5':
+            reports.anomalies()
+        elif choice == '6':
+            reports.stock_forecast()
+        elif choice == '7':
+            reports.spend_forecast()
+        elif choice == '8':
             break
         else:
             print("Invalid choice. Try again.")
@@ -166,4 +208,12 @@ def main():
             print("Invalid choice. Try again.")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=APP_NAME)
+    parser.add_argument('--profile', nargs='?', const=PROFILE_DIR, metavar='DIR',
+                        help=f"profile each menu action into DIR (default {PROFILE_DIR})")
+    args = parser.parse_args()
+    if args.profile:
+        profiling.enable(args.profile)
+    if profiling.enabled():
+        print(f"Profiling menu actions into {profiling.directory()}/")
     main() 
\ No newline at end of file
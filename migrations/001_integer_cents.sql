@@ -0,0 +1,14 @@
+-- Smart Budget and Inventory Manager - migration 001
+-- Store money as integer cents instead of DECIMAL(10,2)
+-- Run once against databases created before this change:
+--   mysql smart_budget_db < migrations/001_integer_cents.sql
+
+USE smart_budget_db;
+
+ALTER TABLE expenses ADD COLUMN amount_cents BIGINT NOT NULL DEFAULT 0 AFTER category;
+UPDATE expenses SET amount_cents = ROUND(amount * 100);
+ALTER TABLE expenses DROP COLUMN amount, ALTER COLUMN amount_cents DROP DEFAULT;
+
+ALTER TABLE products ADD COLUMN price_cents BIGINT NOT NULL DEFAULT 0 AFTER category;
+UPDATE products SET price_cents = ROUND(price * 100);
+ALTER TABLE products DROP COLUMN price, ALTER COLUMN price_cents DROP DEFAULT;
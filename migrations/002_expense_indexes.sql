@@ -0,0 +1,8 @@
+-- Smart Budget and Inventory Manager - migration 002
+-- Composite indexes used by the expense query engine (expense_query.py)
+-- Window functions in its queries need MySQL 8.0 or later
+
+USE smart_budget_db;
+
+CREATE INDEX idx_expenses_user_date ON expenses (user_id, date);
+CREATE INDEX idx_expenses_user_category_date ON expenses (user_id, category, date);
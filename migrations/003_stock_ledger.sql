@@ -0,0 +1,33 @@
+-- Smart Budget and Inventory Manager - migration 003
+-- Append-only stock ledger with checkpoints (see stock_ledger.py)
+-- Existing products get an opening-balance movement and checkpoint
+
+USE smart_budget_db;
+
+CREATE TABLE IF NOT EXISTS stock_movements (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    product_id INT NOT NULL,
+    user_id INT NOT NULL,
+    kind ENUM('receipt', 'sale', 'adjustment') NOT NULL,
+    quantity INT NOT NULL,
+    note VARCHAR(255),
+    created_at DATETIME NOT NULL,
+    FOREIGN KEY (product_id) REFERENCES products(id) ON DELETE CASCADE,
+    INDEX idx_stock_movements_product (product_id, id)
+);
+
+CREATE TABLE IF NOT EXISTS stock_checkpoints (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    product_id INT NOT NULL,
+    movement_id INT NOT NULL,
+    balance INT NOT NULL,
+    created_at DATETIME NOT NULL,
+    FOREIGN KEY (product_id) REFERENCES products(id) ON DELETE CASCADE,
+    INDEX idx_stock_checkpoints_product (product_id, created_at, movement_id)
+);
+
+INSERT INTO stock_movements (product_id, user_id, kind, quantity, note, created_at)
+SELECT id, user_id, 'adjustment', stock, 'Opening balance', NOW() FROM products;
+
+INSERT INTO stock_checkpoints (product_id, movement_id, balance, created_at)
+SELECT product_id, id, quantity, created_at FROM stock_movements;
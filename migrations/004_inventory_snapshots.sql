@@ -0,0 +1,21 @@
+-- Smart Budget and Inventory Manager - migration 004
+-- Daily inventory value history (see inventory_snapshots.py), seeded with today's values
+
+USE smart_budget_db;
+
+-- Inventory value per user, category and day; category '' is the user's total
+CREATE TABLE IF NOT EXISTS inventory_snapshots (
+    user_id INT NOT NULL,
+    category VARCHAR(50) NOT NULL,
+    snapshot_date DATE NOT NULL,
+    value_cents BIGINT NOT NULL,
+    PRIMARY KEY (user_id, category, snapshot_date),
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
+INSERT INTO inventory_snapshots (user_id, category, snapshot_date, value_cents)
+SELECT user_id, category, CURDATE(), SUM(price_cents * stock)
+FROM products GROUP BY user_id, category
+UNION ALL
+SELECT user_id, '', CURDATE(), SUM(price_cents * stock)
+FROM products GROUP BY user_id;
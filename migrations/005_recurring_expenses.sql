@@ -0,0 +1,25 @@
+-- Smart Budget and Inventory Manager - migration 005
+-- Recurring expense templates (see recurring.py)
+
+USE smart_budget_db;
+
+-- Generated expenses point at their template; the unique key makes re-runs insert nothing
+ALTER TABLE expenses
+    ADD COLUMN recurring_id INT NULL AFTER description,
+    ADD UNIQUE INDEX idx_expenses_recurring_date (recurring_id, date);
+
+CREATE TABLE IF NOT EXISTS recurring_expenses (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    user_id INT NOT NULL,
+    category VARCHAR(50) NOT NULL,
+    amount_cents BIGINT NOT NULL,
+    description VARCHAR(255),
+    frequency ENUM('daily', 'weekly', 'monthly', 'custom') NOT NULL,
+    interval_count INT NOT NULL DEFAULT 1,
+    start_date DATE NOT NULL,
+    next_due DATE NOT NULL,
+    end_date DATE NULL,
+    active TINYINT(1) NOT NULL DEFAULT 1,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+    INDEX idx_recurring_next_due (next_due, user_id)
+);
@@ -0,0 +1,29 @@
+-- Smart Budget and Inventory Manager - migration 006
+-- Per-user data versions for the report result cache (see report_cache.py)
+
+USE smart_budget_db;
+
+-- Per-user counter bumped on every expense/product write; report results are cached per version
+CREATE TABLE IF NOT EXISTS data_versions (
+    user_id INT PRIMARY KEY,
+    version BIGINT NOT NULL
+);
+
+CREATE TRIGGER trg_expenses_insert_version AFTER INSERT ON expenses FOR EACH ROW
+    INSERT INTO data_versions (user_id, version) VALUES (NEW.user_id, 1)
+    ON DUPLICATE KEY UPDATE version = version + 1;
+CREATE TRIGGER trg_expenses_update_version AFTER UPDATE ON expenses FOR EACH ROW
+    INSERT INTO data_versions (user_id, version) VALUES (NEW.user_id, 1)
+    ON DUPLICATE KEY UPDATE version = version + 1;
+CREATE TRIGGER trg_expenses_delete_version AFTER DELETE ON expenses FOR EACH ROW
+    INSERT INTO data_versions (user_id, version) VALUES (OLD.user_id, 1)
+    ON DUPLICATE KEY UPDATE version = version + 1;
+CREATE TRIGGER trg_products_insert_version AFTER INSERT ON products FOR EACH ROW
+    INSERT INTO data_versions (user_id, version) VALUES (NEW.user_id, 1)
+    ON DUPLICATE KEY UPDATE version = version + 1;
+CREATE TRIGGER trg_products_update_version AFTER UPDATE ON products FOR EACH ROW
+    INSERT INTO data_versions (user_id, version) VALUES (NEW.user_id, 1)
+    ON DUPLICATE KEY UPDATE version = version + 1;
+CREATE TRIGGER trg_products_delete_version AFTER DELETE ON products FOR EACH ROW
+    INSERT INTO data_versions (user_id, version) VALUES (OLD.user_id, 1)
+    ON DUPLICATE KEY UPDATE version = version + 1;
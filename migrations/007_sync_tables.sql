@@ -0,0 +1,21 @@
+-- Smart Budget and Inventory Manager - migration 007
+-- Bookkeeping tables for the MySQL/SQLite sync (see sync.py)
+
+USE smart_budget_db;
+
+-- Bookkeeping for sync.py: high-water mark per source table and source id -> local id
+CREATE TABLE IF NOT EXISTS sync_state (
+    source VARCHAR(10) NOT NULL,
+    table_name VARCHAR(30) NOT NULL,
+    last_id BIGINT NOT NULL,
+    PRIMARY KEY (source, table_name)
+);
+
+CREATE TABLE IF NOT EXISTS sync_map (
+    source VARCHAR(10) NOT NULL,
+    table_name VARCHAR(30) NOT NULL,
+    source_id BIGINT NOT NULL,
+    target_id BIGINT NOT NULL,
+    PRIMARY KEY (source, table_name, source_id),
+    INDEX idx_sync_map_target (source, table_name, target_id)
+);
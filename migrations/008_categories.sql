@@ -0,0 +1,62 @@
+-- Smart Budget and Inventory Manager - migration 008
+-- Per-user categories table; expenses, products and recurring templates
+-- reference it by integer id instead of repeating the name (see categories.py)
+
+USE smart_budget_db;
+
+CREATE TABLE IF NOT EXISTS categories (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    user_id INT NOT NULL,
+    name VARCHAR(50) NOT NULL,
+    UNIQUE INDEX idx_categories_user_name (user_id, name),
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
+-- Purchases were once recorded as 'Product Purchase' by the GUI
+UPDATE expenses SET category = 'Shopping' WHERE category = 'Product Purchase';
+
+-- One row per trimmed name; the case-insensitive collation merges spellings
+-- that differ only in case, keeping the most used one
+INSERT IGNORE INTO categories (user_id, name)
+SELECT user_id, ANY_VALUE(name) FROM (
+    SELECT user_id, COALESCE(NULLIF(TRIM(category), ''), 'Other') AS name FROM expenses
+    UNION ALL SELECT user_id, COALESCE(NULLIF(TRIM(category), ''), 'Other') FROM products
+    UNION ALL SELECT user_id, COALESCE(NULLIF(TRIM(category), ''), 'Other') FROM recurring_expenses
+) AS used
+GROUP BY user_id, CAST(name AS BINARY)
+ORDER BY COUNT(*) DESC;
+
+ALTER TABLE expenses ADD COLUMN category_id INT NULL AFTER date;
+UPDATE expenses e
+JOIN categories c ON c.user_id = e.user_id AND c.name = COALESCE(NULLIF(TRIM(e.category), ''), 'Other')
+SET e.category_id = c.id;
+ALTER TABLE expenses
+    MODIFY category_id INT NOT NULL,
+    ADD FOREIGN KEY (category_id) REFERENCES categories(id),
+    DROP INDEX idx_expenses_user_category_date,
+    ADD INDEX idx_expenses_user_category_date (user_id, category_id, date),
+    DROP COLUMN category;
+
+ALTER TABLE products ADD COLUMN category_id INT NULL AFTER name;
+UPDATE products p
+JOIN categories c ON c.user_id = p.user_id AND c.name = COALESCE(NULLIF(TRIM(p.category), ''), 'Other')
+SET p.category_id = c.id;
+ALTER TABLE products
+    MODIFY category_id INT NOT NULL,
+    ADD FOREIGN KEY (category_id) REFERENCES categories(id),
+    DROP COLUMN category;
+
+ALTER TABLE recurring_expenses ADD COLUMN category_id INT NULL AFTER user_id;
+UPDATE recurring_expenses r
+JOIN categories c ON c.user_id = r.user_id AND c.name = COALESCE(NULLIF(TRIM(r.category), ''), 'Other')
+SET r.category_id = c.id;
+ALTER TABLE recurring_expenses
+    MODIFY category_id INT NOT NULL,
+    ADD FOREIGN KEY (category_id) REFERENCES categories(id),
+    DROP COLUMN category;
+
+-- Inventory history keeps names; store them in the categories' spelling
+UPDATE IGNORE inventory_snapshots s
+JOIN categories c ON c.user_id = s.user_id AND c.name = TRIM(s.category)
+SET s.category = c.name
+WHERE s.category != '';
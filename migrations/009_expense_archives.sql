@@ -0,0 +1,22 @@
+-- Smart Budget and Inventory Manager - migration 009
+-- Catalog and rollup tables for archiving old expenses into per-year tables (see archive.py)
+
+USE smart_budget_db;
+
+-- Archive tables (expenses_archive_YYYY) and the dates each holds
+CREATE TABLE IF NOT EXISTS expense_archives (
+    table_name VARCHAR(64) PRIMARY KEY,
+    first_date DATE NOT NULL,
+    last_date DATE NOT NULL,
+    row_count BIGINT NOT NULL
+);
+
+-- Count and total of archived expenses per user, month and category, for all-time reports
+CREATE TABLE IF NOT EXISTS expense_archive_totals (
+    user_id INT NOT NULL,
+    month CHAR(7) NOT NULL,
+    category_id INT NOT NULL,
+    count INT NOT NULL,
+    total_cents BIGINT NOT NULL,
+    PRIMARY KEY (user_id, month, category_id)
+);
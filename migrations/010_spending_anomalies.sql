@@ -0,0 +1,29 @@
+-- Smart Budget and Inventory Manager - migration 010
+-- Statistics and flags for spending anomaly detection (see anomalies.py).
+-- Afterwards run `python anomalies.py --backend mysql` once to compute them from existing expenses.
+
+USE smart_budget_db;
+
+-- Running statistics per user and category for anomaly detection (see anomalies.py)
+CREATE TABLE IF NOT EXISTS spending_stats (
+    user_id INT NOT NULL,
+    category_id INT NOT NULL,
+    count INT NOT NULL,
+    mean DOUBLE NOT NULL,
+    m2 DOUBLE NOT NULL,
+    recent TEXT NOT NULL,
+    PRIMARY KEY (user_id, category_id)
+);
+
+-- Expenses flagged as unusually high when they were added
+CREATE TABLE IF NOT EXISTS spending_anomalies (
+    expense_id INT PRIMARY KEY,
+    user_id INT NOT NULL,
+    category_id INT NOT NULL,
+    date DATE NOT NULL,
+    amount_cents BIGINT NOT NULL,
+    mean_cents BIGINT NOT NULL,
+    quantile_cents BIGINT NOT NULL,
+    z_score DOUBLE NULL,
+    INDEX idx_spending_anomalies_user_date (user_id, date)
+);
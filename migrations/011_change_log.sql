@@ -0,0 +1,39 @@
+-- Smart Budget and Inventory Manager - migration 011
+-- Change log for expenses and products, maintained by triggers (see change_log.py)
+
+USE smart_budget_db;
+
+-- Change capture (see change_log.py): every insert, update and delete on expenses and products
+CREATE TABLE IF NOT EXISTS change_log (
+    seq BIGINT AUTO_INCREMENT PRIMARY KEY,
+    table_name VARCHAR(30) NOT NULL,
+    row_id INT NOT NULL,
+    user_id INT NOT NULL,
+    op ENUM('insert', 'update', 'delete', 'archive') NOT NULL,
+    changed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Position each named consumer has read the change log up to
+CREATE TABLE IF NOT EXISTS change_consumers (
+    name VARCHAR(64) PRIMARY KEY,
+    last_seq BIGINT NOT NULL
+);
+
+DROP TRIGGER IF EXISTS trg_expenses_insert_changes;
+CREATE TRIGGER trg_expenses_insert_changes AFTER INSERT ON expenses FOR EACH ROW
+    INSERT INTO change_log (table_name, row_id, user_id, op) VALUES ('expenses', NEW.id, NEW.user_id, 'insert');
+DROP TRIGGER IF EXISTS trg_expenses_update_changes;
+CREATE TRIGGER trg_expenses_update_changes AFTER UPDATE ON expenses FOR EACH ROW
+    INSERT INTO change_log (table_name, row_id, user_id, op) VALUES ('expenses', NEW.id, NEW.user_id, 'update');
+DROP TRIGGER IF EXISTS trg_expenses_delete_changes;
+CREATE TRIGGER trg_expenses_delete_changes AFTER DELETE ON expenses FOR EACH ROW
+    INSERT INTO change_log (table_name, row_id, user_id, op) VALUES ('expenses', OLD.id, OLD.user_id, 'delete');
+DROP TRIGGER IF EXISTS trg_products_insert_changes;
+CREATE TRIGGER trg_products_insert_changes AFTER INSERT ON products FOR EACH ROW
+    INSERT INTO change_log (table_name, row_id, user_id, op) VALUES ('products', NEW.id, NEW.user_id, 'insert');
+DROP TRIGGER IF EXISTS trg_products_update_changes;
+CREATE TRIGGER trg_products_update_changes AFTER UPDATE ON products FOR EACH ROW
+    INSERT INTO change_log (table_name, row_id, user_id, op) VALUES ('products', NEW.id, NEW.user_id, 'update');
+DROP TRIGGER IF EXISTS trg_products_delete_changes;
+CREATE TRIGGER trg_products_delete_changes AFTER DELETE ON products FOR EACH ROW
+    INSERT INTO change_log (table_name, row_id, user_id, op) VALUES ('products', OLD.id, OLD.user_id, 'delete');
@@ -0,0 +1,4 @@
+from models.money import Money
+from models.expense import Expense, ExpenseBatch, EXPENSE_COLUMNS, EXPENSE_TABLES
+from models.product import Product, ProductBatch, PRODUCT_COLUMNS, PRODUCT_TABLES
+from models.user import User
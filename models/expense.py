@@ -1,8 +1,113 @@
+from array import array
+from datetime import date as Date
+
+from models.money import Money
+
+# Column order used by from_row() for tuple rows; select them FROM EXPENSE_TABLES,
+# which joins in the category name (expenses store category_id)
+EXPENSE_COLUMNS = "e.id, e.user_id, e.date, c.name AS category, e.amount_cents, e.description"
+EXPENSE_TABLES = "expenses e JOIN categories c ON c.id = e.category_id"
+
+
+def _iso_date(value):
+    """MySQL returns date objects and SQLite returns text; records always hold ISO text"""
+    return value.isoformat() if isinstance(value, Date) else value
+
+
 class Expense:
-    def __init__(self, id, user_id, date, category, amount, description):
+    """One expense row; amounts are integer cents, exposed as Money via .amount"""
+    __slots__ = ('id', 'user_id', 'date', 'category', 'amount_cents', 'description')
+
+    def __init__(self, id, user_id, date, category, amount_cents, description):
         self.id = id
         self.user_id = user_id
-        self.date = date
+        self.date = _iso_date(date)
         self.category = category
-        self.amount = amount
-        self.description = description 
\ No newline at end of file
+        self.amount_cents = int(amount_cents)
+        self.description = description
+
+    @classmethod
+    def from_row(cls, row):
+        """Build from a dictionary-cursor row or a tuple in EXPENSE_COLUMNS order"""
+        if isinstance(row, dict):
+            return cls(row['id'], row['user_id'], row['date'], row['category'],
+                       row['amount_cents'], row['description'])
+        return cls(*row)
+
+    @property
+    def amount(self):
+        return Money(self.amount_cents)
+
+    def __repr__(self):
+        return f"Expense(id={self.id}, date={self.date!r}, category={self.category!r}, amount={self.amount})"
+
+
+class ExpenseBatch:
+    """Columnar container for many expenses
+
+    Numbers live in typed arrays, dates as day ordinals and categories as
+    small integer codes, so a loaded row costs a few dozen bytes instead of
+    a dict or tuple of Python objects. Iterating yields Expense records.
+    """
+    __slots__ = ('ids', 'user_ids', 'days', 'category_codes', 'amount_cents',
+                 'descriptions', 'categories', '_category_index')
+
+    def __init__(self):
+        self.ids = array('q')
+        self.user_ids = array('q')
+        self.days = array('i')
+        self.category_codes = array('H')
+        self.amount_cents = array('q')
+        self.descriptions = []
+        self.categories = []
+        self._category_index = {}
+
+    @classmethod
+    def from_rows(cls, rows):
+        batch = cls()
+        for row in rows:
+            if isinstance(row, dict):
+                batch.append(row['id'], row['user_id'], row['date'], row['category'],
+                             row['amount_cents'], row['description'])
+            else:
+                batch.append(*row)
+        return batch
+
+    def append(self, id, user_id, date, category, amount_cents, description):
+        code = self._category_index.get(category)
+        if code is None:
+            code = self._category_index[category] = len(self.categories)
+            self.categories.append(category)
+        if not isinstance(date, Date):
+            date = Date.fromisoformat(date)
+        self.ids.append(id)
+        self.user_ids.append(user_id)
+        self.days.append(date.toordinal())
+        self.category_codes.append(code)
+        self.amount_cents.append(int(amount_cents))
+        self.descriptions.append(description)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, i):
+        return Expense(self.ids[i], self.user_ids[i], Date.fromordinal(self.days[i]),
+                       self.categories[self.category_codes[i]], self.amount_cents[i],
+                       self.descriptions[i])
+
+    def __iter__(self):
+        for i in range(len(self.ids)):
+            yield self[i]
+
+    def total(self):
+        return Money(sum(self.amount_cents))
+
+    def to_numpy(self):
+        """Zero-copy NumPy views of the numeric columns (requires numpy)"""
+        import numpy as np
+        return {
+            'id': np.frombuffer(self.ids, dtype=np.int64),
+            'day': np.frombuffer(self.days, dtype=np.dtype(f'i{self.days.itemsize}')),
+            'category_code': np.frombuffer(self.category_codes, dtype=np.uint16),
+            'amount_cents': np.frombuffer(self.amount_cents, dtype=np.int64),
+        }
@@ -0,0 +1,102 @@
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from functools import total_ordering
+
+CENT = Decimal('0.01')
+# Largest amount a BIGINT / SQLite INTEGER cents column can hold
+MAX_CENTS = 2**63 - 1
+
+
+@total_ordering
+class Money:
+    """Exact amount of money held as an integer number of cents"""
+    __slots__ = ('cents',)
+
+    def __init__(self, cents=0):
+        value = int(cents)
+        if value != cents:
+            raise ValueError(f"Money needs a whole number of cents, got {cents!r}")
+        self.cents = value
+
+    @classmethod
+    def parse(cls, text):
+        """Parse user input such as '12', '12.5' or '$1,299.99'
+
+        Raises ValueError for anything that is not a finite amount within
+        MAX_CENTS of zero.
+        """
+        cleaned = str(text).strip().replace('$', '').replace(',', '')
+        try:
+            amount = Decimal(cleaned)
+            if not amount.is_finite():
+                raise ValueError(f"Invalid amount: {text!r}")
+            # quantize raises InvalidOperation when the result needs more digits than the context allows
+            cents = int(amount.quantize(CENT, rounding=ROUND_HALF_UP) * 100)
+        except InvalidOperation:
+            raise ValueError(f"Invalid amount: {text!r}")
+        if abs(cents) > MAX_CENTS:
+            raise ValueError(f"Amount out of range: {text!r}")
+        return cls(cents)
+
+    @classmethod
+    def from_float(cls, value):
+        """Convert a legacy float amount, rounding to the nearest cent"""
+        return cls.parse(repr(float(value)))
+
+    def to_decimal(self):
+        return Decimal(self.cents) / 100
+
+    def __str__(self):
+        sign = '-' if self.cents < 0 else ''
+        whole, cents = divmod(abs(self.cents), 100)
+        return f"{sign}{whole}.{cents:02d}"
+
+    def __repr__(self):
+        return f"Money({self.cents})"
+
+    def __format__(self, spec):
+        # Lets existing f-strings like f"{amount:<11.2f}" keep working
+        return format(self.to_decimal(), spec) if spec else str(self)
+
+    def __float__(self):
+        return self.cents / 100
+
+    def __bool__(self):
+        return self.cents != 0
+
+    def __hash__(self):
+        return hash(self.cents)
+
+    def __eq__(self, other):
+        if isinstance(other, Money):
+            return self.cents == other.cents
+        return NotImplemented
+
+    def __lt__(self, other):
+        if isinstance(other, Money):
+            return self.cents < other.cents
+        return NotImplemented
+
+    def __add__(self, other):
+        if isinstance(other, Money):
+            return Money(self.cents + other.cents)
+        if other == 0:
+            return self
+        return NotImplemented
+
+    # sum() starts from 0
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        if isinstance(other, Money):
+            return Money(self.cents - other.cents)
+        return NotImplemented
+
+    def __neg__(self):
+        return Money(-self.cents)
+
+    def __mul__(self, quantity):
+        if isinstance(quantity, int):
+            return Money(self.cents * quantity)
+        return NotImplemented
+
+    __rmul__ = __mul__
@@ -1,8 +1,104 @@
+from array import array
+
+from models.money import Money
+
+# Column order used by from_row() for tuple rows; select them FROM PRODUCT_TABLES,
+# which joins in the category name (products store category_id)
+PRODUCT_COLUMNS = "p.id, p.user_id, p.name, c.name AS category, p.price_cents, p.stock"
+PRODUCT_TABLES = "products p JOIN categories c ON c.id = p.category_id"
+
+
 class Product:
-    def __init__(self, id, user_id, name, category, price, stock):
+    """One product row; prices are integer cents, exposed as Money via .price"""
+    __slots__ = ('id', 'user_id', 'name', 'category', 'price_cents', 'stock')
+
+    def __init__(self, id, user_id, name, category, price_cents, stock):
         self.id = id
         self.user_id = user_id
         self.name = name
         self.category = category
-        self.price = price
-        self.stock = stock 
\ No newline at end of file
+        self.price_cents = int(price_cents)
+        self.stock = int(stock)
+
+    @classmethod
+    def from_row(cls, row):
+        """Build from a dictionary-cursor row or a tuple in PRODUCT_COLUMNS order"""
+        if isinstance(row, dict):
+            return cls(row['id'], row['user_id'], row['name'], row['category'],
+                       row['price_cents'], row['stock'])
+        return cls(*row)
+
+    @property
+    def price(self):
+        return Money(self.price_cents)
+
+    @property
+    def value(self):
+        """Price times stock on hand"""
+        return Money(self.price_cents * self.stock)
+
+    def __repr__(self):
+        return f"Product(id={self.id}, name={self.name!r}, price={self.price}, stock={self.stock})"
+
+
+class ProductBatch:
+    """Columnar container for many products (see ExpenseBatch)"""
+    __slots__ = ('ids', 'user_ids', 'names', 'category_codes', 'price_cents',
+                 'stock', 'categories', '_category_index')
+
+    def __init__(self):
+        self.ids = array('q')
+        self.user_ids = array('q')
+        self.names = []
+        self.category_codes = array('H')
+        self.price_cents = array('q')
+        self.stock = array('q')
+        self.categories = []
+        self._category_index = {}
+
+    @classmethod
+    def from_rows(cls, rows):
+        batch = cls()
+        for row in rows:
+            if isinstance(row, dict):
+                batch.append(row['id'], row['user_id'], row['name'], row['category'],
+                             row['price_cents'], row['stock'])
+            else:
+                batch.append(*row)
+        return batch
+
+    def append(self, id, user_id, name, category, price_cents, stock):
+        code = self._category_index.get(category)
+        if code is None:
+            code = self._category_index[category] = len(self.categories)
+            self.categories.append(category)
+        self.ids.append(id)
+        self.user_ids.append(user_id)
+        self.names.append(name)
+        self.category_codes.append(code)
+        self.price_cents.append(int(price_cents))
+        self.stock.append(int(stock))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, i):
+        return Product(self.ids[i], self.user_ids[i], self.names[i],
+                       self.categories[self.category_codes[i]], self.price_cents[i], self.stock[i])
+
+    def __iter__(self):
+        for i in range(len(self.ids)):
+            yield self[i]
+
+    def total_value(self):
+        return Money(sum(p * s for p, s in zip(self.price_cents, self.stock)))
+
+    def to_numpy(self):
+        """Zero-copy NumPy views of the numeric columns (requires numpy)"""
+        import numpy as np
+        return {
+            'id': np.frombuffer(self.ids, dtype=np.int64),
+            'category_code': np.frombuffer(self.category_codes, dtype=np.uint16),
+            'price_cents': np.frombuffer(self.price_cents, dtype=np.int64),
+            'stock': np.frombuffer(self.stock, dtype=np.int64),
+        }
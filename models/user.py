@@ -1,5 +1,18 @@
 class User:
-    def __init__(self, id, username, password):
+    """A user account; password holds the stored hash and is usually left unloaded"""
+    __slots__ = ('id', 'username', 'password')
+
+    def __init__(self, id, username, password=None):
         self.id = id
         self.username = username
-        self.password = password 
\ No newline at end of file
+        self.password = password
+
+    @classmethod
+    def from_row(cls, row):
+        """Build from a dictionary-cursor row or an (id, username[, password]) tuple"""
+        if isinstance(row, dict):
+            return cls(row['id'], row['username'], row.get('password'))
+        return cls(*row)
+
+    def __repr__(self):
+        return f"User(id={self.id}, username={self.username!r})"
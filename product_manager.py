@@ -1,13 +1,20 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, simpledialog
-from db import create_connection
+from models import Money
+from stock_ledger import InsufficientStock
+from repository import get_repository
+from table_view import SortableTree
+import profiling
 
 class ProductManager:
     def __init__(self, user_id):
         self.user_id = user_id
+        self.repo = get_repository('sqlite')
         self.window = tk.Toplevel()
         self.window.title("Product Manager")
-        self.window.geometry("700x500")
+        self.window.geometry("700x530")
+        profiling.instrument(self, ('add_product', 'load_products', 'delete_product', 'simulate_purchase',
+                                    'receive_stock'), settle=self.window.update_idletasks)
         self.setup_ui()
         self.load_products()
 
@@ -21,7 +28,8 @@ class ProductManager:
         self.name_entry.grid(row=0, column=1, padx=5)
 
         tk.Label(add_frame, text="Category:").grid(row=0, column=2, sticky="w")
-        self.category_entry = tk.Entry(add_frame)
+        # Pick one of the user's categories or type a new one
+        self.category_entry = ttk.Combobox(add_frame, width=18)
         self.category_entry.grid(row=0, column=3, padx=5)
 
         tk.Label(add_frame, text="Price:").grid(row=1, column=0, sticky="w")
@@ -38,6 +46,13 @@ class ProductManager:
         list_frame = tk.LabelFrame(self.window, text="Products", padx=10, pady=10)
         list_frame.pack(fill="both", expand=True, padx=10, pady=5)
 
+        # Searches the loaded products as you type, without querying again
+        search_frame = tk.Frame(list_frame)
+        search_frame.pack(fill="x", pady=(0, 5))
+        tk.Label(search_frame, text="Search:").pack(side="left")
+        self.search_entry = tk.Entry(search_frame)
+        self.search_entry.pack(side="left", fill="x", expand=True, padx=5)
+
         # Treeview for products
         columns = ("Name", "Category", "Price", "Stock")
         self.tree = ttk.Treeview(list_frame, columns=columns, show="headings")
@@ -47,6 +62,8 @@ class ProductManager:
             self.tree.column(col, width=120)
 
         self.tree.pack(fill="both", expand=True)
+        # Click a heading to sort by it (again to reverse)
+        self.view = SortableTree(self.tree, self.search_entry)
         
         # Buttons
         button_frame = tk.Frame(self.window)
@@ -54,27 +71,21 @@ class ProductManager:
         
         tk.Button(button_frame, text="Delete Selected", command=self.delete_product).pack(side="left", padx=5)
         tk.Button(button_frame, text="Simulate Purchase", command=self.simulate_purchase).pack(side="left", padx=5)
+        tk.Button(button_frame, text="Receive Stock", command=self.receive_stock).pack(side="left", padx=5)
         tk.Button(button_frame, text="Refresh", command=self.load_products).pack(side="left", padx=5)
 
     def add_product(self):
         try:
             name = self.name_entry.get()
             category = self.category_entry.get()
-            price = float(self.price_entry.get())
+            price = Money.parse(self.price_entry.get())
             stock = int(self.stock_entry.get())
 
             if not all([name, category, price, stock]):
                 messagebox.showerror("Error", "Please fill all required fields")
                 return
 
-            connection = create_connection()
-            cursor = connection.cursor()
-            cursor.execute(
-                "INSERT INTO products (user_id, name, category, price, stock) VALUES (?, ?, ?, ?, ?)",
-                (self.user_id, name, category, price, stock)
-            )
-            connection.commit()
-            connection.close()
+            self.repo.add_product(self.user_id, name, category, price, stock)
 
             messagebox.showinfo("Success", "Product added successfully!")
             self.clear_entries()
@@ -86,22 +97,13 @@ class ProductManager:
             messagebox.showerror("Error", f"Failed to add product: {str(e)}")
 
     def load_products(self):
-        # Clear existing items
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-
         try:
-            connection = create_connection()
-            cursor = connection.cursor()
-            cursor.execute(
-                "SELECT name, category, price, stock FROM products WHERE user_id = ? ORDER BY name",
-                (self.user_id,)
-            )
-            
-            for row in cursor.fetchall():
-                self.tree.insert("", "end", values=row)
-            
-            connection.close()
+            self.category_entry['values'] = self.repo.product_categories(self.user_id)
+            # Rows are keyed by product id so delete/purchase can target them exactly;
+            # sort keys: name, category, price in cents, stock
+            self.view.load([(product.id, (product.name, product.category, product.price, product.stock),
+                             (product.name.casefold(), product.category.casefold(), product.price_cents, product.stock))
+                            for product in self.repo.iter_products(self.user_id)])
 
         except Exception as e:
             messagebox.showerror("Error", f"Failed to load products: {str(e)}")
@@ -114,17 +116,7 @@ class ProductManager:
 
         if messagebox.askyesno("Confirm", "Are you sure you want to delete this product?"):
             try:
-                item = self.tree.item(selected[0])
-                name, category, price, stock = item['values']
-
-                connection = create_connection()
-                cursor = connection.cursor()
-                cursor.execute(
-                    "DELETE FROM products WHERE user_id = ? AND name = ? AND category = ? AND price = ? AND stock = ?",
-                    (self.user_id, name, category, price, stock)
-                )
-                connection.commit()
-                connection.close()
+                self.repo.delete_product(self.user_id, int(selected[0]))
 
                 messagebox.showinfo("Success", "Product deleted successfully!")
                 self.load_products()
@@ -139,8 +131,10 @@ class ProductManager:
             return
 
         try:
+            product_id = int(selected[0])
             item = self.tree.item(selected[0])
             name, category, price, stock = item['values']
+            stock = int(stock)
 
             if stock <= 0:
                 messagebox.showwarning("Warning", "Product is out of stock!")
@@ -150,34 +144,40 @@ class ProductManager:
                                                 minvalue=1, maxvalue=stock)
             
             if quantity:
-                new_stock = stock - quantity
-                total_cost = price * quantity
-
-                connection = create_connection()
-                cursor = connection.cursor()
-                
-                # Update stock
-                cursor.execute(
-                    "UPDATE products SET stock = ? WHERE user_id = ? AND name = ? AND category = ? AND price = ? AND stock = ?",
-                    (new_stock, self.user_id, name, category, price, stock)
-                )
-                
-                # Add expense for the purchase
-                from datetime import datetime
-                cursor.execute(
-                    "INSERT INTO expenses (user_id, date, category, amount, description) VALUES (?, ?, ?, ?, ?)",
-                    (self.user_id, datetime.now().strftime("%Y-%m-%d"), "Product Purchase", total_cost, f"Purchased {quantity} {name}")
-                )
-                
-                connection.commit()
-                connection.close()
-
-                messagebox.showinfo("Success", f"Purchase completed! Total cost: ${total_cost:.2f}")
+                # Stock and expense change together, at the product's current price
+                _, total_cost, _, anomaly = self.repo.purchase(self.user_id, product_id, quantity)
+
+                if anomaly:
+                    messagebox.showwarning("Unusual Expense",
+                                           f"Purchase completed! Total cost: ${total_cost:.2f}\n{anomaly.describe()}.")
+                else:
+                    messagebox.showinfo("Success", f"Purchase completed! Total cost: ${total_cost:.2f}")
                 self.load_products()
 
+        except InsufficientStock:
+            messagebox.showwarning("Warning", "Not enough stock left for that quantity.")
+            self.load_products()
         except Exception as e:
             messagebox.showerror("Error", f"Failed to process purchase: {str(e)}")
 
+    def receive_stock(self):
+        selected = self.tree.selection()
+        if not selected:
+            messagebox.showwarning("Warning", "Please select a product to restock")
+            return
+
+        try:
+            product_id = int(selected[0])
+            name = self.tree.item(selected[0])['values'][0]
+            quantity = tk.simpledialog.askinteger("Receive Stock", f"How many {name} were received?", minvalue=1)
+
+            if quantity:
+                self.repo.receive_stock(self.user_id, product_id, quantity)
+                self.load_products()
+
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to receive stock: {str(e)}")
+
     def clear_entries(self):
         self.name_entry.delete(0, tk.END)
         self.category_entry.delete(0, tk.END)
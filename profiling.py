@@ -0,0 +1,183 @@
+"""
+Opt-in profiling of menu actions and button commands
+Off unless the BUDGET_PROFILE environment variable names a report directory,
+or main.py / gui.py are started with --profile [DIR]. When on, every action
+passed to instrument() is run under cProfile and tracemalloc and leaves, in
+the directory:
+    <time>-<action>.txt     wall time and its split, allocation peak, the
+                            allocation sites still held at the end, and
+                            the top functions by cumulative time
+    <time>-<action>.prof    the raw cProfile data (pstats, snakeviz, ...)
+    actions.jsonl           one summary line per action, for comparing runs
+
+The split divides the wall time by where cProfile saw the time spent (self
+time per function):
+    database    sqlite3 and MySQL connector calls, and waits on the write
+                queue's commit
+    rendering   Tkinter and Matplotlib, and print() in the terminal menus
+    input       waiting at a prompt (not the program's time)
+    python      everything else
+When disabled, instrument() leaves the object untouched and costs nothing.
+"""
+
+import cProfile
+import io
+import json
+import os
+import pstats
+import re
+import time
+import tracemalloc
+from datetime import datetime
+from functools import wraps
+
+from config import PROFILE_ENV_VAR, PROFILE_TOP_FUNCTIONS, PROFILE_TOP_ALLOCATIONS
+
+_directory = os.environ.get(PROFILE_ENV_VAR) or None
+# cProfile allows one active profiler, so an action started by another is profiled as part of it
+_active = False
+
+_KINDS = ('database', 'python', 'rendering', 'input')
+_DB_PACKAGES = {'sqlite3', 'mysql'}
+_RENDER_PACKAGES = {'tkinter', 'matplotlib', 'PIL'}
+# Built-in (C) functions are reported by name only, e.g. "<method 'execute' of 'sqlite3.Cursor' objects>"
+_DB_BUILTINS = ('sqlite3.', '_mysql_connector', "'acquire' of '_thread.lock'")
+_RENDER_BUILTINS = ('_tkinter', 'builtins.print')
+_INPUT_BUILTINS = ('builtins.input',)
+
+
+def enable(directory):
+    """Profile instrumented actions from now on, writing reports to directory"""
+    global _directory
+    _directory = directory
+
+
+def enabled():
+    return _directory is not None
+
+
+def directory():
+    """Where reports are written (None when profiling is off)"""
+    return _directory
+
+
+def _kind(filename, funcname):
+    if filename == '~':
+        for kind, markers in (('database', _DB_BUILTINS), ('rendering', _RENDER_BUILTINS),
+                              ('input', _INPUT_BUILTINS)):
+            if any(marker in funcname for marker in markers):
+                return kind
+        return 'python'
+    parts = set(os.path.normpath(filename).split(os.sep))
+    if parts & _DB_PACKAGES:
+        return 'database'
+    if parts & _RENDER_PACKAGES:
+        return 'rendering'
+    if os.path.basename(filename) == 'getpass.py':
+        return 'input'
+    return 'python'
+
+
+def time_split(stats, wall):
+    """{kind: seconds}: wall time divided in proportion to each kind's self time"""
+    seconds = dict.fromkeys(_KINDS, 0.0)
+    for (filename, _, funcname), (_, _, self_time, _, _) in stats.stats.items():
+        seconds[_kind(filename, funcname)] += self_time
+    profiled = sum(seconds.values())
+    if profiled <= 0:
+        return dict(seconds, python=wall)
+    return {kind: wall * spent / profiled for kind, spent in seconds.items()}
+
+
+def _report(action, started, wall, profile, peak, growth, snapshot, error):
+    stats = pstats.Stats(profile)
+    split = time_split(stats, wall)
+    base = os.path.join(_directory, f"{started:%Y%m%d-%H%M%S-%f}-{re.sub(r'[^A-Za-z0-9_.-]', '_', action)}")
+    os.makedirs(_directory, exist_ok=True)
+    profile.dump_stats(base + '.prof')
+
+    lines = [f"Action: {action}", f"Started: {started:%Y-%m-%d %H:%M:%S}", f"Wall time: {wall:.3f} s"]
+    if error:
+        lines.append(f"Failed: {error}")
+    for kind in _KINDS:
+        share = split[kind] / wall * 100 if wall else 0
+        lines.append(f"  {kind:<10} {split[kind]:>9.3f} s {share:>5.1f}%")
+    lines.append(f"Allocation peak: {peak / 1024:.1f} KiB (retained {growth / 1024:+.1f} KiB)")
+    lines.append("Largest allocation sites still held at the end:")
+    for stat in snapshot.statistics('lineno')[:PROFILE_TOP_ALLOCATIONS]:
+        lines.append(f"  {stat.size / 1024:>9.1f} KiB {stat.count:>7} blocks  {stat.traceback[0]}")
+    lines.append("")
+    out = io.StringIO()
+    stats.stream = out
+    stats.sort_stats('cumulative').print_stats(PROFILE_TOP_FUNCTIONS)
+    with open(base + '.txt', 'w', encoding='utf-8') as f:
+        f.write("\n".join(lines) + out.getvalue())
+
+    summary = {'action': action, 'started': started.isoformat(timespec='seconds'), 'wall': round(wall, 6),
+               'split': {kind: round(seconds, 6) for kind, seconds in split.items()},
+               'peak_bytes': peak, 'retained_bytes': growth, 'error': error,
+               'report': os.path.basename(base + '.txt')}
+    with open(os.path.join(_directory, 'actions.jsonl'), 'a', encoding='utf-8') as f:
+        f.write(json.dumps(summary) + "\n")
+
+
+def profiled(action, func, settle=None):
+    """func wrapped to profile each call as action; func itself when profiling is off
+
+    settle() is called inside the measurement, e.g. a window's update_idletasks
+    so the redraw a button causes is counted with it.
+    """
+    if not enabled():
+        return func
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        global _active
+        if _active:
+            return func(*args, **kwargs)
+        _active = True
+        tracing = tracemalloc.is_tracing()
+        if not tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        profile = cProfile.Profile()
+        started, error = datetime.now(), None
+        start = time.perf_counter()
+        try:
+            profile.enable()
+            try:
+                result = func(*args, **kwargs)
+                if settle:
+                    settle()
+            finally:
+                profile.disable()
+            return result
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            wall = time.perf_counter() - start
+            current, peak = tracemalloc.get_traced_memory()
+            snapshot = tracemalloc.take_snapshot().filter_traces(
+                [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)])
+            if not tracing:
+                tracemalloc.stop()
+            _active = False
+            try:
+                _report(action, started, wall, profile, peak - before, current - before, snapshot, error)
+            except Exception as e:
+                print(f"✗ Could not write the profile of {action}: {e}")
+
+    return wrapper
+
+
+def instrument(obj, names, settle=None):
+    """Replace obj's methods called names with profiled versions (no-op when off)
+
+    Call before the methods are handed out, e.g. as Button commands.
+    """
+    if not enabled():
+        return
+    for name in names:
+        setattr(obj, name, profiled(f"{type(obj).__name__}.{name}", getattr(obj, name), settle))
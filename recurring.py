@@ -0,0 +1,147 @@
+"""
+Recurring expenses for Smart Budget and Inventory Manager
+A template in recurring_expenses describes a repeating expense; the
+scheduler turns every occurrence that has come due into an expenses row.
+Due templates are found through the indexed next_due column, occurrences
+are inserted in executemany() batches inside the caller's transaction, and
+each generated row carries its template id with a unique (recurring_id, date)
+index, so running the scheduler twice never duplicates an expense.
+
+Functions take an open cursor and the dialect ('mysql' or 'sqlite').
+"""
+
+import calendar
+from datetime import date as Date, timedelta
+
+from sql_dialect import prepare, insert_ignore
+
+FREQUENCIES = ('daily', 'weekly', 'monthly', 'custom')
+
+TEMPLATE_FIELDS = ('id', 'user_id', 'category_id', 'category', 'amount_cents', 'description',
+                   'frequency', 'interval_count', 'start_date', 'next_due', 'end_date')
+# TEMPLATE_FIELDS selected FROM TEMPLATE_TABLES (the category name is joined in)
+TEMPLATE_COLUMNS = ", ".join('c.name AS category' if field == 'category' else f'r.{field}'
+                             for field in TEMPLATE_FIELDS)
+TEMPLATE_TABLES = "recurring_expenses r JOIN categories c ON c.id = r.category_id"
+
+
+def _as_date(value):
+    return value if isinstance(value, Date) else Date.fromisoformat(str(value))
+
+
+def next_occurrence(frequency, interval_count, start_date, current):
+    """The occurrence after `current` for a template starting on start_date
+
+    Monthly templates keep the start date's day of month, falling back to the
+    last day in shorter months.
+    """
+    if frequency == 'daily':
+        return current + timedelta(days=interval_count)
+    if frequency == 'weekly':
+        return current + timedelta(weeks=interval_count)
+    if frequency == 'custom':
+        return current + timedelta(days=interval_count)
+    if frequency == 'monthly':
+        month_index = current.year * 12 + current.month - 1 + interval_count
+        year, month = divmod(month_index, 12)
+        month += 1
+        day = min(start_date.day, calendar.monthrange(year, month)[1])
+        return Date(year, month, day)
+    raise ValueError(f"Unknown frequency: {frequency!r}")
+
+
+def add_template(cursor, dialect, user_id, category_id, amount, description, frequency,
+                 start_date, interval_count=1, end_date=None):
+    """Create a recurring expense template; returns its id
+
+    category_id comes from categories.CategoryCache (or get_or_create).
+    """
+    if frequency not in FREQUENCIES:
+        raise ValueError(f"Frequency must be one of {', '.join(FREQUENCIES)}")
+    if interval_count < 1:
+        raise ValueError("Interval must be at least 1")
+    cursor.execute(prepare("""
+        INSERT INTO recurring_expenses
+            (user_id, category_id, amount_cents, description, frequency, interval_count,
+             start_date, next_due, end_date, active)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 1)
+    """, dialect), (user_id, category_id, amount.cents, description, frequency, interval_count,
+                    start_date, start_date, end_date))
+    return cursor.lastrowid
+
+
+def list_templates(cursor, dialect, user_id):
+    """Active templates of a user as dict rows, soonest due first"""
+    cursor.execute(prepare(f"""
+        SELECT {TEMPLATE_COLUMNS} FROM {TEMPLATE_TABLES}
+        WHERE r.user_id = ? AND r.active = 1 ORDER BY r.next_due
+    """, dialect), (user_id,))
+    return [row if isinstance(row, dict) else dict(zip(TEMPLATE_FIELDS, row)) for row in cursor.fetchall()]
+
+
+def deactivate_template(cursor, dialect, user_id, template_id):
+    """Stop a template from generating further expenses"""
+    cursor.execute(prepare("UPDATE recurring_expenses SET active = 0 WHERE id = ? AND user_id = ?",
+                           dialect), (template_id, user_id))
+    return cursor.rowcount > 0
+
+
+def materialize_due(cursor, dialect, today=None, user_id=None, batch_size=1000):
+    """Insert every occurrence due on or before today; returns the number of expenses created
+
+    Pass user_id to limit the run to one user (e.g. at login). The caller
+    commits, so a catch-up of months of occurrences lands in one transaction.
+    """
+    today = _as_date(today or Date.today())
+    query = f"SELECT {TEMPLATE_COLUMNS} FROM {TEMPLATE_TABLES} WHERE r.next_due <= ? AND r.active = 1"
+    params = [today.isoformat()]
+    if user_id is not None:
+        query += " AND r.user_id = ?"
+        params.append(user_id)
+    cursor.execute(prepare(query, dialect), params)
+    templates = [row if isinstance(row, dict) else dict(zip(TEMPLATE_FIELDS, row)) for row in cursor.fetchall()]
+
+    insert = prepare(f"""
+        {insert_ignore(dialect)} INTO expenses
+            (user_id, date, category_id, amount_cents, description, recurring_id)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, dialect)
+    pending = []
+    created = 0
+    updates = []
+
+    for template in templates:
+        start_date = _as_date(template['start_date'])
+        end_date = _as_date(template['end_date']) if template['end_date'] else None
+        last_day = min(today, end_date) if end_date else today
+        due = _as_date(template['next_due'])
+        while due <= last_day:
+            pending.append((template['user_id'], due.isoformat(), template['category_id'],
+                            template['amount_cents'], template['description'], template['id']))
+            due = next_occurrence(template['frequency'], template['interval_count'], start_date, due)
+            if len(pending) >= batch_size:
+                cursor.executemany(insert, pending)
+                created += cursor.rowcount
+                pending = []
+        active = 0 if end_date and due > end_date else 1
+        updates.append((due.isoformat(), active, template['id']))
+
+    if pending:
+        cursor.executemany(insert, pending)
+        created += cursor.rowcount
+    if updates:
+        cursor.executemany(prepare("UPDATE recurring_expenses SET next_due = ?, active = ? WHERE id = ?",
+                                   dialect), updates)
+    return created
+
+
+if __name__ == "__main__":
+    # Catch up every user's recurring expenses in the SQLite database (e.g. from cron)
+    from db import create_connection, create_tables
+    connection = create_connection()
+    if connection:
+        create_tables(connection)
+        count = materialize_due(connection.cursor(), 'sqlite')
+        connection.commit()
+        connection.close()
+        print(f"Created {count} recurring expense(s)")
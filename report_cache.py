@@ -0,0 +1,123 @@
+"""
+Report result cache for Smart Budget and Inventory Manager
+Triggers on expenses and products bump a per-user counter in data_versions
+on every insert, update and delete, whichever code path made the change.
+Report results are cached under (scope, user, report, params, version),
+so a repeated report costs one primary-key lookup of the version and a dict
+hit; any write moves the user to a new version and the old entries age out.
+The scope names the database (see Backend.cache_scope), since user ids and
+versions are only unique within one.
+"""
+
+import sys
+import threading
+from collections import OrderedDict
+
+from config import REPORT_CACHE_MAX_ENTRIES, REPORT_CACHE_MAX_BYTES
+from sql_dialect import prepare
+
+
+def data_version(cursor, dialect, user_id):
+    """Current data version of a user (0 if they have never written anything)"""
+    cursor.execute(prepare("SELECT version FROM data_versions WHERE user_id = ?", dialect), (user_id,))
+    row = cursor.fetchone()
+    if row is None:
+        return 0
+    return row['version'] if isinstance(row, dict) else row[0]
+
+
+def bump_version(cursor, dialect, user_id):
+    """Move a user to a new data version after a write the triggers do not see (e.g. archive tables)"""
+    upsert = "ON DUPLICATE KEY UPDATE version = version + 1" if dialect == 'mysql' else \
+        "ON CONFLICT (user_id) DO UPDATE SET version = version + 1"
+    cursor.execute(prepare(f"INSERT INTO data_versions (user_id, version) VALUES (?, 1) {upsert}", dialect),
+                   (user_id,))
+
+
+def _sizeof(value, seen=None):
+    """Approximate deep size in bytes of a cached result"""
+    seen = seen if seen is not None else set()
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(_sizeof(k, seen) + _sizeof(v, seen) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(_sizeof(item, seen) for item in value)
+    elif hasattr(value, '__slots__'):
+        size += sum(_sizeof(getattr(value, name), seen)
+                    for name in value.__slots__ if hasattr(value, name))
+    return size
+
+
+class ReportCache:
+    """LRU cache of report results bounded by entry count and approximate bytes"""
+
+    def __init__(self, max_entries=REPORT_CACHE_MAX_ENTRIES, max_bytes=REPORT_CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._latest = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_or_compute(self, scope, user_id, report, params, version, compute):
+        """Return the cached result for this key, or call compute() and cache it"""
+        user = (scope, user_id)
+        key = (user, report, params, version)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+            self.misses += 1
+            if version != self._latest.get(user):
+                self._drop_user(user)
+                self._latest[user] = version
+
+        result = compute()
+        size = _sizeof(result)
+        with self._lock:
+            if size > self.max_bytes or key in self._entries:
+                return result
+            self._entries[key] = (result, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._evict(next(iter(self._entries)))
+        return result
+
+    def _evict(self, key):
+        self._bytes -= self._entries.pop(key)[1]
+        self.evictions += 1
+
+    def _drop_user(self, user):
+        # Entries for an older version can never be hit again
+        for key in [key for key in self._entries if key[0] == user]:
+            self._evict(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._latest.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """Hit/miss counters and current size"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+            }
+
+
+# Shared by every report screen in the process
+report_cache = ReportCache()
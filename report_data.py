@@ -0,0 +1,89 @@
+"""
+Report data for Smart Budget and Inventory Manager
+The queries behind the chart and inventory reports, shared by the Tk
+reports window (reports.py) and the headless batch renderer
+(batch_reports.py). Each report is a single statement.
+
+Archived expenses (see archive.py) are counted through their per-month
+totals in expense_archive_totals, so the archive tables are never scanned.
+
+Functions take an open cursor and the dialect ('mysql' or 'sqlite').
+"""
+
+from datetime import date as Date
+
+from models import Money, Product, PRODUCT_COLUMNS, PRODUCT_TABLES
+from sql_dialect import prepare
+
+
+def category_totals(cursor, dialect, user_id):
+    """(category, Money) pairs, largest first
+
+    Groups on the integer category_id; names are joined onto the few result rows.
+    """
+    cursor.execute(prepare("""
+        SELECT c.name AS category, SUM(t.total) AS total
+        FROM (SELECT category_id, SUM(amount_cents) AS total
+              FROM expenses
+              WHERE user_id = ?
+              GROUP BY category_id
+              UNION ALL
+              SELECT category_id, SUM(total_cents)
+              FROM expense_archive_totals
+              WHERE user_id = ?
+              GROUP BY category_id) t
+        JOIN categories c ON c.id = t.category_id
+        GROUP BY t.category_id, c.name
+        ORDER BY total DESC
+    """, dialect), (user_id, user_id))
+    rows = cursor.fetchall()
+    return [(row['category'], Money(int(row['total']))) if isinstance(row, dict)
+            else (row[0], Money(int(row[1]))) for row in rows]
+
+
+def _month_start(today, months_back):
+    index = today.year * 12 + today.month - 1 - months_back
+    return Date(index // 12, index % 12 + 1, 1)
+
+
+def monthly_totals(cursor, dialect, user_id, today=None, months=6):
+    """(month start date, Money) for the last `months` calendar months, newest first
+
+    Reads per-day sums for the whole range in one query and buckets them by
+    month, adding the monthly totals of any archived expenses in the range.
+    """
+    today = today or Date.today()
+    starts = [_month_start(today, i) for i in range(months)]
+    cursor.execute(prepare("""
+        SELECT date, SUM(amount_cents) AS total
+        FROM expenses
+        WHERE user_id = ? AND date >= ? AND date < ?
+        GROUP BY date
+    """, dialect), (user_id, starts[-1].isoformat(), _month_start(today, -1).isoformat()))
+    rows = cursor.fetchall()
+    cursor.execute(prepare("""
+        SELECT month AS date, SUM(total_cents) AS total
+        FROM expense_archive_totals
+        WHERE user_id = ? AND month >= ? AND month <= ?
+        GROUP BY month
+    """, dialect), (user_id, starts[-1].isoformat()[:7], starts[0].isoformat()[:7]))
+    rows += cursor.fetchall()
+    totals = {start: 0 for start in starts}
+    for row in rows:
+        day, cents = (row['date'], row['total']) if isinstance(row, dict) else row
+        day = str(day)
+        key = Date(int(day[:4]), int(day[5:7]), 1)
+        if key in totals:
+            totals[key] += int(cents)
+    return [(start, Money(totals[start])) for start in starts]
+
+
+def inventory(cursor, dialect, user_id):
+    """The user's products, lowest stock first"""
+    cursor.execute(prepare(f"""
+        SELECT {PRODUCT_COLUMNS}
+        FROM {PRODUCT_TABLES}
+        WHERE p.user_id = ?
+        ORDER BY p.stock ASC
+    """, dialect), (user_id,))
+    return [Product.from_row(row) for row in cursor.fetchall()]
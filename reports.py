@@ -3,15 +3,55 @@ from tkinter import ttk, messagebox
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from datetime import datetime, timedelta
-from db import create_connection
-from database import db
+from models import Money
+from repository import get_repository
+import profiling
+
+def format_anomaly(anomaly):
+    """(date, category, amount, usual, recent quantile, z-score) texts for an Anomaly"""
+    z_score = "new high" if anomaly.z_score is None else f"{anomaly.z_score:.1f}"
+    return (anomaly.date, anomaly.category, f"${anomaly.amount:.2f}", f"${anomaly.usual:.2f}",
+            f"${Money(anomaly.quantile_cents):.2f}", z_score)
+
+def format_stock_forecast(forecast):
+    """(name, stock, units per day, days left, stockout date) texts for a StockForecast"""
+    product = forecast.product
+    if forecast.days_left is None:
+        return (product.name, product.stock, "0.00", "-", "not selling")
+    return (product.name, product.stock, f"{forecast.units_per_day:.2f}", f"{forecast.days_left:.0f}",
+            forecast.stockout_date)
+
+def format_summary(summary):
+    """Text block for a Repository.dashboard() result"""
+    top = summary['top_category']
+    return f"""
+    EXPENSE SUMMARY
+    
+    Total Expenses: ${summary['total']:.2f} ({summary['count']} expenses)
+    Today's Expenses: ${summary['today']:.2f} ({summary['today_count']})
+    This Week's Expenses: ${summary['week']:.2f} ({summary['week_count']})
+    This Month's Expenses: ${summary['month']:.2f} ({summary['month_count']})
+    This Year's Expenses: ${summary['year']:.2f} ({summary['year_count']})
+    
+    Average Expense: ${summary['average']:.2f}
+    Daily Average This Month: ${summary['daily_average']:.2f}
+    Top Category: {f"{top[0]} (${top[1]:.2f})" if top else "-"}
+    
+    Query time: {summary['query_ms']:.2f} ms
+    """
 
 class ReportsManager:
     def __init__(self, user_id):
         self.user_id = user_id
         self.window = tk.Toplevel()
         self.window.title("Reports")
-        self.window.geometry("800x600")
+        self.window.geometry("1000x600")
+        # Reads go through the repository's read-only connection, so report
+        # scans never block purchases or expense entry
+        self.repo = get_repository('sqlite')
+        profiling.instrument(self, ('show_expense_summary', 'show_category_breakdown', 'show_product_inventory',
+                                    'show_monthly_spending', 'show_inventory_trend', 'show_anomalies',
+                                    'show_forecasts'), settle=self.window.update_idletasks)
         self.setup_ui()
 
     def setup_ui(self):
@@ -23,48 +63,33 @@ class ReportsManager:
         tk.Button(options_frame, text="Category Breakdown", command=self.show_category_breakdown).pack(side="left", padx=5)
         tk.Button(options_frame, text="Product Inventory", command=self.show_product_inventory).pack(side="left", padx=5)
         tk.Button(options_frame, text="Monthly Spending", command=self.show_monthly_spending).pack(side="left", padx=5)
+        tk.Button(options_frame, text="Inventory Trend", command=self.show_inventory_trend).pack(side="left", padx=5)
+        tk.Button(options_frame, text="Anomalies", command=self.show_anomalies).pack(side="left", padx=5)
+        tk.Button(options_frame, text="Forecasts", command=self.show_forecasts).pack(side="left", padx=5)
 
         # Display Frame
         self.display_frame = tk.Frame(self.window)
         self.display_frame.pack(fill="both", expand=True, padx=10, pady=5)
 
+        self.cache_label = tk.Label(self.window, text="", anchor="e", fg="gray")
+        self.cache_label.pack(fill="x", padx=10)
+
     def clear_display(self):
         for widget in self.display_frame.winfo_children():
             widget.destroy()
 
+    def update_cache_label(self):
+        stats = self.repo.cache_stats()
+        self.cache_label.config(text=f"Report cache: {stats['hits']} hits, {stats['misses']} misses")
+
     def show_expense_summary(self):
         self.clear_display()
         
         try:
-            connection = create_connection()
-            cursor = connection.cursor()
-            
-            # Total expenses
-            cursor.execute("SELECT SUM(amount) FROM expenses WHERE user_id = ?", (self.user_id,))
-            total = cursor.fetchone()[0] or 0
-            
-            # Today's expenses
-            today = datetime.now().strftime("%Y-%m-%d")
-            cursor.execute("SELECT SUM(amount) FROM expenses WHERE user_id = ? AND date = ?", (self.user_id, today))
-            today_total = cursor.fetchone()[0] or 0
+            summary = self.repo.dashboard(self.user_id)
+            self.update_cache_label()
             
-            # This month's expenses
-            month_start = datetime.now().replace(day=1).strftime("%Y-%m-%d")
-            cursor.execute("SELECT SUM(amount) FROM expenses WHERE user_id = ? AND date >= ?", (self.user_id, month_start))
-            month_total = cursor.fetchone()[0] or 0
-            
-            connection.close()
-            
-            # Display summary
-            summary_text = f"""
-            EXPENSE SUMMARY
-            
-            Total Expenses: ${total:.2f}
-            Today's Expenses: ${today_total:.2f}
-            This Month's Expenses: ${month_total:.2f}
-            """
-            
-            label = tk.Label(self.display_frame, text=summary_text, font=("Arial", 12), justify="left")
+            label = tk.Label(self.display_frame, text=format_summary(summary), font=("Arial", 12), justify="left")
             label.pack(pady=20)
             
         except Exception as e:
@@ -74,25 +99,14 @@ class ReportsManager:
         self.clear_display()
         
         try:
-            connection = create_connection()
-            cursor = connection.cursor()
-            
-            cursor.execute("""
-                SELECT category, SUM(amount) as total 
-                FROM expenses 
-                WHERE user_id = ? 
-                GROUP BY category 
-                ORDER BY total DESC
-            """, (self.user_id,))
-            
-            data = cursor.fetchall()
-            connection.close()
+            data = self.repo.category_totals(self.user_id)
+            self.update_cache_label()
             
             if data:
                 # Create pie chart
                 fig, ax = plt.subplots(figsize=(8, 6))
-                categories = [row[0] for row in data]
-                amounts = [row[1] for row in data]
+                categories = [category for category, _ in data]
+                amounts = [float(total) for _, total in data]
                 
                 ax.pie(amounts, labels=categories, autopct='%1.1f%%')
                 ax.set_title('Expense Breakdown by Category')
@@ -111,35 +125,26 @@ class ReportsManager:
         self.clear_display()
         
         try:
-            connection = create_connection()
-            cursor = connection.cursor()
+            # Create treeview
+            columns = ("Name", "Category", "Price", "Stock", "Total Value")
+            tree = ttk.Treeview(self.display_frame, columns=columns, show="headings")
             
-            cursor.execute("""
-                SELECT name, category, price, stock 
-                FROM products 
-                WHERE user_id = ? 
-                ORDER BY stock ASC
-            """, (self.user_id,))
+            for col in columns:
+                tree.heading(col, text=col)
+                tree.column(col, width=120)
             
-            products = cursor.fetchall()
-            connection.close()
+            products = self.repo.inventory(self.user_id)
+            self.update_cache_label()
             
-            if products:
-                # Create treeview
-                columns = ("Name", "Category", "Price", "Stock", "Total Value")
-                tree = ttk.Treeview(self.display_frame, columns=columns, show="headings")
-                
-                for col in columns:
-                    tree.heading(col, text=col)
-                    tree.column(col, width=120)
-                
-                total_inventory_value = 0
-                for product in products:
-                    name, category, price, stock = product
-                    total_value = price * stock
-                    total_inventory_value += total_value
-                    tree.insert("", "end", values=(name, category, f"${price:.2f}", stock, f"${total_value:.2f}"))
-                
+            count = 0
+            total_inventory_value = Money(0)
+            for product in products:
+                total_value = product.value
+                total_inventory_value += total_value
+                tree.insert("", "end", values=(product.name, product.category, f"${product.price:.2f}", product.stock, f"${total_value:.2f}"))
+                count += 1
+            
+            if count:
                 tree.pack(fill="both", expand=True)
                 
                 # Summary
@@ -149,6 +154,7 @@ class ReportsManager:
                 summary.pack(pady=10)
                 
             else:
+                tree.destroy()
                 tk.Label(self.display_frame, text="No products available", font=("Arial", 12)).pack(pady=20)
                 
         except Exception as e:
@@ -158,30 +164,11 @@ class ReportsManager:
         self.clear_display()
         
         try:
-            connection = create_connection()
-            cursor = connection.cursor()
-            
-            # Get last 6 months of data
-            months = []
-            amounts = []
-            
-            for i in range(6):
-                date = datetime.now() - timedelta(days=30*i)
-                month_start = date.replace(day=1).strftime("%Y-%m-%d")
-                month_end = (date.replace(day=1) + timedelta(days=32)).replace(day=1) - timedelta(days=1)
-                month_end = month_end.strftime("%Y-%m-%d")
-                
-                cursor.execute("""
-                    SELECT SUM(amount) 
-                    FROM expenses 
-                    WHERE user_id = ? AND date BETWEEN ? AND ?
-                """, (self.user_id, month_start, month_end))
-                
-                total = cursor.fetchone()[0] or 0
-                months.append(date.strftime("%b %Y"))
-                amounts.append(total)
-            
-            connection.close()
+            # Last 6 months of data
+            data = self.repo.monthly_totals(self.user_id)
+            self.update_cache_label()
+            months = [start.strftime("%b %Y") for start, _ in data]
+            amounts = [float(total) for _, total in data]
             
             if any(amounts):
                 # Create bar chart
@@ -202,45 +189,198 @@ class ReportsManager:
         except Exception as e:
             messagebox.showerror("Error", f"Failed to load monthly spending: {str(e)}")
 
+    def show_inventory_trend(self, days=90):
+        self.clear_display()
+        
+        try:
+            date_to = datetime.now().date()
+            date_from = date_to - timedelta(days=days)
+            
+            history = self.repo.inventory_trend(self.user_id, date_from.isoformat(), date_to.isoformat())
+            self.update_cache_label()
+            
+            if history:
+                # Values hold until the next recorded change, so draw steps up to today
+                dates = [datetime.strptime(day, "%Y-%m-%d") for day, _ in history]
+                values = [cents / 100 for _, cents in history]
+                dates.append(datetime.combine(date_to, datetime.min.time()))
+                values.append(values[-1])
+                
+                fig, ax = plt.subplots(figsize=(10, 6))
+                ax.step(dates, values, where='post')
+                ax.set_title(f'Inventory Value (last {days} days)')
+                ax.set_ylabel('Value ($)')
+                fig.autofmt_xdate()
+                plt.tight_layout()
+                
+                canvas = FigureCanvasTkAgg(fig, self.display_frame)
+                canvas.draw()
+                canvas.get_tk_widget().pack(fill="both", expand=True)
+                
+            else:
+                tk.Label(self.display_frame, text="No inventory history available", font=("Arial", 12)).pack(pady=20)
+                
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to load inventory trend: {str(e)}")
+
+    def show_anomalies(self):
+        self.clear_display()
+        
+        try:
+            anomalies = self.repo.anomalies(self.user_id)
+            self.update_cache_label()
+            
+            if anomalies:
+                columns = ("Date", "Category", "Amount", "Usual", "Recent 95%", "Std. Devs")
+                tree = ttk.Treeview(self.display_frame, columns=columns, show="headings")
+                for col in columns:
+                    tree.heading(col, text=col)
+                    tree.column(col, width=110)
+                for anomaly in anomalies:
+                    tree.insert("", "end", values=format_anomaly(anomaly))
+                tree.pack(fill="both", expand=True)
+                
+            else:
+                tk.Label(self.display_frame, text="No unusual expenses found", font=("Arial", 12)).pack(pady=20)
+                
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to load anomalies: {str(e)}")
+
+    def show_forecasts(self):
+        self.clear_display()
+        
+        try:
+            stock = self.repo.stock_forecast(self.user_id)
+            spend = self.repo.spend_forecast(self.user_id)
+            self.update_cache_label()
+            
+            tk.Label(self.display_frame, text="Stock Forecast", font=("Arial", 12, "bold")).pack(anchor="w")
+            if stock:
+                columns = ("Product", "Stock", "Sold / Day", "Days Left", "Runs Out")
+                tree = ttk.Treeview(self.display_frame, columns=columns, show="headings", height=8)
+                for col in columns:
+                    tree.heading(col, text=col)
+                    tree.column(col, width=120)
+                for forecast in stock:
+                    tree.insert("", "end", values=format_stock_forecast(forecast))
+                tree.pack(fill="both", expand=True)
+            else:
+                tk.Label(self.display_frame, text="No products available").pack(pady=5)
+            
+            tk.Label(self.display_frame, font=("Arial", 12, "bold"),
+                     text=f"Month-End Spend Forecast (day {spend['days_elapsed']} of {spend['days_in_month']}): "
+                          f"${spend['spent']:.2f} so far, ${spend['projected']:.2f} projected").pack(anchor="w", pady=(10, 0))
+            if spend['categories']:
+                columns = ("Category", "Spent So Far", "Projected")
+                tree = ttk.Treeview(self.display_frame, columns=columns, show="headings", height=6)
+                for col in columns:
+                    tree.heading(col, text=col)
+                    tree.column(col, width=150)
+                for category, spent, projected in spend['categories']:
+                    tree.insert("", "end", values=(category, f"${spent:.2f}", f"${projected:.2f}"))
+                tree.pack(fill="both", expand=True)
+            else:
+                tk.Label(self.display_frame, text="No expenses this month").pack(pady=5)
+                
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to load forecasts: {str(e)}")
+
 class Reports:
     def __init__(self, user_id):
         self.user_id = user_id
+        self.repo = get_repository('mysql')
 
     def monthly_expenses(self):
         """Show total expenses for the current month"""
         year_month = datetime.now().strftime("%Y-%m")
-        query = """
-            SELECT SUM(amount) as total
-            FROM expenses
-            WHERE user_id = %s AND DATE_FORMAT(date, '%%Y-%%m') = %s
-        """
-        result = db.execute_query(query, (self.user_id, year_month))
-        total = result[0]['total'] if result and result[0]['total'] else 0
+        try:
+            _, total = self.repo.monthly_total(self.user_id, year_month)
+        except Exception as e:
+            print(f"✗ Failed to load monthly expenses: {e}")
+            return
         print(f"\nTotal expenses for {year_month}: ${total:.2f}")
 
+    def expense_summary(self):
+        """Show the dashboard summary (all-time and period totals, averages, top category)"""
+        try:
+            summary = self.repo.dashboard(self.user_id)
+        except Exception as e:
+            print(f"✗ Failed to load expense summary: {e}")
+            return
+        print(format_summary(summary))
+
     def low_stock_products(self, threshold=5):
         """Show products low in stock (default threshold: 5)"""
-        query = """
-            SELECT name, stock
-            FROM products
-            WHERE user_id = %s AND stock <= %s
-            ORDER BY stock ASC
-        """
-        products = db.execute_query(query, (self.user_id, threshold))
+        try:
+            products = self.repo.low_stock(self.user_id, threshold)
+        except Exception as e:
+            print(f"✗ Failed to load low stock products: {e}")
+            return
         print(f"\nProducts low in stock (≤ {threshold}):")
         if not products:
             print("All products are sufficiently stocked.")
             return
         for prod in products:
-            print(f"- {prod['name']}: {prod['stock']} left")
+            print(f"- {prod.name}: {prod.stock} left")
 
     def total_inventory_value(self):
         """Show total value of all products in inventory"""
-        query = """
-            SELECT SUM(price * stock) as total_value
-            FROM products
-            WHERE user_id = %s
-        """
-        result = db.execute_query(query, (self.user_id,))
-        total_value = result[0]['total_value'] if result and result[0]['total_value'] else 0
-        print(f"\nTotal inventory value: ${total_value:.2f}") 
\ No newline at end of file
+        try:
+            total_value = self.repo.inventory_value(self.user_id)
+        except Exception as e:
+            print(f"✗ Failed to load inventory value: {e}")
+            return
+        print(f"\nTotal inventory value: ${total_value:.2f}")
+
+    def anomalies(self):
+        """Show expenses flagged as unusually high for their category"""
+        try:
+            anomalies = self.repo.anomalies(self.user_id)
+        except Exception as e:
+            print(f"✗ Failed to load unusual expenses: {e}")
+            return
+        print("\nUnusual expenses (newest first):")
+        if not anomalies:
+            print("No unusual expenses found.")
+            return
+        print(f"{'Date':<12} {'Category':<15} {'Amount':>11} {'Usual':>11} {'Recent 95%':>11} {'Std. Devs':>10}")
+        print("-" * 75)
+        for anomaly in anomalies:
+            day, category, amount, usual, quantile, z_score = format_anomaly(anomaly)
+            print(f"{day:<12} {category:<15} {amount:>11} {usual:>11} {quantile:>11} {z_score:>10}")
+
+    def stock_forecast(self):
+        """Show when each product will run out at its recent sales rate"""
+        try:
+            forecasts = self.repo.stock_forecast(self.user_id)
+        except Exception as e:
+            print(f"✗ Failed to load stock forecast: {e}")
+            return
+        print("\nStock forecast (soonest stockout first):")
+        if not forecasts:
+            print("No products found.")
+            return
+        print(f"{'Product':<20} {'Stock':>6} {'Sold/Day':>9} {'Days Left':>10}  Runs Out")
+        print("-" * 65)
+        for forecast in forecasts:
+            name, stock, per_day, days_left, runs_out = format_stock_forecast(forecast)
+            print(f"{name[:20]:<20} {stock:>6} {per_day:>9} {days_left:>10}  {runs_out}")
+
+    def spend_forecast(self):
+        """Show this month's spend so far and projected to month end, per category"""
+        try:
+            forecast = self.repo.spend_forecast(self.user_id)
+        except Exception as e:
+            print(f"✗ Failed to load spend forecast: {e}")
+            return
+        print(f"\nMonth-end spend forecast (day {forecast['days_elapsed']} of {forecast['days_in_month']}):")
+        if not forecast['categories']:
+            print("No expenses this month.")
+            return
+        print(f"{'Category':<15} {'Spent So Far':>13} {'Projected':>13}")
+        print("-" * 43)
+        for category, spent, projected in forecast['categories']:
+            print(f"{category[:15]:<15} {f'${spent:.2f}':>13} {f'${projected:.2f}':>13}")
+        print("-" * 43)
+        spent, projected = forecast['spent'], forecast['projected']
+        print(f"{'TOTAL':<15} {f'${spent:.2f}':>13} {f'${projected:.2f}':>13}")
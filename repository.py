@@ -0,0 +1,611 @@
+"""
+Repository layer for Smart Budget and Inventory Manager
+One API for users, expenses, products and reports on either database. The
+menu CLI (main.py), the scriptable CLI (cli.py) and the Tk GUI call these
+methods instead of writing their own SQL, so a query fix or optimization
+lands once and both frontends get it.
+
+A Repository runs on a backend adapter:
+    MySQLBackend       the shared DatabaseManager (database.db), whose
+                       server-side prepared statements serve single reads
+    SQLiteBackend      the GUI database: writes go through the write queue
+                       (group commit), reads through one read-only connection
+    ConnectionBackend  any open connection of either dialect (cli.py, scripts)
+
+Statements are written once with ? markers. Each backend converts them to
+its dialect the first time they run and caches the result; where the
+dialects need different SQL the statement is given per dialect.
+
+Methods take and return category names; rows store category ids, looked up
+through the Repository's CategoryCache (see categories.py).
+"""
+
+import itertools
+import os
+import time
+from contextlib import contextmanager
+from datetime import date as Date
+
+from config import DB_CONFIG, SQLITE_DB_FILE
+from categories import CategoryCache, EXPENSE_CATEGORIES, PRODUCT_CATEGORIES, choices
+from models import Money, Expense, Product, PRODUCT_COLUMNS, PRODUCT_TABLES, EXPENSE_COLUMNS, EXPENSE_TABLES
+from sql_dialect import prepare, dict_cursor, read_snapshot
+
+# Expense category used for purchases made through simulate purchase
+PURCHASE_CATEGORY = 'Shopping'
+
+
+class NotFound(Exception):
+    """The record does not exist or belongs to another user"""
+
+
+def per_dialect(**texts):
+    """A statement whose SQL differs between dialects: per_dialect(mysql=..., sqlite=...)"""
+    return tuple(sorted(texts.items()))
+
+
+def _first(row):
+    return next(iter(row.values())) if isinstance(row, dict) else row[0]
+
+
+def _hash_password(password):
+    import hashlib
+    return hashlib.sha256(password.encode()).hexdigest()
+
+
+# --- Backends ---
+_anonymous_scopes = itertools.count(1)
+
+
+class Backend:
+    """Runs a Repository's statements; subclasses supply connections and transactions"""
+
+    dialect = None
+
+    def __init__(self):
+        self._statements = {}
+        # Names this backend's database in the report cache; by default this backend alone
+        self.cache_scope = (self.dialect, next(_anonymous_scopes))
+
+    def sql(self, statement):
+        """statement in this backend's dialect (converted once, then cached)"""
+        text = self._statements.get(statement)
+        if text is None:
+            source = dict(statement)[self.dialect] if isinstance(statement, tuple) else statement
+            text = self._statements[statement] = prepare(source, self.dialect)
+        return text
+
+    def fetch_all(self, statement, params=()):
+        """Rows of a single SELECT"""
+        raise NotImplementedError
+
+    def fetch_one(self, statement, params=()):
+        rows = self.fetch_all(statement, params)
+        return rows[0] if rows else None
+
+    def iterate(self, sql, params=()):
+        """Stream the rows of a SELECT already written for this dialect"""
+        raise NotImplementedError
+
+    def read(self):
+        """Context manager yielding a cursor whose queries share one snapshot"""
+        raise NotImplementedError
+
+    def write(self, work):
+        """Run work(cursor) in one transaction and return its result"""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class MySQLBackend(Backend):
+    dialect = 'mysql'
+
+    def __init__(self, manager=None):
+        super().__init__()
+        if manager is None:
+            from database import db as manager
+        self.manager = manager
+        self.cache_scope = ('mysql', DB_CONFIG.get('host'), DB_CONFIG.get('port'), DB_CONFIG.get('database'))
+
+    def fetch_all(self, statement, params=()):
+        from database import SELECT
+        return self.manager.execute(self.sql(statement), params, SELECT)
+
+    def iterate(self, sql, params=()):
+        return self.manager.iter_query(sql, params)
+
+    @contextmanager
+    def read(self):
+        with self.manager.transaction(readonly=True) as cursor:
+            yield cursor
+
+    def write(self, work):
+        with self.manager.transaction() as cursor:
+            return work(cursor)
+
+
+class SQLiteBackend(Backend):
+    dialect = 'sqlite'
+
+    def __init__(self, db_file=SQLITE_DB_FILE, write_queue=None):
+        """Writes go through write_queue, by default the app's shared one"""
+        super().__init__()
+        self.db_file = db_file
+        self.write_queue = write_queue
+        self._reader = None
+        self.cache_scope = ('sqlite', os.path.abspath(db_file))
+
+    def _connection(self):
+        if self._reader is None:
+            from db import open_read_only
+            self._reader = open_read_only(self.db_file)
+        return self._reader
+
+    def fetch_all(self, statement, params=()):
+        return self._connection().execute(self.sql(statement), params).fetchall()
+
+    def iterate(self, sql, params=()):
+        cursor = self._connection().execute(sql, params)
+        try:
+            while True:
+                rows = cursor.fetchmany(500)
+                if not rows:
+                    break
+                yield from rows
+        finally:
+            cursor.close()
+
+    def read(self):
+        return read_snapshot(self._connection(), 'sqlite')
+
+    def write(self, work):
+        from write_queue import get_write_queue
+        return (self.write_queue or get_write_queue()).submit_call(work).result()
+
+    def close(self):
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+
+
+class ConnectionBackend(Backend):
+    """Backend over a connection the caller opened (e.g. sql_dialect.connect())"""
+
+    def __init__(self, connection, dialect):
+        self.dialect = dialect
+        super().__init__()
+        self.connection = connection
+
+    def fetch_all(self, statement, params=()):
+        cursor = dict_cursor(self.connection, self.dialect)
+        try:
+            cursor.execute(self.sql(statement), params)
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+
+    def iterate(self, sql, params=()):
+        cursor = dict_cursor(self.connection, self.dialect)
+        try:
+            cursor.execute(sql, params)
+            yield from cursor.fetchall()
+        finally:
+            cursor.close()
+
+    def read(self):
+        return read_snapshot(self.connection, self.dialect)
+
+    def write(self, work):
+        if self.dialect == 'mysql':
+            self.connection.start_transaction()
+        cursor = dict_cursor(self.connection, self.dialect)
+        try:
+            result = work(cursor)
+            self.connection.commit()
+            return result
+        except Exception:
+            self.connection.rollback()
+            raise
+        finally:
+            cursor.close()
+
+    def close(self):
+        self.connection.close()
+
+
+# --- Statements ---
+_LOGIN = "SELECT id FROM users WHERE username = ? AND password = ?"
+_USER_BY_NAME = "SELECT id FROM users WHERE username = ?"
+_INSERT_USER = "INSERT INTO users (username, password) VALUES (?, ?)"
+
+_INSERT_EXPENSE = """
+    INSERT INTO expenses (user_id, date, category_id, amount_cents, description)
+    VALUES (?, ?, ?, ?, ?)
+"""
+_DELETE_EXPENSE = "DELETE FROM expenses WHERE id = ? AND user_id = ?"
+_EXPENSE_TO_DELETE = "SELECT category_id, amount_cents, recurring_id FROM expenses WHERE id = ? AND user_id = ?"
+_RECENT_EXPENSES = f"""
+    SELECT {EXPENSE_COLUMNS} FROM {EXPENSE_TABLES}
+    WHERE e.user_id = ? ORDER BY e.date DESC, e.id DESC LIMIT ?
+"""
+
+_PRODUCTS = f"SELECT {PRODUCT_COLUMNS} FROM {PRODUCT_TABLES} WHERE p.user_id = ? ORDER BY p.name"
+_PRODUCT = f"SELECT {PRODUCT_COLUMNS} FROM {PRODUCT_TABLES} WHERE p.id = ? AND p.user_id = ?"
+# Inside a write the product row is locked on MySQL; SQLite writes already hold the database lock
+_PRODUCT_FOR_UPDATE = per_dialect(mysql=_PRODUCT + " FOR UPDATE", sqlite=_PRODUCT)
+_INSERT_PRODUCT = """
+    INSERT INTO products (user_id, name, category_id, price_cents, stock)
+    VALUES (?, ?, ?, ?, 0)
+"""
+_UPDATE_PRODUCT = "UPDATE products SET name = ?, category_id = ?, price_cents = ? WHERE id = ? AND user_id = ?"
+_DELETE_PRODUCT = "DELETE FROM products WHERE id = ? AND user_id = ?"
+_LOW_STOCK = f"SELECT {PRODUCT_COLUMNS} FROM {PRODUCT_TABLES} WHERE p.user_id = ? AND p.stock <= ? ORDER BY p.stock ASC"
+_INVENTORY_VALUE = "SELECT COALESCE(SUM(price_cents * stock), 0) AS total_value FROM products WHERE user_id = ?"
+
+_EXPENSE_CATEGORIES_USED = """
+    SELECT c.name FROM categories c WHERE c.user_id = ?
+      AND (EXISTS (SELECT 1 FROM expenses e WHERE e.user_id = c.user_id AND e.category_id = c.id)
+           OR EXISTS (SELECT 1 FROM recurring_expenses r WHERE r.category_id = c.id))
+"""
+_PRODUCT_CATEGORIES_USED = """
+    SELECT c.name FROM categories c WHERE c.user_id = ?
+      AND EXISTS (SELECT 1 FROM products p WHERE p.category_id = c.id)
+"""
+
+
+class Repository:
+    """Users, expenses, products and reports on one backend"""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.dialect = backend.dialect
+        self.category_ids = CategoryCache()
+
+    def _run(self, cursor, statement, params=()):
+        cursor.execute(self.backend.sql(statement), params)
+        return cursor
+
+    def _write(self, user_id, work):
+        """backend.write() for work that may create categories
+
+        If the transaction fails, category ids it created were rolled back
+        too, so the user's cached ids are dropped.
+        """
+        try:
+            return self.backend.write(work)
+        except Exception:
+            self.category_ids.forget(user_id)
+            raise
+
+    def _category(self, cursor, user_id, name):
+        """(id, stored name) of a category, created on first use"""
+        return self.category_ids.resolve(cursor, self.dialect, user_id, name)
+
+    def _product(self, cursor, user_id, product_id):
+        row = self._run(cursor, _PRODUCT_FOR_UPDATE, (product_id, user_id)).fetchone()
+        if row is None:
+            raise NotFound(f"No product with id {product_id}")
+        return Product.from_row(row)
+
+    # --- Users ---
+    def login(self, username, password):
+        """User id for valid credentials, otherwise None"""
+        row = self.backend.fetch_one(_LOGIN, (username, _hash_password(password)))
+        return _first(row) if row else None
+
+    def user_exists(self, username):
+        return self.backend.fetch_one(_USER_BY_NAME, (username,)) is not None
+
+    def create_user(self, username, password):
+        """Add a user; returns the new id (raises if the username is taken)"""
+        return self.backend.write(
+            lambda cursor: self._run(cursor, _INSERT_USER, (username, _hash_password(password))).lastrowid)
+
+    # --- Expenses ---
+    def add_expense(self, user_id, date, category, amount, description):
+        """Add an expense; returns (Expense, Anomaly or None if the amount is usual for its category)"""
+        from anomalies import record
+
+        def add(cursor):
+            category_id, name = self._category(cursor, user_id, category)
+            expense_id = self._run(cursor, _INSERT_EXPENSE,
+                                   (user_id, date, category_id, amount.cents, description)).lastrowid
+            anomaly = record(cursor, self.dialect, user_id, category_id, name, expense_id, date, amount.cents)
+            return Expense(expense_id, user_id, date, name, amount.cents, description), anomaly
+        return self._write(user_id, add)
+
+    def delete_expense(self, user_id, expense_id):
+        """True if the expense existed and was deleted (from the hot table or an archive)"""
+        from archive import delete_archived
+        from anomalies import expense_deleted
+
+        def delete(cursor):
+            row = self._run(cursor, _EXPENSE_TO_DELETE, (expense_id, user_id)).fetchone()
+            if row is None:
+                if not delete_archived(cursor, self.dialect, user_id, expense_id):
+                    return False
+                expense_deleted(cursor, self.dialect, user_id, expense_id)
+                return True
+            if isinstance(row, dict):
+                row = (row['category_id'], row['amount_cents'], row['recurring_id'])
+            category_id, cents, recurring_id = row
+            self._run(cursor, _DELETE_EXPENSE, (expense_id, user_id))
+            if recurring_id is None:
+                expense_deleted(cursor, self.dialect, user_id, expense_id, category_id, cents)
+            return True
+        return self.backend.write(delete)
+
+    def recent_expenses(self, user_id, limit=10):
+        return [Expense.from_row(row) for row in self.backend.fetch_all(_RECENT_EXPENSES, (user_id, limit))]
+
+    def _archives(self, cursor, expense_filter):
+        """Archive tables an ExpenseFilter's date range reaches"""
+        from archive import archive_tables
+        return archive_tables(cursor, self.dialect, expense_filter.date_from, expense_filter.date_to)
+
+    def iter_expenses(self, expense_filter):
+        """Stream (Expense, match_count, total) for an ExpenseFilter"""
+        from expense_query import split_row
+        with self.backend.read() as cursor:
+            archives = self._archives(cursor, expense_filter)
+        query, params = expense_filter.compile(self.dialect, archives)
+        for row in self.backend.iterate(query, params):
+            yield split_row(row)
+
+    def expense_summary(self, expense_filter):
+        """(match_count, total) for an ExpenseFilter"""
+        from expense_query import summary_from_row
+        with self.backend.read() as cursor:
+            query, params = expense_filter.compile_summary(self.dialect, self._archives(cursor, expense_filter))
+            cursor.execute(query, params)
+            return summary_from_row(cursor.fetchone())
+
+    def expense_categories(self, user_id):
+        """Categories to offer for expenses: the defaults, then others the user has used"""
+        return choices(EXPENSE_CATEGORIES, [_first(row) for row in
+                                            self.backend.fetch_all(_EXPENSE_CATEGORIES_USED, (user_id,))])
+
+    # --- Recurring expenses ---
+    def add_recurring(self, user_id, category, amount, description, frequency, start_date,
+                      interval_count=1, end_date=None):
+        """Create a template and add the occurrences already due; returns how many were added"""
+        from recurring import add_template, materialize_due
+
+        def add(cursor):
+            category_id = self._category(cursor, user_id, category)[0]
+            add_template(cursor, self.dialect, user_id, category_id, amount, description,
+                         frequency, start_date, interval_count, end_date)
+            return materialize_due(cursor, self.dialect, user_id=user_id)
+        return self._write(user_id, add)
+
+    def recurring_templates(self, user_id):
+        from recurring import list_templates
+        with self.backend.read() as cursor:
+            return list_templates(cursor, self.dialect, user_id)
+
+    def stop_recurring(self, user_id, template_id):
+        from recurring import deactivate_template
+        return self.backend.write(lambda cursor: deactivate_template(cursor, self.dialect, user_id, template_id))
+
+    def materialize_recurring(self, user_id=None, today=None):
+        """Add every recurring expense that has come due; returns the number added"""
+        from recurring import materialize_due
+        return self.backend.write(lambda cursor: materialize_due(cursor, self.dialect, today, user_id))
+
+    # --- Products ---
+    def product_categories(self, user_id):
+        """Categories to offer for products: the defaults, then others the user has used"""
+        return choices(PRODUCT_CATEGORIES, [_first(row) for row in
+                                            self.backend.fetch_all(_PRODUCT_CATEGORIES_USED, (user_id,))])
+
+    def products(self, user_id):
+        """The user's products by name"""
+        return [Product.from_row(row) for row in self.backend.fetch_all(_PRODUCTS, (user_id,))]
+
+    def iter_products(self, user_id):
+        for row in self.backend.iterate(self.backend.sql(_PRODUCTS), (user_id,)):
+            yield Product.from_row(row)
+
+    def get_product(self, user_id, product_id):
+        row = self.backend.fetch_one(_PRODUCT, (product_id, user_id))
+        if row is None:
+            raise NotFound(f"No product with id {product_id}")
+        return Product.from_row(row)
+
+    def add_product(self, user_id, name, category, price, stock):
+        """Add a product; its opening stock is recorded as a receipt in the ledger"""
+        from stock_ledger import record_movement, RECEIPT
+
+        def add(cursor):
+            category_id, category_name = self._category(cursor, user_id, category)
+            product_id = self._run(cursor, _INSERT_PRODUCT, (user_id, name, category_id, price.cents)).lastrowid
+            if stock:
+                record_movement(cursor, self.dialect, user_id, product_id, RECEIPT, stock, "Initial stock")
+            return product_id, category_name
+        product_id, category = self._write(user_id, add)
+        return Product(product_id, user_id, name, category, price.cents, stock)
+
+    def update_product(self, user_id, product_id, name, category, price, stock, note="Manual edit"):
+        """Change a product's details; a stock change becomes a ledger adjustment"""
+        from stock_ledger import set_stock
+        from inventory_snapshots import record_value_change
+
+        def update(cursor):
+            product = self._product(cursor, user_id, product_id)
+            category_id, category_name = self._category(cursor, user_id, category)
+            self._run(cursor, _UPDATE_PRODUCT, (name, category_id, price.cents, product_id, user_id))
+            record_value_change(cursor, self.dialect, user_id, product.category, product.value.cents,
+                                category_name, (price * product.stock).cents)
+            set_stock(cursor, self.dialect, user_id, product_id, stock, product.stock, note)
+        self._write(user_id, update)
+
+    def delete_product(self, user_id, product_id):
+        """Delete one of the user's products with its stock history; True if it existed
+
+        The history goes with the product, as MySQL's ON DELETE CASCADE does;
+        SQLite does not enforce the foreign keys, so it is deleted here.
+        """
+        from stock_ledger import delete_product_history
+        from inventory_snapshots import product_removed
+
+        def delete(cursor):
+            try:
+                self._product(cursor, user_id, product_id)
+            except NotFound:
+                return False
+            product_removed(cursor, self.dialect, user_id, product_id)
+            delete_product_history(cursor, self.dialect, user_id, product_id)
+            return self._run(cursor, _DELETE_PRODUCT, (product_id, user_id)).rowcount > 0
+        return self.backend.write(delete)
+
+    def purchase(self, user_id, product_id, quantity, day=None):
+        """Sell quantity of a product and record the expense, atomically
+
+        Returns (product, total cost, new stock, Anomaly or None). Raises
+        InsufficientStock if not enough is on hand at the time of the sale.
+        """
+        from stock_ledger import record_movement, SALE
+        from anomalies import record
+        if quantity < 1:
+            raise ValueError("Quantity must be at least 1")
+        day = day or Date.today().isoformat()
+
+        def buy(cursor):
+            product = self._product(cursor, user_id, product_id)
+            total = product.price * quantity
+            description = f"Purchased {quantity} x {product.name}"
+            # The sale only applies if enough stock is still on hand
+            stock = record_movement(cursor, self.dialect, user_id, product_id, SALE, -quantity, description)
+            category_id, category = self._category(cursor, user_id, PURCHASE_CATEGORY)
+            expense_id = self._run(cursor, _INSERT_EXPENSE,
+                                   (user_id, day, category_id, total.cents, description)).lastrowid
+            anomaly = record(cursor, self.dialect, user_id, category_id, category, expense_id, day, total.cents)
+            return product, total, stock, anomaly
+        return self._write(user_id, buy)
+
+    def receive_stock(self, user_id, product_id, quantity, note="Stock received"):
+        """Record incoming stock; returns the new balance"""
+        from stock_ledger import record_movement, RECEIPT
+        if quantity < 1:
+            raise ValueError("Quantity must be at least 1")
+
+        def receive(cursor):
+            self._product(cursor, user_id, product_id)
+            return record_movement(cursor, self.dialect, user_id, product_id, RECEIPT, quantity, note)
+        return self.backend.write(receive)
+
+    def stock_history(self, user_id, product_id, limit=20):
+        """Most recent movements as (created_at, kind, quantity, note)"""
+        from stock_ledger import movement_history
+        with self.backend.read() as cursor:
+            return movement_history(cursor, self.dialect, user_id, product_id, limit)
+
+    def stock_on(self, product_id, day):
+        """Stock of a product at the end of day (YYYY-MM-DD)"""
+        from stock_ledger import stock_at
+        with self.backend.read() as cursor:
+            return stock_at(cursor, self.dialect, product_id, day)
+
+    # --- Reports (cached until the user's data changes) ---
+    def _cached(self, user_id, report, params, compute):
+        """Result of compute(cursor), reused until the user's data changes
+
+        The version check and the report's queries share one snapshot, so a
+        cached result always matches the version it is stored under.
+        """
+        from report_cache import report_cache, data_version
+        with self.backend.read() as cursor:
+            version = data_version(cursor, self.dialect, user_id)
+            return report_cache.get_or_compute(self.backend.cache_scope, user_id, report, tuple(params), version,
+                                               lambda: compute(cursor))
+
+    def dashboard(self, user_id, today=None):
+        from dashboard import dashboard_summary
+        today = today or Date.today()
+        # Timed here rather than in the query so a cache hit reports its own cost
+        started = time.perf_counter()
+        summary = self._cached(user_id, 'expense_summary', (today,),
+                               lambda cursor: dashboard_summary(cursor, self.dialect, user_id, today))
+        return dict(summary, query_ms=(time.perf_counter() - started) * 1000)
+
+    def category_totals(self, user_id):
+        from report_data import category_totals
+        return self._cached(user_id, 'category_breakdown', (),
+                            lambda cursor: category_totals(cursor, self.dialect, user_id))
+
+    def monthly_totals(self, user_id, today=None):
+        from report_data import monthly_totals
+        today = today or Date.today()
+        return self._cached(user_id, 'monthly_spending', (today,),
+                            lambda cursor: monthly_totals(cursor, self.dialect, user_id, today))
+
+    def inventory(self, user_id):
+        from report_data import inventory
+        return self._cached(user_id, 'product_inventory', (),
+                            lambda cursor: inventory(cursor, self.dialect, user_id))
+
+    def monthly_total(self, user_id, year_month):
+        """(count, total) of a month's expenses"""
+        from expense_query import ExpenseFilter, summary_from_row
+        expense_filter = ExpenseFilter.for_month(user_id, year_month)
+
+        def compute(cursor):
+            query, params = expense_filter.compile_summary(self.dialect, self._archives(cursor, expense_filter))
+            cursor.execute(query, params)
+            return summary_from_row(cursor.fetchone())
+        return self._cached(user_id, 'monthly_expenses', (year_month,), compute)
+
+    def anomalies(self, user_id, limit=50):
+        """The user's most recent unusually high expenses (see anomalies.py), newest first"""
+        from anomalies import anomalies
+        return self._cached(user_id, 'anomalies', (limit,),
+                            lambda cursor: anomalies(cursor, self.dialect, user_id, limit))
+
+    def stock_forecast(self, user_id, today=None):
+        """StockForecast per product (see forecast.py), soonest stockout first"""
+        from forecast import stock_forecast
+        today = today or Date.today()
+        return self._cached(user_id, 'stock_forecast', (today,),
+                            lambda cursor: stock_forecast(cursor, self.dialect, user_id, today))
+
+    def spend_forecast(self, user_id, today=None):
+        """This month's spend so far and projected to month end, per category (see forecast.py)"""
+        from forecast import spend_forecast
+        today = today or Date.today()
+        return self._cached(user_id, 'spend_forecast', (today,),
+                            lambda cursor: spend_forecast(cursor, self.dialect, user_id, today))
+
+    def low_stock(self, user_id, threshold=5):
+        return self._cached(user_id, 'low_stock_products', (threshold,),
+                            lambda cursor: [Product.from_row(row) for row in
+                                            self._run(cursor, _LOW_STOCK, (user_id, threshold)).fetchall()])
+
+    def inventory_value(self, user_id):
+        return self._cached(user_id, 'total_inventory_value', (),
+                            lambda cursor: Money(int(_first(self._run(cursor, _INVENTORY_VALUE, (user_id,)).fetchone()))))
+
+    def inventory_trend(self, user_id, date_from, date_to):
+        """(day, value_cents) of the user's inventory value between two dates"""
+        from inventory_snapshots import value_history
+        return self._cached(user_id, 'inventory_trend', (date_from, date_to),
+                            lambda cursor: value_history(cursor, self.dialect, user_id, date_from, date_to))
+
+    def cache_stats(self):
+        from report_cache import report_cache
+        return report_cache.stats()
+
+
+_repositories = {}
+
+
+def get_repository(dialect):
+    """Shared Repository for the app database of a dialect
+
+    'mysql' is main.py's database (through database.db), 'sqlite' the GUI's.
+    """
+    if dialect not in _repositories:
+        backend = MySQLBackend() if dialect == 'mysql' else SQLiteBackend()
+        _repositories[dialect] = Repository(backend)
+    return _repositories[dialect]
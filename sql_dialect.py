@@ -0,0 +1,67 @@
+"""
+SQL dialect helpers shared by modules that run on both backends
+'mysql' is the CLI database (database.py), 'sqlite' the GUI database (db.py).
+"""
+
+from contextlib import contextmanager
+
+PLACEHOLDERS = {'mysql': '%s', 'sqlite': '?'}
+
+
+def placeholder(dialect):
+    """Parameter marker for the dialect"""
+    return PLACEHOLDERS[dialect]
+
+
+def prepare(query, dialect):
+    """Convert a query written with ? markers to the dialect's marker style"""
+    return query if dialect == 'sqlite' else query.replace('?', PLACEHOLDERS[dialect])
+
+
+def insert_ignore(dialect):
+    """INSERT keyword that skips rows violating a unique key"""
+    return "INSERT OR IGNORE" if dialect == 'sqlite' else "INSERT IGNORE"
+
+
+def connect(dialect, db_file=None, read_only=False):
+    """Open a plain connection for the dialect without the app's startup messages
+
+    The driver is imported on demand, so scripts only pay for the backend they use.
+    read_only=True gives a connection for reports (see read_snapshot).
+    """
+    if dialect == 'mysql':
+        import mysql.connector
+        from config import DB_CONFIG
+        return mysql.connector.connect(**DB_CONFIG)
+    if read_only:
+        from db import open_read_only
+        return open_read_only(*([db_file] if db_file else []))
+    import sqlite3
+    from config import SQLITE_DB_FILE, SQLITE_BUSY_TIMEOUT_MS
+    from db import configure_connection
+    return configure_connection(sqlite3.connect(db_file or SQLITE_DB_FILE, timeout=SQLITE_BUSY_TIMEOUT_MS / 1000))
+
+
+def dict_cursor(connection, dialect):
+    """Cursor returning dict rows on MySQL (buffered) and tuples on SQLite"""
+    if dialect == 'mysql':
+        return connection.cursor(dictionary=True, buffered=True)
+    return connection.cursor()
+
+
+@contextmanager
+def read_snapshot(connection, dialect):
+    """dict_cursor() inside one read-only transaction
+
+    Every query in the block sees the same consistent snapshot, and the
+    transaction is always ended so it never pins old data. On SQLite use a
+    connection from connect(..., read_only=True).
+    """
+    if dialect == 'mysql':
+        connection.start_transaction(consistent_snapshot=True, readonly=True)
+    else:
+        connection.execute("BEGIN")
+    try:
+        yield dict_cursor(connection, dialect)
+    finally:
+        connection.rollback()
@@ -0,0 +1,155 @@
+"""
+Stock movement ledger for Smart Budget and Inventory Manager
+Every stock change is appended to stock_movements as a signed quantity, and
+products.stock is kept as the cached current balance (and the inventory value
+history in inventory_snapshots.py is updated with the change). Every
+CHECKPOINT_INTERVAL movements of a product a checkpoint row records its
+balance, so stock on a past date only replays movements since the nearest
+checkpoint instead of the whole history.
+
+All functions take an open cursor and the dialect ('mysql' or 'sqlite');
+the caller owns the transaction.
+"""
+
+from datetime import datetime
+
+from sql_dialect import prepare
+from inventory_snapshots import record_value_change
+
+RECEIPT = 'receipt'
+SALE = 'sale'
+ADJUSTMENT = 'adjustment'
+MOVEMENT_KINDS = (RECEIPT, SALE, ADJUSTMENT)
+
+CHECKPOINT_INTERVAL = 100
+
+
+def _now():
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _fetch_value(cursor, query, params):
+    cursor.execute(query, params)
+    row = cursor.fetchone()
+    if row is None:
+        return None
+    return next(iter(row.values())) if isinstance(row, dict) else row[0]
+
+
+class InsufficientStock(Exception):
+    """Raised when a movement would take a product's balance below zero"""
+
+
+def record_movement(cursor, dialect, user_id, product_id, kind, quantity, note=None, at=None):
+    """Append a movement and update the cached balance; returns the new balance
+
+    Outgoing movements only apply if enough stock is on hand, checked in the
+    same UPDATE, so concurrent purchases cannot oversell.
+    """
+    if kind not in MOVEMENT_KINDS:
+        raise ValueError(f"Unknown movement kind: {kind!r}")
+    if quantity == 0:
+        raise ValueError("A stock movement needs a non-zero quantity")
+    at = at or _now()
+
+    if quantity < 0:
+        cursor.execute(prepare(
+            "UPDATE products SET stock = stock + ? WHERE id = ? AND user_id = ? AND stock >= ?",
+            dialect), (quantity, product_id, user_id, -quantity))
+    else:
+        cursor.execute(prepare(
+            "UPDATE products SET stock = stock + ? WHERE id = ? AND user_id = ?",
+            dialect), (quantity, product_id, user_id))
+    if cursor.rowcount == 0:
+        raise InsufficientStock(f"Not enough stock for product {product_id}")
+
+    cursor.execute(prepare("""
+        INSERT INTO stock_movements (product_id, user_id, kind, quantity, note, created_at)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, dialect), (product_id, user_id, kind, quantity, note, at))
+    movement_id = cursor.lastrowid
+
+    cursor.execute(prepare("""
+        SELECT p.stock, p.price_cents, c.name AS category
+        FROM products p JOIN categories c ON c.id = p.category_id WHERE p.id = ?
+    """, dialect), (product_id,))
+    row = cursor.fetchone()
+    balance, price_cents, category = (row['stock'], row['price_cents'], row['category']) \
+        if isinstance(row, dict) else row
+    _maybe_checkpoint(cursor, dialect, product_id, movement_id, balance, at)
+    record_value_change(cursor, dialect, user_id, category, (balance - quantity) * price_cents,
+                        category, balance * price_cents, day=at[:10])
+    return balance
+
+
+def _maybe_checkpoint(cursor, dialect, product_id, movement_id, balance, at):
+    last = _fetch_value(cursor, prepare("""
+        SELECT movement_id FROM stock_checkpoints WHERE product_id = ?
+        ORDER BY created_at DESC, movement_id DESC LIMIT 1
+    """, dialect), (product_id,))
+    since = _fetch_value(cursor, prepare(
+        "SELECT COUNT(*) FROM stock_movements WHERE product_id = ? AND id > ?", dialect),
+        (product_id, last or 0))
+    if last is None or since >= CHECKPOINT_INTERVAL:
+        cursor.execute(prepare("""
+            INSERT INTO stock_checkpoints (product_id, movement_id, balance, created_at)
+            VALUES (?, ?, ?, ?)
+        """, dialect), (product_id, movement_id, balance, at))
+
+
+def set_stock(cursor, dialect, user_id, product_id, new_stock, expected_stock, note=None):
+    """Record an adjustment taking the balance from expected_stock to new_stock"""
+    delta = new_stock - expected_stock
+    if delta == 0:
+        return new_stock
+    return record_movement(cursor, dialect, user_id, product_id, ADJUSTMENT, delta, note)
+
+
+def stock_at(cursor, dialect, product_id, at):
+    """Balance of a product at a point in time ('YYYY-MM-DD HH:MM:SS' or a date)
+
+    Reads the latest checkpoint at or before `at`, then sums the few
+    movements recorded after it.
+    """
+    if len(at) == 10:
+        at += " 23:59:59"
+    cursor.execute(prepare("""
+        SELECT movement_id, balance FROM stock_checkpoints
+        WHERE product_id = ? AND created_at <= ?
+        ORDER BY created_at DESC, movement_id DESC LIMIT 1
+    """, dialect), (product_id, at))
+    row = cursor.fetchone()
+    if row is None:
+        movement_id, balance = 0, 0
+    elif isinstance(row, dict):
+        movement_id, balance = row['movement_id'], row['balance']
+    else:
+        movement_id, balance = row
+    since = _fetch_value(cursor, prepare("""
+        SELECT COALESCE(SUM(quantity), 0) FROM stock_movements
+        WHERE product_id = ? AND id > ? AND created_at <= ?
+    """, dialect), (product_id, movement_id, at))
+    return balance + int(since)
+
+
+def movement_history(cursor, dialect, user_id, product_id, limit=20):
+    """Most recent movements of a product as (created_at, kind, quantity, note) tuples"""
+    cursor.execute(prepare("""
+        SELECT created_at, kind, quantity, note FROM stock_movements
+        WHERE product_id = ? AND user_id = ?
+        ORDER BY id DESC LIMIT ?
+    """, dialect), (product_id, user_id, limit))
+    rows = cursor.fetchall()
+    if rows and isinstance(rows[0], dict):
+        return [(r['created_at'], r['kind'], r['quantity'], r['note']) for r in rows]
+    return [tuple(r) for r in rows]
+
+
+def delete_product_history(cursor, dialect, user_id, product_id):
+    """Remove the movements and checkpoints of one of a user's products (being deleted)"""
+    cursor.execute(prepare("""
+        DELETE FROM stock_checkpoints WHERE product_id = ?
+        AND product_id IN (SELECT id FROM products WHERE id = ? AND user_id = ?)
+    """, dialect), (product_id, product_id, user_id))
+    cursor.execute(prepare("DELETE FROM stock_movements WHERE product_id = ? AND user_id = ?", dialect),
+                   (product_id, user_id))
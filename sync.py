@@ -0,0 +1,462 @@
+"""
+MySQL <-> SQLite sync for Smart Budget and Inventory Manager
+Copies users, products and expenses from one backend to the other so data
+entered in main.py (MySQL) shows up in gui.py (SQLite) and vice versa.
+
+Source tables are read in keyset chunks (WHERE id > last ORDER BY id LIMIT n)
+and written with executemany() batches, so memory stays constant at any
+table size. Target rows get their own ids; sync_map in the target records
+which source row each came from, and sync_state holds the high-water mark
+(last source id copied) per table. Each chunk's rows, map entries and
+high-water mark commit together, so an interrupted run resumes where it
+stopped. Rows that were themselves copied in from the other side are
+skipped, so syncing both ways never bounces rows back.
+
+Users are matched by username. Each run copies rows added since the last
+run, then reads the source's change log (see change_log.py) as consumer
+'sync-<target>' and re-applies the edits and deletes of rows copied
+earlier, so only changed rows are read. --full re-applies every copied row
+instead (needed once for edits made before the change log existed). verify
+compares row counts and an order-independent checksum of every copied row
+on both sides.
+
+    python sync.py mysql-to-sqlite [--full] [--chunk 1000]
+    python sync.py sqlite-to-mysql
+    python sync.py verify mysql-to-sqlite
+"""
+
+import argparse
+import hashlib
+import sys
+import time
+
+from categories import CategoryCache
+from change_log import register, read_changes, acknowledge, compact
+from config import SQLITE_DB_FILE
+from sql_dialect import prepare, connect
+from stock_ledger import record_movement, set_stock, delete_product_history, ADJUSTMENT
+from inventory_snapshots import record_value_change, product_removed
+
+DEFAULT_CHUNK = 1000
+
+# Synced columns after id and user_id, in the order used for inserts and checksums.
+# 'category' is the category name; each side stores its own category ids.
+COLUMNS = {
+    'products': ('name', 'category', 'price_cents', 'stock'),
+    'expenses': ('date', 'category', 'amount_cents', 'description'),
+}
+
+
+def _select_list(columns):
+    """COLUMNS entries as expressions over `t` joined with its category `c`"""
+    return ", ".join('c.name' if column == 'category' else f't.{column}' for column in columns)
+
+
+def _category_join(table):
+    return f"{table} t JOIN categories c ON c.id = t.category_id"
+
+
+def _stored_columns(columns):
+    """COLUMNS entries as target column names"""
+    return ", ".join('category_id' if column == 'category' else column for column in columns)
+
+
+class SyncError(Exception):
+    """The sync cannot continue (e.g. a row belongs to a user that was not synced)"""
+
+
+def _cursor(connection, dialect):
+    # Tuple rows on both backends; buffered so MySQL allows several open cursors
+    return connection.cursor(buffered=True) if dialect == 'mysql' else connection.cursor()
+
+
+def _begin(connection, dialect):
+    if dialect == 'mysql':
+        connection.start_transaction()
+    else:
+        connection.execute("BEGIN IMMEDIATE")
+
+
+def _in_clause(values):
+    return ", ".join("?" * len(values))
+
+
+class Sync:
+    """One direction of a sync: rows flow from source to target"""
+
+    def __init__(self, source, source_dialect, target, target_dialect, chunk_size=DEFAULT_CHUNK):
+        if source_dialect == target_dialect:
+            raise ValueError("Source and target must be different backends")
+        self.source = source
+        self.source_dialect = source_dialect
+        self.target = target
+        self.target_dialect = target_dialect
+        self.chunk_size = chunk_size
+        self.category_ids = CategoryCache()
+
+    # --- helpers ---
+    def _source_query(self, query, params):
+        cursor = _cursor(self.source, self.source_dialect)
+        cursor.execute(prepare(query, self.source_dialect), params)
+        rows = cursor.fetchall()
+        cursor.close()
+        return rows
+
+    def _t(self, cursor, query, params=()):
+        cursor.execute(prepare(query, self.target_dialect), params)
+        return cursor
+
+    def high_water_mark(self, table):
+        cursor = _cursor(self.target, self.target_dialect)
+        row = self._t(cursor, "SELECT last_id FROM sync_state WHERE source = ? AND table_name = ?",
+                      (self.source_dialect, table)).fetchone()
+        cursor.close()
+        return row[0] if row else 0
+
+    def _source_chunk(self, table, columns, after_id):
+        """Next keyset chunk of source rows, skipping rows mirrored in from the target"""
+        return self._source_query(f"""
+            SELECT t.id, t.user_id, {_select_list(columns)} FROM {_category_join(table)}
+            WHERE t.id > ?
+              AND NOT EXISTS (SELECT 1 FROM sync_map m
+                              WHERE m.source = ? AND m.table_name = ? AND m.target_id = t.id)
+            ORDER BY t.id LIMIT ?
+        """, (after_id, self.target_dialect, table, self.chunk_size))
+
+    def _source_rows(self, table, columns, ids):
+        """Current source rows with the given ids"""
+        return self._source_query(f"""
+            SELECT t.id, t.user_id, {_select_list(columns)} FROM {_category_join(table)}
+            WHERE t.id IN ({_in_clause(ids)}) ORDER BY t.id
+        """, list(ids))
+
+    def _mapped(self, cursor, table, source_ids):
+        """{source_id: target_id} for already-copied rows"""
+        if not source_ids:
+            return {}
+        rows = self._t(cursor, f"""
+            SELECT source_id, target_id FROM sync_map
+            WHERE source = ? AND table_name = ? AND source_id IN ({_in_clause(source_ids)})
+        """, [self.source_dialect, table] + list(source_ids)).fetchall()
+        return dict(rows)
+
+    def _record(self, cursor, table, pairs, last_id):
+        """Store map entries and the new high-water mark (inside the chunk's transaction)"""
+        if pairs:
+            cursor.executemany(prepare(
+                "REPLACE INTO sync_map (source, table_name, source_id, target_id) VALUES (?, ?, ?, ?)",
+                self.target_dialect), [(self.source_dialect, table, s, t) for s, t in pairs])
+        self._t(cursor, "REPLACE INTO sync_state (source, table_name, last_id) VALUES (?, ?, ?)",
+                (self.source_dialect, table, last_id))
+
+    def _category(self, cursor, user_id, name):
+        """(target category id, stored name), created in the target if needed"""
+        return self.category_ids.resolve(cursor, self.target_dialect, user_id, name)
+
+    def _next_ids(self, cursor, table, count):
+        """Reserve `count` consecutive ids in the target table
+
+        The caller holds the write transaction (BEGIN IMMEDIATE on SQLite;
+        on MySQL FOR UPDATE locks the end of the index against other inserts),
+        so rows can be batch-inserted with explicit ids and mapped without
+        reading ids back one row at a time.
+        """
+        lock = " FOR UPDATE" if self.target_dialect == 'mysql' else ""
+        top = self._t(cursor, f"SELECT COALESCE(MAX(id), 0) FROM {table}{lock}").fetchone()[0]
+        return range(top + 1, top + 1 + count)
+
+    # --- tables ---
+    def sync_users(self, full=False):
+        table = 'users'
+        last_id = 0 if full else self.high_water_mark(table)
+        copied = 0
+        while True:
+            rows = self._source_query("""
+                SELECT id, username, password FROM users
+                WHERE id > ? AND NOT EXISTS (SELECT 1 FROM sync_map m
+                    WHERE m.source = ? AND m.table_name = 'users' AND m.target_id = users.id)
+                ORDER BY id LIMIT ?
+            """, (last_id, self.target_dialect, self.chunk_size))
+            if not rows:
+                return copied
+            _begin(self.target, self.target_dialect)
+            cursor = _cursor(self.target, self.target_dialect)
+            try:
+                keyword = "INSERT OR IGNORE" if self.target_dialect == 'sqlite' else "INSERT IGNORE"
+                cursor.executemany(prepare(f"{keyword} INTO users (username, password) VALUES (?, ?)",
+                                           self.target_dialect), [(r[1], r[2]) for r in rows])
+                copied += cursor.rowcount
+                names = [r[1] for r in rows]
+                target_ids = dict(self._t(cursor, f"SELECT username, id FROM users WHERE username IN ({_in_clause(names)})",
+                                          names).fetchall())
+                last_id = rows[-1][0]
+                self._record(cursor, table, [(r[0], target_ids[r[1]]) for r in rows], last_id)
+                self.target.commit()
+            except Exception:
+                self.target.rollback()
+                raise
+            finally:
+                cursor.close()
+
+    def sync_table(self, table, full=False):
+        """Copy new rows of products or expenses (and re-apply edits when full)"""
+        columns = COLUMNS[table]
+        previous_mark = self.high_water_mark(table)
+        last_id = 0 if full else previous_mark
+        inserted = updated = 0
+        while True:
+            rows = self._source_chunk(table, columns, last_id)
+            if not rows:
+                return inserted, updated
+            _begin(self.target, self.target_dialect)
+            cursor = _cursor(self.target, self.target_dialect)
+            try:
+                users = self._mapped(cursor, 'users', sorted({r[1] for r in rows}))
+                missing = {r[1] for r in rows} - set(users)
+                if missing:
+                    raise SyncError(f"{table} rows belong to unsynced user id(s) {sorted(missing)}; run the sync again")
+                mapped = self._mapped(cursor, table, [r[0] for r in rows])
+                new_rows = [r for r in rows if r[0] not in mapped]
+                changed = [r for r in rows if r[0] in mapped]
+
+                ids = self._next_ids(cursor, table, len(new_rows))
+                pairs = list(zip([r[0] for r in new_rows], ids))
+                if table == 'products':
+                    self._insert_products(cursor, new_rows, ids, users)
+                    updated += self._update_products(cursor, changed, mapped, users)
+                else:
+                    values = self._expense_values(cursor, new_rows, users)
+                    cursor.executemany(prepare(f"""
+                        INSERT INTO expenses (id, user_id, {_stored_columns(columns)}) VALUES (?, ?, ?, ?, ?, ?)
+                    """, self.target_dialect), [(i, *values[r[0]]) for i, r in zip(ids, new_rows)])
+                    updated += self._update_expenses(cursor, changed, mapped, users)
+                inserted += len(new_rows)
+
+                last_id = rows[-1][0]
+                self._record(cursor, table, pairs, max(last_id, previous_mark))
+                self.target.commit()
+            except Exception:
+                self.target.rollback()
+                # Categories created in the rolled-back chunk no longer exist
+                self.category_ids = CategoryCache()
+                raise
+            finally:
+                cursor.close()
+
+    def _expense_values(self, cursor, rows, users):
+        """{source id: target column values after id} for expense rows"""
+        return {r[0]: (users[r[1]], str(r[2]), self._category(cursor, users[r[1]], r[3])[0], *r[4:]) for r in rows}
+
+    def _update_expenses(self, cursor, rows, mapped, users):
+        if not rows:
+            return 0
+        values = self._expense_values(cursor, rows, users)
+        assignments = ', '.join(c + ' = ?' for c in _stored_columns(COLUMNS['expenses']).split(', '))
+        cursor.executemany(prepare(f"UPDATE expenses SET user_id = ?, {assignments} WHERE id = ?",
+                                   self.target_dialect), [(*values[r[0]], mapped[r[0]]) for r in rows])
+        return len(rows)
+
+    def _delete_rows(self, cursor, table, mapped):
+        """Delete the target copies of source rows {source id: target id}"""
+        target_ids = list(mapped.values())
+        if table == 'products':
+            for product_id in target_ids:
+                user_id = self._t(cursor, "SELECT user_id FROM products WHERE id = ?", (product_id,)).fetchone()
+                if user_id:
+                    product_removed(cursor, self.target_dialect, user_id[0], product_id)
+                    delete_product_history(cursor, self.target_dialect, user_id[0], product_id)
+        self._t(cursor, f"DELETE FROM {table} WHERE id IN ({_in_clause(target_ids)})", target_ids)
+        self._t(cursor, f"""
+            DELETE FROM sync_map WHERE source = ? AND table_name = ? AND source_id IN ({_in_clause(mapped)})
+        """, [self.source_dialect, table] + list(mapped))
+        return len(target_ids)
+
+    def _insert_products(self, cursor, rows, ids, users):
+        # Insert at zero stock, then record the stock as a ledger movement so
+        # the movement history and inventory value history stay consistent
+        cursor.executemany(prepare("""
+            INSERT INTO products (id, user_id, name, category_id, price_cents, stock) VALUES (?, ?, ?, ?, ?, 0)
+        """, self.target_dialect), [(i, users[r[1]], r[2], self._category(cursor, users[r[1]], r[3])[0], r[4])
+                                    for i, r in zip(ids, rows)])
+        for product_id, row in zip(ids, rows):
+            if row[5]:
+                record_movement(cursor, self.target_dialect, users[row[1]], product_id, ADJUSTMENT, row[5],
+                                f"Synced from {self.source_dialect}")
+
+    def _update_products(self, cursor, rows, mapped, users):
+        count = 0
+        for row in rows:
+            product_id, user_id = mapped[row[0]], users[row[1]]
+            current = self._t(cursor, f"SELECT {_select_list(('name', 'category', 'price_cents', 'stock'))} "
+                                      f"FROM {_category_join('products')} WHERE t.id = ?", (product_id,)).fetchone()
+            if current is None or tuple(current) == tuple(row[2:]):
+                continue
+            name, category, price_cents, stock = current
+            category_id, new_category = self._category(cursor, user_id, row[3])
+            self._t(cursor, "UPDATE products SET name = ?, category_id = ?, price_cents = ? WHERE id = ?",
+                    (row[2], category_id, row[4], product_id))
+            record_value_change(cursor, self.target_dialect, user_id, category, price_cents * stock,
+                                new_category, row[4] * stock)
+            set_stock(cursor, self.target_dialect, user_id, product_id, row[5], stock,
+                      f"Synced from {self.source_dialect}")
+            count += 1
+        return count
+
+    def apply_changes(self):
+        """Re-apply edits and deletes of copied rows from the source's change log
+
+        Returns {table: (updated, deleted)}. The target commits each batch
+        before the source position moves past it, so an interrupted run
+        applies the batch again (both steps are idempotent).
+        """
+        consumer = f"sync-{self.target_dialect}"
+        source_cursor = _cursor(self.source, self.source_dialect)
+        counts = {table: [0, 0] for table in COLUMNS}
+        try:
+            position = register(source_cursor, self.source_dialect, consumer)
+            self.source.commit()
+            while True:
+                changes = read_changes(source_cursor, self.source_dialect, position, self.chunk_size)
+                if not changes:
+                    break
+                # A row's last change in the batch decides whether it is updated or deleted
+                latest = {}
+                for change in changes:
+                    if change.table in COLUMNS and change.op in ('update', 'delete'):
+                        latest[change.table, change.row_id] = change
+                self._apply_batch(list(latest.values()), counts)
+                position = changes[-1].seq
+                acknowledge(source_cursor, self.source_dialect, consumer, position)
+                self.source.commit()
+            compact(source_cursor, self.source_dialect)
+            self.source.commit()
+        finally:
+            source_cursor.close()
+        return {table: tuple(count) for table, count in counts.items()}
+
+    def _apply_batch(self, changes, counts):
+        _begin(self.target, self.target_dialect)
+        cursor = _cursor(self.target, self.target_dialect)
+        try:
+            for table in COLUMNS:
+                ids = [c.row_id for c in changes if c.table == table]
+                mapped = self._mapped(cursor, table, ids)
+                if not mapped:
+                    continue
+                deleted = {c.row_id for c in changes if c.table == table and c.op == 'delete'}
+                gone = {source_id: target_id for source_id, target_id in mapped.items() if source_id in deleted}
+                if gone:
+                    counts[table][1] += self._delete_rows(cursor, table, gone)
+                edited = [i for i in mapped if i not in deleted]
+                # Rows deleted since the change was logged get their delete in a later change
+                rows = self._source_rows(table, COLUMNS[table], edited) if edited else []
+                if rows:
+                    users = self._mapped(cursor, 'users', sorted({r[1] for r in rows}))
+                    rows = [r for r in rows if r[1] in users]
+                    if table == 'products':
+                        counts[table][0] += self._update_products(cursor, rows, mapped, users)
+                    else:
+                        counts[table][0] += self._update_expenses(cursor, rows, mapped, users)
+            self.target.commit()
+        except Exception:
+            self.target.rollback()
+            self.category_ids = CategoryCache()
+            raise
+        finally:
+            cursor.close()
+
+    def run(self, full=False, report=print):
+        started = time.perf_counter()
+        report(f"users: {self.sync_users(full)} added")
+        for table in ('products', 'expenses'):
+            inserted, updated = self.sync_table(table, full)
+            report(f"{table}: {inserted} added, {updated} updated")
+        for table, (updated, deleted) in self.apply_changes().items():
+            report(f"{table}: {updated} changed, {deleted} deleted since the last run")
+        report(f"Finished in {time.perf_counter() - started:.1f}s")
+
+    # --- verification ---
+    def _checksum(self, connection, dialect, query, params):
+        """(row count, order-independent checksum) streamed over keyset chunks"""
+        count, total, after = 0, 0, 0
+        cursor = _cursor(connection, dialect)
+        while True:
+            cursor.execute(prepare(query, dialect), list(params) + [after, self.chunk_size])
+            rows = cursor.fetchall()
+            if not rows:
+                cursor.close()
+                return count, total
+            for row in rows:
+                canonical = "\x1f".join("" if v is None else str(v) for v in row[1:])
+                total = (total + int.from_bytes(hashlib.blake2b(canonical.encode(), digest_size=8).digest(), 'big')) % 2**64
+                count += 1
+            after = rows[-1][0]
+
+    def verify(self):
+        """{table: (source count, target count, checksums match)} for every copied row"""
+        results = {}
+        for table in ('users', 'products', 'expenses'):
+            hwm = self.high_water_mark(table)
+            if table == 'users':
+                fields, join = "t.username, t.password", ""
+            else:
+                fields = "u.username, " + _select_list(COLUMNS[table])
+                join = "JOIN categories c ON c.id = t.category_id JOIN users u ON u.id = t.user_id"
+            source = self._checksum(self.source, self.source_dialect, f"""
+                SELECT t.id, {fields} FROM {table} t {join}
+                WHERE t.id <= ? AND NOT EXISTS (SELECT 1 FROM sync_map m
+                    WHERE m.source = ? AND m.table_name = ? AND m.target_id = t.id)
+                  AND t.id > ?
+                ORDER BY t.id LIMIT ?
+            """, (hwm, self.target_dialect, table))
+            target = self._checksum(self.target, self.target_dialect, f"""
+                SELECT m.source_id, {fields} FROM sync_map m
+                JOIN {table} t ON t.id = m.target_id {join}
+                WHERE m.source = ? AND m.table_name = ? AND m.source_id > ?
+                ORDER BY m.source_id LIMIT ?
+            """, (self.source_dialect, table))
+            results[table] = (source[0], target[0], source == target)
+        return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Copy data between the MySQL and SQLite databases")
+    parser.add_argument('command', choices=('mysql-to-sqlite', 'sqlite-to-mysql', 'verify'))
+    parser.add_argument('direction', nargs='?', choices=('mysql-to-sqlite', 'sqlite-to-mysql'),
+                        help="direction to verify")
+    parser.add_argument('--full', action='store_true', help="also re-apply edits to rows synced earlier")
+    parser.add_argument('--chunk', type=int, default=DEFAULT_CHUNK, help="rows per batch")
+    parser.add_argument('--db', default=SQLITE_DB_FILE, help="SQLite database file")
+    args = parser.parse_args(argv)
+
+    direction = args.direction if args.command == 'verify' else args.command
+    if direction is None:
+        parser.error("verify needs a direction")
+    source_dialect, target_dialect = direction.split('-to-')
+
+    try:
+        connections = {dialect: connect(dialect, args.db) for dialect in ('mysql', 'sqlite')}
+    except Exception as e:
+        print(f"✗ Could not connect: {e}")
+        return 2
+    sync = Sync(connections[source_dialect], source_dialect, connections[target_dialect], target_dialect, args.chunk)
+    try:
+        if args.command == 'verify':
+            ok = True
+            for table, (source_count, target_count, match) in sync.verify().items():
+                ok = ok and match
+                print(f"{'✓' if match else '✗'} {table}: {source_count} source rows, {target_count} copied"
+                      + ("" if match else " (mismatch; run with --full to re-apply edits)"))
+            return 0 if ok else 1
+        sync.run(args.full)
+        return 0
+    except SyncError as e:
+        print(f"✗ {e}")
+        return 1
+    finally:
+        for connection in connections.values():
+            connection.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
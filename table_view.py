@@ -0,0 +1,154 @@
+"""
+Client-side sorting and search for the GUI's Treeviews
+A RowIndex holds the rows a window loaded, each with display values and
+one sort key per column, plus two indexes built on first use:
+    sorted orders   per column, the row positions in key order; sorting
+                    descending walks the same order backwards
+    prefix index    the distinct tokens of the display values, sorted,
+                    each with the rows it occurs in; the tokens starting
+                    with a search term are the slice between two bisects
+SortableTree sorts when a heading is clicked and filters as the user types
+(debounced), entirely from the RowIndex: no query runs per click or
+keystroke. The Treeview's items are inserted once per load and each view
+is shown by re-linking them in a single set_children() call.
+"""
+
+import tkinter as tk
+from bisect import bisect_left
+
+from config import GUI_SEARCH_DEBOUNCE_MS
+
+_PUNCTUATION = ".,;:()[]{}\"'"
+# Sorts after any text that starts with the same prefix
+_PREFIX_END = "\U0010ffff"
+
+
+def tokens(value):
+    """Searchable tokens of a display value: its words and the whole value, lowercased"""
+    text = str(value).casefold()
+    found = {word.strip(_PUNCTUATION) for word in text.split()}
+    found.add(text)
+    found.discard('')
+    return found
+
+
+class RowIndex:
+    """In-memory rows with per-column sort orders and a token prefix index
+
+    rows is a list of (iid, display values, sort keys), with one value and
+    one key per column.
+    """
+
+    def __init__(self, rows=()):
+        self.rows = list(rows)
+        self._orders = {}
+        self._tokens = None
+        self._rows_by_token = None
+
+    def __len__(self):
+        return len(self.rows)
+
+    def order(self, column):
+        """Row positions sorted by a column's key (ties keep load order)"""
+        order = self._orders.get(column)
+        if order is None:
+            order = self._orders[column] = sorted(range(len(self.rows)), key=lambda i: self.rows[i][2][column])
+        return order
+
+    def _build_prefix_index(self):
+        rows_by_token = {}
+        for i, (_, values, _) in enumerate(self.rows):
+            for value in values:
+                for token in tokens(value):
+                    rows_by_token.setdefault(token, []).append(i)
+        self._rows_by_token = rows_by_token
+        self._tokens = sorted(rows_by_token)
+
+    def search(self, query):
+        """Positions of rows with, for every term of query, a token starting with it; None for no terms"""
+        terms = query.casefold().split()
+        if not terms:
+            return None
+        if self._tokens is None:
+            self._build_prefix_index()
+        found = None
+        # Longest terms first: they usually match the fewest rows
+        for term in sorted(terms, key=len, reverse=True):
+            start = bisect_left(self._tokens, term)
+            end = bisect_left(self._tokens, term + _PREFIX_END, start)
+            rows = set()
+            for token in self._tokens[start:end]:
+                rows.update(self._rows_by_token[token])
+            found = rows if found is None else found & rows
+            if not found:
+                break
+        return found
+
+    def view(self, query='', column=None, descending=False):
+        """Positions of the rows matching query, sorted by column (None keeps load order)"""
+        order = range(len(self.rows)) if column is None else self.order(column)
+        if descending:
+            order = reversed(order)
+        found = self.search(query)
+        if found is None:
+            return list(order)
+        return [i for i in order if i in found]
+
+
+class SortableTree:
+    """Heading-click sorting and debounced type-to-filter for a Treeview
+
+    on_view(positions) is called after every change of view, e.g. to
+    update a total of the visible rows (see index.rows).
+    """
+
+    def __init__(self, tree, search_entry, on_view=None):
+        self.tree = tree
+        self.search_entry = search_entry
+        self.on_view = on_view
+        self.columns = tree['columns']
+        self.headings = {column: tree.heading(column, 'text') for column in self.columns}
+        for i, column in enumerate(self.columns):
+            tree.heading(column, command=lambda i=i: self.sort_by(i))
+        search_entry.bind("<KeyRelease>", self._schedule)
+        self.index = RowIndex()
+        self.sort_column = None
+        self.descending = False
+        self._pending = None
+
+    def load(self, rows):
+        """Replace the rows with (iid, display values, sort keys) tuples, keeping sort and search"""
+        old = [iid for iid, _, _ in self.index.rows]
+        if old:
+            self.tree.delete(*old)
+        for iid, values, _ in rows:
+            self.tree.insert("", "end", iid=iid, values=values)
+        self.index = RowIndex(rows)
+        self.refresh()
+
+    def sort_by(self, column):
+        """Sort by a column index; clicking the same column again reverses the order"""
+        if self.sort_column == column:
+            self.descending = not self.descending
+        else:
+            self.sort_column, self.descending = column, False
+        for i, name in enumerate(self.columns):
+            arrow = (" ▼" if self.descending else " ▲") if i == column else ""
+            self.tree.heading(name, text=self.headings[name] + arrow)
+        self.refresh()
+
+    def _schedule(self, event=None):
+        if self._pending is not None:
+            self.tree.after_cancel(self._pending)
+        self._pending = self.tree.after(GUI_SEARCH_DEBOUNCE_MS, self.refresh)
+
+    def refresh(self):
+        self._pending = None
+        positions = self.index.view(self.search_entry.get(), self.sort_column, self.descending)
+        self.tree.set_children("", *[self.index.rows[i][0] for i in positions])
+        if self.on_view:
+            self.on_view(positions)
+
+    def clear_search(self):
+        self.search_entry.delete(0, tk.END)
+        self.refresh()
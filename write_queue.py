@@ -0,0 +1,226 @@
+"""
+Write queue for the SQLite database used by the GUI
+A single writer thread drains queued mutations and commits them in groups,
+so many small writes share one transaction (and one fsync) instead of each
+opening its own connection and committing alone.
+"""
+
+import os
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+
+from config import (SQLITE_DB_FILE, SQLITE_BUSY_TIMEOUT_MS,
+                    WRITE_QUEUE_MAX_BATCH, WRITE_QUEUE_MAX_LATENCY)
+from db import configure_connection
+
+_STOP = object()
+
+
+class WriteQueue:
+    def __init__(self, db_file=SQLITE_DB_FILE, max_batch=WRITE_QUEUE_MAX_BATCH,
+                 max_latency=WRITE_QUEUE_MAX_LATENCY):
+        """Start the writer thread for the given database file"""
+        self.db_file = db_file
+        self.max_batch = max_batch
+        self.max_latency = max_latency
+        self._queue = queue.Queue()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="sqlite-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, query, params=()):
+        """Queue a single statement; the future resolves to (lastrowid, rowcount)"""
+        def mutation(cursor):
+            cursor.execute(query, params)
+            return cursor.lastrowid, cursor.rowcount
+        return self.submit_call(mutation)
+
+    def submit_call(self, mutation):
+        """Queue a callable taking a cursor; the future resolves to its return value
+
+        Everything the callable does is applied atomically: if it raises, its
+        changes are rolled back and the future carries the exception, while
+        the other mutations in the same group still commit.
+        """
+        if self._closed:
+            raise RuntimeError("Write queue is closed")
+        future = Future()
+        self._queue.put((mutation, future))
+        return future
+
+    def execute(self, query, params=()):
+        """Queue a statement and wait for it to be committed"""
+        return self.submit(query, params).result()
+
+    def close(self):
+        """Commit everything still queued and stop the writer thread"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def _next_group(self):
+        """Block for the first mutation, then gather more until the batch or latency bound"""
+        first = self._queue.get()
+        if first is _STOP:
+            return [], True
+        group = [first]
+        deadline = time.monotonic() + self.max_latency
+        while len(group) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return group, True
+            group.append(item)
+        return group, False
+
+    def _run(self):
+        connection = sqlite3.connect(self.db_file, timeout=SQLITE_BUSY_TIMEOUT_MS / 1000,
+                                     isolation_level=None, check_same_thread=False)
+        configure_connection(connection)
+        cursor = connection.cursor()
+        stopping = False
+        while not stopping:
+            group, stopping = self._next_group()
+            if group:
+                self._commit_group(connection, cursor, group)
+        connection.close()
+
+    def _commit_group(self, connection, cursor, group):
+        results = []
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            for mutation, future in group:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                cursor.execute("SAVEPOINT mutation")
+                try:
+                    value = mutation(cursor)
+                except Exception as e:
+                    cursor.execute("ROLLBACK TO mutation")
+                    cursor.execute("RELEASE mutation")
+                    future.set_exception(e)
+                    continue
+                cursor.execute("RELEASE mutation")
+                results.append((future, value))
+            cursor.execute("COMMIT")
+        except Exception as e:
+            if connection.in_transaction:
+                connection.rollback()
+            for mutation, future in group:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        # Only resolve futures once the commit is durable
+        for future, value in results:
+            future.set_result(value)
+
+
+_write_queue = None
+_write_queue_lock = threading.Lock()
+
+
+def get_write_queue():
+    """Return the shared write queue, starting it on first use"""
+    global _write_queue
+    with _write_queue_lock:
+        if _write_queue is None:
+            _write_queue = WriteQueue()
+        return _write_queue
+
+
+def shutdown_write_queue():
+    """Flush and stop the shared write queue (called when the GUI exits)"""
+    global _write_queue
+    with _write_queue_lock:
+        if _write_queue is not None:
+            _write_queue.close()
+            _write_queue = None
+
+
+def benchmark(db_file, count=20000, writers=4):
+    """Compare sustained inserts/second: commit per row vs the write queue"""
+    from db import create_tables
+
+    def reset():
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(db_file + suffix):
+                os.remove(db_file + suffix)
+        connection = sqlite3.connect(db_file)
+        create_tables(connection)
+        user_id = connection.execute("INSERT INTO users (username, password) VALUES ('bench', 'bench')").lastrowid
+        category_id = connection.execute("INSERT INTO categories (user_id, name) VALUES (?, 'Food')",
+                                         (user_id,)).lastrowid
+        connection.commit()
+        connection.close()
+        return (user_id, "2024-01-01", category_id, 1250, "benchmark")
+
+    def inserted():
+        connection = sqlite3.connect(db_file)
+        try:
+            return connection.execute("SELECT COUNT(*) FROM expenses").fetchone()[0]
+        finally:
+            connection.close()
+
+    def run_writers(target):
+        """Run target in each writer thread; returns the seconds taken, raising the first failure"""
+        failures = []
+        def guarded():
+            try:
+                target()
+            except Exception as e:
+                failures.append(e)
+        threads = [threading.Thread(target=guarded) for _ in range(writers)]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - start
+        if failures:
+            raise RuntimeError(f"{len(failures)} writer(s) failed: {failures[0]}") from failures[0]
+        if inserted() != total:
+            raise RuntimeError(f"Expected {total} rows, found {inserted()}")
+        return elapsed
+
+    insert = "INSERT INTO expenses (user_id, date, category_id, amount_cents, description) VALUES (?, ?, ?, ?, ?)"
+    per_writer = count // writers
+    total = per_writer * writers
+
+    # Before: every insert opens a connection and commits on its own
+    row = reset()
+    def commit_per_row():
+        for _ in range(per_writer):
+            connection = sqlite3.connect(db_file, timeout=30)
+            connection.execute(insert, row)
+            connection.commit()
+            connection.close()
+    before = total / run_writers(commit_per_row)
+
+    # After: writers submit to the queue and wait on their futures
+    row = reset()
+    write_queue = WriteQueue(db_file)
+    def queued():
+        futures = [write_queue.submit(insert, row) for _ in range(per_writer)]
+        for future in futures:
+            future.result()
+    try:
+        after = total / run_writers(queued)
+    finally:
+        write_queue.close()
+
+    print(f"Commit per row: {before:,.0f} inserts/s")
+    print(f"Write queue:    {after:,.0f} inserts/s")
+    return before, after
+
+
+if __name__ == "__main__":
+    import tempfile
+    benchmark(os.path.join(tempfile.mkdtemp(), "bench.db"))